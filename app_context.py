@@ -0,0 +1,44 @@
+"""
+Application container.
+
+The long-lived services are built once, in dependency order, when the
+app starts: KnowledgeCenter (with its MarketService, storage, journal and
+event bus), ChallengeManager, InvestigatorBot, the bot roster and the
+portfolio manager. They are then passed explicitly to whoever needs them.
+Objects take their collaborators as constructor arguments, and request
+handlers read them from the context. Nothing on a request path resolves
+a singleton, re-imports strategies or rebuilds the bot roster.
+"""
+from challenge_manager import ChallengeManager
+from investigator import InvestigatorBot
+from knowledge_center import KnowledgeCenter
+from portfolio_manager import portfolio_manager
+from strategies import get_all_bots
+
+
+class AppContext:
+    def __init__(self, kc, cm, investigator, bots, portfolios):
+        self.kc = kc
+        self.market_service = kc.market_service
+        self.news_service = kc.news_service
+        self.events = kc.events
+        self.cm = cm
+        self.investigator = investigator
+        self.bots = bots  # roster in display order; the engine schedules these same objects
+        self.bots_by_id = {bot.bot_id: bot for bot in bots}
+        self.portfolios = portfolios
+
+    @classmethod
+    def create(cls):
+        """Builds every service once, wiring each into the ones that depend on it."""
+        kc = KnowledgeCenter()
+        cm = ChallengeManager(kc)
+        return cls(kc, cm, InvestigatorBot(cm, kc), get_all_bots(), portfolio_manager)
+
+    def get_bot(self, bot_id):
+        return self.bots_by_id.get(bot_id)
+
+    def bot_metadata(self):
+        """Static profile fields merged into the leaderboard rows."""
+        return {bot.bot_id: {"name": bot.name, "human_name": bot.human_name, "bio": bot.bio, "risk": bot.risk}
+                for bot in self.bots}
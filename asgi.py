@@ -0,0 +1,75 @@
+"""
+ASGI entry point for production:
+
+    gunicorn asgi:app --worker-class uvicorn.workers.UvicornWorker
+
+/api/stream is answered on the worker's event loop. An open stream is a
+coroutine waiting on its event-bus subscription, not a thread, so the
+number of live viewers is bounded by memory and sockets rather than by a
+thread pool. Every other request goes to the Flask app in main.py, run
+on a2wsgi's thread pool (WSGI_THREADS) just as it was under gthread.
+"""
+import asyncio
+import os
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+
+import main
+
+flask_app = WSGIMiddleware(main.app, workers=int(os.getenv('WSGI_THREADS', 32)))
+
+STREAM_START = {
+    "type": "http.response.start",
+    "status": 200,
+    "headers": [(b"content-type", b"text/event-stream; charset=utf-8")] +
+               [(name.lower().encode(), value.encode()) for name, value in main.STREAM_HEADERS.items()],
+}
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "http" and scope["path"] == "/api/stream" and scope["method"] == "GET":
+        await stream(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        await lifespan(receive, send)
+    else:
+        await flask_app(scope, receive, send)
+
+
+async def stream(scope, receive, send, events=None):
+    """Server-Sent Events: ?topics=market,leaderboard,verdict,trade (default: all)."""
+    events = events or main.kc.events
+    topics = parse_qs(scope["query_string"].decode("latin-1")).get("topics", [""])[0]
+    subscription = events.subscribe(topics.split(","))
+    disconnect = asyncio.ensure_future(_disconnected(receive))
+    try:
+        await send(STREAM_START)
+        await send({"type": "http.response.body", "body": main.STREAM_PREAMBLE, "more_body": True})
+        while not disconnect.done():
+            frames = asyncio.ensure_future(subscription.next(timeout=main.STREAM_KEEPALIVE))
+            await asyncio.wait((frames, disconnect), return_when=asyncio.FIRST_COMPLETED)
+            if disconnect.done():
+                frames.cancel()
+                break
+            # A comment line every 15s keeps proxies from closing an idle stream
+            await send({"type": "http.response.body", "body": frames.result() or b": keepalive\n\n",
+                        "more_body": True})
+    finally:
+        disconnect.cancel()
+        events.unsubscribe(subscription)
+
+
+async def _disconnected(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def lifespan(receive, send):
+    # The services start when main is imported; there is nothing else to run
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
@@ -0,0 +1,111 @@
+"""
+Investigator pipeline stage between signal generation and verdicts.
+
+The bot engine hands each logged signal to `submit()` and moves on to the
+next bot. Audit worker threads pull signals from a bounded queue in
+micro-batches: a worker takes whatever is waiting, and lingers a few
+milliseconds for more, up to `batch_size`. It audits the batch with one
+vectorized InvestigatorBot.check_batch() call, then writes the verdicts
+back through `on_verdict`. Write-back is serialized, so scores and
+portfolios see one verdict at a time even with several audit workers.
+
+The queue bound is the backpressure. If auditing falls behind, `submit()`
+blocks the engine instead of letting unaudited signals pile up in memory.
+
+Every submitted signal gets a verdict. If a batch audit raises, its
+signals are audited again one by one, and a signal that still fails is
+rejected with AUDIT_ERROR rather than left PENDING.
+"""
+import os
+import queue
+import threading
+import time
+
+
+class AuditPipeline:
+    AUDIT_ERROR = "REJECTED (Audit Error)"
+
+    def __init__(self, investigator, on_verdict, workers=1, batch_size=32, linger=0.005, maxsize=1024):
+        """
+        Args:
+            investigator: InvestigatorBot whose check_batch() audits the signals
+            on_verdict: called as on_verdict(signal, verdict, market_data) for every audited signal
+            workers: audit threads (audit capacity, independent of the bot count)
+            batch_size: most signals audited in one vectorized pass
+            linger: seconds a worker waits for a batch to fill once it has a signal
+            maxsize: queued signals before submit() blocks
+        """
+        self.investigator = investigator
+        self.on_verdict = on_verdict
+        self.workers = workers
+        self.batch_size = batch_size
+        self.linger = linger
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.audited = 0
+        self.batches = 0
+        self._write_lock = threading.Lock()
+        self._threads = []
+
+    @classmethod
+    def from_env(cls, investigator, on_verdict):
+        return cls(investigator, on_verdict,
+                   workers=int(os.getenv('AUDIT_WORKERS', 1)),
+                   batch_size=int(os.getenv('AUDIT_BATCH_SIZE', 32)))
+
+    def submit(self, signal, market_data, timeout=None):
+        """Queues one signal for audit; blocks while the queue is full."""
+        self.queue.put((signal, market_data), timeout=timeout)
+
+    def start(self):
+        """Starts the audit workers."""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"audit-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self):
+        """Waits until every submitted signal has its verdict written."""
+        self.queue.join()
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _audit(self, batch):
+        """Verdicts for batch; falls back to one signal at a time if the batch audit raises."""
+        try:
+            return self.investigator.check_batch(batch)
+        except Exception as e:
+            print(f"[Audit] Batch of {len(batch)} failed ({e}); auditing its signals one by one")
+        verdicts = []
+        for item in batch:
+            try:
+                verdicts.extend(self.investigator.check_batch([item]))
+            except Exception as e:
+                print(f"[Audit] Signal {item[0].get('id')} failed: {e}")
+                verdicts.append(self.AUDIT_ERROR)
+        return verdicts
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                verdicts = self._audit(batch)
+                with self._write_lock:
+                    for (signal, market_data), verdict in zip(batch, verdicts):
+                        try:
+                            self.on_verdict(signal, verdict, market_data)
+                        except Exception as e:
+                            print(f"[Audit] Verdict write-back failed for signal {signal.get('id')}: {e}")
+                    self.audited += len(batch)
+                    self.batches += 1
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
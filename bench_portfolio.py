@@ -0,0 +1,120 @@
+"""
+Concurrency stress benchmark for the /api/portfolio/* endpoints.
+
+Many threads hammer add_robot / update_balance / remove_robot / portfolio
+reads through the Flask test client, spread over many users and, in a
+second phase, all on one user. Afterwards every portfolio is checked
+against the operations that reported success, both in memory and as
+re-read from the database, so lost updates or torn writes fail the run.
+
+    python bench_portfolio.py --threads 16 --users 200 --ops 4000
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import scratch_data
+
+scratch_data.isolate(prefix="bench_portfolio_")  # before main builds the services
+
+from main import app  # noqa: E402
+from portfolio_manager import portfolio_manager  # noqa: E402
+from storage import Storage  # noqa: E402
+
+
+def run_phase(name, users, threads, ops):
+    expected = {user: {} for user in users}  # user -> {robot_id: allocated_balance}
+    expected_lock = threading.Lock()
+    # update/remove results depend on write order, so those are ordered per user
+    # here; adds use unique robot ids and run fully concurrently
+    user_locks = {user: threading.Lock() for user in users}
+    counter = iter(range(10 ** 9))
+    latencies = []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        for _ in range(ops // threads):
+            user = rng.choice(users)
+            action = rng.random()
+            start = time.perf_counter()
+            if action < 0.4:
+                robot_id = f"bot-{next(counter)}"
+                balance = rng.randint(1, 100) * 100
+                result = client.post("/api/portfolio/add_robot", json={
+                    "robot_id": robot_id, "robot_name": robot_id, "emoji": "*",
+                    "allocated_balance": balance, "user_id": user}).get_json()
+                if result["success"]:
+                    with expected_lock:
+                        expected[user][robot_id] = balance
+            elif action < 0.7:
+                with expected_lock:
+                    owned = list(expected[user])
+                if owned:
+                    robot_id = rng.choice(owned)
+                    balance = rng.randint(1, 100) * 100
+                    with user_locks[user]:
+                        result = client.post("/api/portfolio/update_balance", json={
+                            "robot_id": robot_id, "new_balance": balance, "user_id": user}).get_json()
+                        if result["success"]:
+                            with expected_lock:
+                                expected[user][robot_id] = balance
+            elif action < 0.8:
+                with expected_lock:
+                    owned = list(expected[user])
+                if owned:
+                    robot_id = rng.choice(owned)
+                    with user_locks[user]:
+                        result = client.post("/api/portfolio/remove_robot", json={
+                            "robot_id": robot_id, "user_id": user}).get_json()
+                        if result["success"]:
+                            with expected_lock:
+                                expected[user].pop(robot_id, None)
+            else:
+                client.get(f"/api/portfolio?user_id={user}")
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    reread = Storage(os.environ["DB_PATH"])
+    errors = 0
+    for user, robots in expected.items():
+        for source, portfolio in (("memory", portfolio_manager.get_portfolio(user)),
+                                  ("disk", reread.load_portfolio(user) or {"copied_robots": [], "total_balance": 0})):
+            actual = {r["robot_id"]: r["allocated_balance"] for r in portfolio["copied_robots"]}
+            if actual != robots or portfolio["total_balance"] != sum(robots.values()):
+                errors += 1
+                print(f"  MISMATCH {source} {user}: expected {robots}, got {actual} "
+                      f"(total {portfolio['total_balance']})")
+    reread.close()
+
+    latencies.sort()
+    p = lambda q: latencies[int(q * (len(latencies) - 1))] * 1000  # noqa: E731
+    print(f"{name}: {len(latencies)} requests in {elapsed:.2f}s = {len(latencies) / elapsed:,.0f} req/s | "
+          f"p50 {p(0.5):.2f}ms p99 {p(0.99):.2f}ms | {errors} inconsistent portfolios")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--ops", type=int, default=4000)
+    args = parser.parse_args()
+
+    errors = run_phase("many users", [f"user-{i}" for i in range(args.users)], args.threads, args.ops)
+    errors += run_phase("one user  ", ["hot-user"], args.threads, args.ops // 4)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Startup vs per-request cost of the service container.
+
+Counts every construction or singleton lookup of the core services
+(KnowledgeCenter(), MarketService(), ChallengeManager(), InvestigatorBot(),
+get_all_bots()) while the app starts, then while the API endpoints serve
+requests. Requests must not add any: the services are built once in
+AppContext and injected. Also times the old per-request pattern (resolve
+the KnowledgeCenter singleton, rebuild the bot roster, scan it for an id)
+against the context lookup that replaced it.
+
+    python bench_startup.py --requests 2000
+"""
+import argparse
+import os
+import sys
+import time
+import timeit
+from collections import Counter
+
+import scratch_data
+
+scratch_data.isolate(prefix="bench_startup_")  # before main builds the services
+
+import strategies  # noqa: E402
+from challenge_manager import ChallengeManager  # noqa: E402
+from investigator import InvestigatorBot  # noqa: E402
+from knowledge_center import KnowledgeCenter  # noqa: E402
+from market_service import MarketService  # noqa: E402
+
+calls = Counter()
+_original_get_all_bots = strategies.get_all_bots
+
+
+def _count_new(cls):
+    original = cls.__new__
+
+    def counted(klass, *args, **kwargs):
+        calls[f"{cls.__name__}()"] += 1
+        return original(klass, *args, **kwargs)
+    cls.__new__ = staticmethod(counted)
+
+
+def _count_init(cls):
+    original = cls.__init__
+
+    def counted(self, *args, **kwargs):
+        calls[f"{cls.__name__}()"] += 1
+        original(self, *args, **kwargs)
+    cls.__init__ = counted
+
+
+def _count_get_all_bots():
+    calls["get_all_bots()"] += 1
+    return _original_get_all_bots()
+
+
+_count_new(KnowledgeCenter)
+_count_new(MarketService)
+_count_init(ChallengeManager)
+_count_init(InvestigatorBot)
+strategies.get_all_bots = _count_get_all_bots
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    import main as app_module
+    print(f"startup: {time.perf_counter() - started:.2f}s, services built: {dict(calls)}")
+
+    ctx = app_module.ctx
+    signal = ctx.kc.log_signal("jewel", "1120.SR", "BUY", 10.0, "bench")
+    ctx.kc.log_investigator_verdict(signal["id"], "APPROVED", "bench")
+    client = app_module.app.test_client()
+    paths = ["/api/trades", "/api/robots", "/api/bot/jewel", f"/api/trade/{signal['id']}", "/trades",
+             "/api/user/recommendations"]
+
+    calls.clear()
+    started = time.perf_counter()
+    for i in range(args.requests):
+        response = client.get(paths[i % len(paths)])
+        assert response.status_code == 200, (paths[i % len(paths)], response.status_code)
+    elapsed = time.perf_counter() - started
+    print(f"requests: {args.requests} in {elapsed:.2f}s ({elapsed / args.requests * 1e6:.0f} us each), "
+          f"services built: {dict(calls) or 'none'}")
+
+    n = 20000
+    old = timeit.timeit(lambda: (KnowledgeCenter(), next(b for b in _original_get_all_bots() if b.bot_id == "jewel")),
+                        number=n) / n
+    new = timeit.timeit(lambda: ctx.get_bot("jewel"), number=n) / n
+    print(f"bot lookup per request: resolve + rebuild {old * 1e6:.1f} us -> injected {new * 1e6:.2f} us")
+    sys.exit(1 if calls else 0)
+
+
+if __name__ == "__main__":
+    main()
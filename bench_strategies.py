@@ -0,0 +1,73 @@
+"""
+Scaling benchmark for the process-pool strategy executor.
+
+Hundreds of bots run a deliberately CPU-heavy rule (per-bot Monte Carlo
+over the feature matrix) inline and then on pools of increasing size. The
+output shows rounds per second against the worker count; with one worker
+per core the speed-up should be close to the number of cores.
+
+    python bench_strategies.py --bots 400 --rounds 5
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from knowledge_center import MarketSnapshot
+from strategies import RSI_Bot, evaluate_bots
+from strategy_executor import StrategyExecutor
+
+
+class HeavyBot(RSI_Bot):
+    WORK = 20000
+
+    @classmethod
+    def vector_rule(cls, X, n_bots, rng):
+        prices = np.nan_to_num(X[:, 0])
+        for _ in range(n_bots):
+            paths = prices * np.exp(np.cumsum(rng.normal(0, 0.01, (cls.WORK // max(len(prices), 1), len(prices))), axis=0))
+            paths.mean(axis=0)
+        return super().vector_rule(X, n_bots, rng)
+
+
+def snapshot(symbols, version):
+    rng = np.random.default_rng(version)
+    prices = {f"S{i}": float(p) for i, p in enumerate(rng.uniform(20, 100, symbols))}
+    indicators = {s: {"rsi": float(rng.uniform(10, 90)), "macd_cross": 0, "trend_cross": 0, "bb_lower": None,
+                      "bb_upper": None, "ema20": None, "ema50": None, "swing_high": None, "swing_low": None}
+                  for s in prices}
+    return MarketSnapshot(prices, version=version, indicators=indicators)
+
+
+def timed(evaluate, bots, rounds, symbols):
+    evaluate(bots, snapshot(symbols, 0))  # warm-up (pool start, imports)
+    started = time.perf_counter()
+    for version in range(1, rounds + 1):
+        evaluate(bots, snapshot(symbols, version))
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bots", type=int, default=400)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    # Pool workers import the strategy class by module name, never from __main__
+    from bench_strategies import HeavyBot
+    bots = [HeavyBot(f"heavy-{i}", "", "", "", "", "", "") for i in range(args.bots)]
+    base = timed(evaluate_bots, bots, args.rounds, args.symbols)
+    print(f"inline     : {base * 1000:8.1f} ms/round")
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        executor = StrategyExecutor(workers=workers, deadline=600, inline_below=0)
+        took = timed(executor.evaluate, bots, args.rounds, args.symbols)
+        executor.close()
+        print(f"{workers:3d} workers: {took * 1000:8.1f} ms/round  x{base / took:.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Event-driven bot scheduler.
+
+The engine thread blocks in KnowledgeCenter.wait_for_market() and runs one
+evaluation round per new MarketSnapshot version. Versions published while
+a round is running are folded into the next round. A bot joins a round
+only when both of these hold:
+
+- one of the symbols it subscribes to changed since it last looked, and
+- its cadence (minimum market-seconds between evaluations) has passed.
+
+Bots held back only by their cadence get a timed wake-up, so they still
+see the latest prices without waiting for the next tick. While the
+challenge is inactive or the market is closed, the thread sleeps until the
+next session opens and does no work. It re-checks at least every
+IDLE_CHECK seconds so clock or provider changes are picked up.
+"""
+import math
+import time
+
+
+class BotScheduler:
+    IDLE_CHECK = 60.0  # longest sleep (wall seconds) between market-hours checks
+
+    def __init__(self, kc, cm, bots, evaluate, on_signal, market_hours=True, clock=time.monotonic):
+        """
+        Args:
+            kc: KnowledgeCenter publishing the snapshots
+            cm: ChallengeManager (inactive challenge / disqualified bots pause trading)
+            bots: the strategies to schedule
+            evaluate: (bots, snapshot) -> [(bot, signal)], e.g. StrategyExecutor.evaluate
+            on_signal: called as on_signal(bot, signal, snapshot) for every signal
+            market_hours: only trade while MarketService.get_market_status() is OPEN
+            clock: monotonic time source (wall seconds)
+        """
+        self.kc = kc
+        self.cm = cm
+        self.bots = bots
+        self.evaluate = evaluate
+        self.on_signal = on_signal
+        self.market_hours = market_hours
+        self.clock = clock
+        self.last_run = {}  # bot_id -> clock() of its last evaluation
+        self.rounds = 0
+        self._running = False
+
+    def _speed(self):
+        return getattr(self.kc.market_service.provider, "speed", 1.0) or 1.0
+
+    def idle_for(self):
+        """Wall seconds to sleep before trading is possible again (0: trade now)."""
+        if not self.cm.is_active:
+            return self.IDLE_CHECK
+        if not self.market_hours:
+            return 0.0
+        closed_for = self.kc.market_service.seconds_until_open()
+        self.kc.market_status = "CLOSED" if closed_for else "OPEN"
+        return min(closed_for / self._speed(), self.IDLE_CHECK)
+
+    def due(self, snapshot, now):
+        """(bots to evaluate now, wall seconds until a cadence-held bot is due, or None)."""
+        speed = self._speed()
+        ready, wake = [], None
+        for bot in self.bots:
+            if self.cm.bot_scores.get(bot.bot_id, {}).get("status") == "DISQUALIFIED":
+                continue
+            # Nothing new for this bot since its last look
+            if not snapshot.changed_since(bot.last_seen_version, bot.symbols):
+                continue
+            wait = self.last_run.get(bot.bot_id, -math.inf) + bot.cadence / speed - now
+            if wait > 0:
+                wake = wait if wake is None else min(wake, wait)
+                continue
+            ready.append(bot)
+        return ready, wake
+
+    def run_round(self, snapshot):
+        """Evaluates every due bot against snapshot; returns the cadence wake-up (or None)."""
+        now = self.clock()
+        ready, wake = self.due(snapshot, now)
+        if not ready:
+            return wake
+        for bot in ready:
+            bot.last_seen_version = snapshot.version
+            self.last_run[bot.bot_id] = now
+        self.rounds += 1
+        for bot, signal in self.evaluate(ready, snapshot):
+            self.on_signal(bot, signal, snapshot)
+        return wake
+
+    def run_forever(self):
+        """Blocking entry point for the engine thread."""
+        self._running = True
+        seen, wake = -1, None
+        while self._running:
+            idle = self.idle_for()
+            if idle > 0:
+                time.sleep(idle)
+                continue
+            snapshot = self.kc.wait_for_market(seen, timeout=min(wake or self.IDLE_CHECK, self.IDLE_CHECK))
+            if snapshot.version == seen and wake is None:
+                continue  # Periodic market-hours check, nothing to do
+            seen = snapshot.version
+            if not snapshot:
+                continue
+            try:
+                wake = self.run_round(snapshot)
+            except Exception as e:
+                print(f"[Scheduler] Round failed: {e}")
+                wake = None
+
+    def stop(self):
+        self._running = False
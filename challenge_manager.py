@@ -1,12 +1,75 @@
+import bisect
 import datetime
+import threading
 from knowledge_center import KnowledgeCenter
 
+class Leaderboard:
+    """
+    Bots kept sorted by PnL (descending) as the scores change.
+    
+    Sort keys live in a bisect-ordered list, so moving one bot or asking for
+    its rank costs O(log n) comparisons. Rendered rows are cached per bot and
+    the full ranking is cached per version, so polling at an unchanged
+    version is free.
+    """
+    def __init__(self, render):
+        self.render = render # (bot_id, stats) -> row dict
+        self.keys = [] # sorted (-pnl, order, bot_id)
+        self.key_of = {} # bot_id -> its key in self.keys
+        self.rows = {} # bot_id -> rendered row
+        self.version = 0
+        self._cached = (None, [])
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self.keys, self.key_of, self.rows = [], {}, {}
+            self.version += 1
+
+    def update(self, bot_id, stats):
+        with self._lock:
+            old = self.key_of.get(bot_id)
+            order = old[1] if old else len(self.key_of) # Ties keep insertion order
+            key = (-stats["pnl"], order, bot_id)
+            if old is not None:
+                del self.keys[bisect.bisect_left(self.keys, old)]
+            bisect.insort(self.keys, key)
+            self.key_of[bot_id] = key
+            self.rows[bot_id] = self.render(bot_id, stats)
+            self.version += 1
+
+    def rank(self, bot_id):
+        """1-based rank of bot_id, or None if it is not ranked."""
+        with self._lock:
+            key = self.key_of.get(bot_id)
+            return bisect.bisect_left(self.keys, key) + 1 if key else None
+
+    def top(self, limit):
+        """The first `limit` rows in O(limit)."""
+        with self._lock:
+            return [self.rows[key[2]] for key in self.keys[:limit]]
+
+    def ranking(self):
+        """The full ranking for the current version (shared, treat as read-only)."""
+        with self._lock:
+            version, rows = self._cached
+            if version != self.version:
+                rows = [self.rows[key[2]] for key in self.keys]
+                self._cached = (self.version, rows)
+            return rows
+
 class ChallengeManager:
-    def __init__(self):
-        self.kc = KnowledgeCenter()
+    PUSH_LIMIT = 50 # Leaderboard rows included in each pushed update
+
+    def __init__(self, kc=None):
+        self.kc = kc if kc is not None else KnowledgeCenter()
         self.start_date = None
         self.end_date = None
-        self.bot_scores = {} # BotID -> {pnl: 0.0, trades: 0, wins: 0}
+        self.bot_scores = {} # BotID -> {pnl: 0.0, trades: 0, wins: 0}, written through to storage
+        self.storage = self.kc.storage
+        self.bot_meta = {} # BotID -> static display fields merged into leaderboard rows
+        self.leaderboard = Leaderboard(self._leaderboard_row)
+        self.events = self.kc.events
         self.is_active = False
 
     def start_new_challenge(self):
@@ -23,9 +86,31 @@ class ChallengeManager:
         
         for bot_id in bot_ids:
             self.bot_scores[bot_id] = {"pnl": 0.0, "trades": 0, "wins": 0, "status": "ACTIVE"}
+        self.storage.start_challenge(self.start_date, self.end_date, self.bot_scores)
+        self._rank_all()
             
         print(f"Challenge Started: {self.start_date} to {self.end_date}")
 
+    def resume_challenge(self):
+        """Picks the stored challenge back up after a restart; False if none is still running."""
+        window = self.storage.load_challenge()
+        if window is None or window[1] <= datetime.datetime.now():
+            return False
+        scores = self.storage.load_scores()
+        if not scores:
+            return False
+        self.start_date, self.end_date = window
+        self.bot_scores = scores
+        self.is_active = True
+        self._rank_all()
+        print(f"Challenge Resumed: {self.start_date} to {self.end_date}")
+        return True
+
+    def _rank_all(self):
+        self.leaderboard.clear()
+        for bot_id, stats in self.bot_scores.items():
+            self.leaderboard.update(bot_id, stats)
+
     def update_score(self, bot_id, pnl):
         """Updates the score for a bot after a closed trade."""
         if not self.is_active or bot_id not in self.bot_scores:
@@ -39,30 +124,65 @@ class ChallengeManager:
         stats["trades"] += 1
         if pnl > 0:
             stats["wins"] += 1
+        self.storage.save_score(bot_id, stats)
+        self.leaderboard.update(bot_id, stats)
+        self._push_leaderboard(bot_id)
             
     def disqualify_bot(self, bot_id, reason):
         """Investigator calls this to kick a bot out."""
         if bot_id in self.bot_scores:
             self.bot_scores[bot_id]["status"] = "DISQUALIFIED"
+            self.storage.save_score(bot_id, self.bot_scores[bot_id])
+            self.leaderboard.update(bot_id, self.bot_scores[bot_id])
+            self._push_leaderboard(bot_id)
             print(f"BOT {bot_id} DISQUALIFIED: {reason}")
 
+    def mirror_state(self, scores, start_date, end_date, is_active):
+        """Adopts the engine process's challenge (web workers); only moved bots are re-ranked."""
+        if start_date != self.start_date or set(scores) != set(self.bot_scores):
+            # A new challenge: rank everyone from scratch
+            self.bot_scores = {}
+            self.leaderboard.clear()
+        self.start_date, self.end_date, self.is_active = start_date, end_date, is_active
+        for bot_id, stats in scores.items():
+            if self.bot_scores.get(bot_id) != stats:
+                self.bot_scores[bot_id] = stats
+                self.leaderboard.update(bot_id, stats)
+                self._push_leaderboard(bot_id)
+
+    def _push_leaderboard(self, bot_id):
+        """Pushes the moved bot, its rank and the top of the ranking to live subscribers."""
+        self.events.publish("leaderboard", {
+            "version": self.leaderboard.version,
+            "changed": self.leaderboard.rows[bot_id],
+            "rank": self.leaderboard.rank(bot_id),
+            "leaderboard": self.leaderboard.top(self.PUSH_LIMIT)
+        })
+
+    def set_bot_metadata(self, bot_meta):
+        """Static per-bot display fields (name, bio, ...) included in every leaderboard row."""
+        self.bot_meta = bot_meta
+        for bot_id, stats in self.bot_scores.items():
+            self.leaderboard.update(bot_id, stats)
+
+    def _leaderboard_row(self, bid, stats):
+        return {
+            "id": bid,
+            "pnl": round(stats["pnl"], 2),
+            "profit_pct": round((stats["pnl"] / 100000) * 100, 2), # Assuming 100k capital
+            "balance": round(100000 + stats["pnl"], 2),
+            "trades": stats["trades"],
+            "wins": stats["wins"],
+            "losses": stats["trades"] - stats["wins"],
+            "win_rate": round((stats["wins"] / stats["trades"] * 100), 1) if stats["trades"] > 0 else 0,
+            "status": stats["status"],
+            **self.bot_meta.get(bid, {})
+        }
+
     def get_leaderboard(self):
-        """Returns bots sorted by PnL."""
-        # Convert dict to list
-        ranking = []
-        for bid, stats in self.bot_scores.items():
-            ranking.append({
-                "id": bid,
-                "pnl": round(stats["pnl"], 2),
-                "profit_pct": round((stats["pnl"] / 100000) * 100, 2), # Assuming 100k capital
-                "balance": round(100000 + stats["pnl"], 2),
-                "trades": stats["trades"],
-                "wins": stats["wins"],
-                "losses": stats["trades"] - stats["wins"],
-                "win_rate": round((stats["wins"] / stats["trades"] * 100), 1) if stats["trades"] > 0 else 0,
-                "status": stats["status"]
-            })
-        
-        # Sort by PnL descending
-        ranking.sort(key=lambda x: x["pnl"], reverse=True)
-        return ranking
+        """Returns bots sorted by PnL (cached until a score changes; do not mutate)."""
+        return self.leaderboard.ranking()
+
+    def get_rank(self, bot_id):
+        """1-based leaderboard position of a bot in O(log n)."""
+        return self.leaderboard.rank(bot_id)
@@ -0,0 +1,4 @@
+# Runs before pytest imports any test module
+import scratch_data
+
+scratch_data.isolate(prefix="tasi_tests_")
@@ -0,0 +1,210 @@
+"""
+Copy-trading fan-out: approved bot trades flow into every follower's portfolio.
+
+Each robot has a FollowerBook: the reverse index robot_id -> users, with
+the followers' allocation and the profit and trade count not yet flushed
+held in parallel NumPy arrays. An approved trade is applied to the whole
+book in one vectorized step. Its return (trade PnL over the bot's
+challenge capital) is scaled by each follower's allocation, so a trade
+fanning out to 100k followers costs a few array operations, not 100k
+dict updates.
+
+The portfolios catch up in `flush()`. It runs on a background thread
+every `flush_interval` seconds (write-behind), takes the pending figures
+of robots that traded and adds them to the stored portfolio rows in one
+read-modify-write transaction, so changes other workers made to the same
+portfolios in the meantime are kept. If the write fails the figures go
+back into the books for the next flush.
+
+Membership and allocations come from the portfolios themselves
+(`track()`), including those written by other workers, which the
+PortfolioManager picks up from storage.
+"""
+import threading
+import time
+
+import numpy as np
+
+
+class FollowerBook:
+    """Followers of one robot as parallel arrays (swap-remove keeps them dense).
+
+    profit and trades are what the robot's trades added since the last flush.
+    """
+
+    def __init__(self, capacity=16):
+        self.users = []
+        self.rows = {}  # user_id -> row
+        self.allocated = np.zeros(capacity)
+        self.profit = np.zeros(capacity)
+        self.trades = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.users)
+
+    def _grow(self):
+        capacity = len(self.allocated) * 2
+        for name in ("allocated", "profit", "trades"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def add(self, user_id, allocated):
+        """Adds a follower, or updates the allocation of an existing one."""
+        row = self.rows.get(user_id)
+        if row is None:
+            if len(self.users) == len(self.allocated):
+                self._grow()
+            row = self.rows[user_id] = len(self.users)
+            self.users.append(user_id)
+            self.profit[row] = 0.0
+            self.trades[row] = 0
+        self.allocated[row] = allocated
+
+    def remove(self, user_id):
+        row = self.rows.pop(user_id, None)
+        if row is None:
+            return
+        last = len(self.users) - 1
+        if row != last:
+            moved = self.users[last]
+            self.users[row] = moved
+            self.rows[moved] = row
+            for column in (self.allocated, self.profit, self.trades):
+                column[row] = column[last]
+        self.users.pop()
+
+    def apply(self, trade_return):
+        """Applies one closed trade to every follower; returns the profit deltas."""
+        n = len(self.users)
+        delta = self.allocated[:n] * trade_return
+        self.profit[:n] += delta
+        self.trades[:n] += 1
+        return delta
+
+    def take(self):
+        """{user_id: (profit, trades)} pending for followers that traded; resets them to zero."""
+        n = len(self.users)
+        hit = np.flatnonzero(self.trades[:n])
+        pending = dict(zip([self.users[i] for i in hit],
+                           zip(self.profit[hit].tolist(), self.trades[hit].tolist())))
+        self.profit[:n] = 0.0
+        self.trades[:n] = 0
+        return pending
+
+    def give_back(self, pending):
+        """Re-adds figures returned by take() (a failed flush) for users still following."""
+        for user_id, (profit, trades) in pending.items():
+            row = self.rows.get(user_id)
+            if row is not None:
+                self.profit[row] += profit
+                self.trades[row] += trades
+
+
+class CopyTradingEngine:
+    def __init__(self, portfolio_manager, base_capital=100000, flush_interval=1.0):
+        """
+        Args:
+            portfolio_manager: the PortfolioManager whose portfolios copy the bots
+            base_capital: bot capital a trade's PnL is measured against
+            flush_interval: seconds between write-behind flushes
+        """
+        self.pm = portfolio_manager
+        self.base_capital = base_capital
+        self.flush_interval = flush_interval
+        self.books = {}  # robot_id -> FollowerBook
+        self._dirty = set()  # robots whose books moved since the last flush
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    # --- Reverse index maintenance (called by PortfolioManager) ---
+
+    def rebuild(self, portfolios):
+        """Builds every book from {user_id: portfolio} (startup)."""
+        with self._lock:
+            self.books = {}
+            for user_id, portfolio in portfolios.items():
+                for robot_id, allocated in _followed(portfolio).items():
+                    self._book(robot_id).add(user_id, allocated)
+
+    def track(self, user_id, portfolio):
+        """Makes the books match one user's portfolio (robots followed and their allocations)."""
+        followed = _followed(portfolio)
+        with self._lock:
+            for robot_id, book in self.books.items():
+                if robot_id not in followed:
+                    book.remove(user_id)
+            for robot_id, allocated in followed.items():
+                self._book(robot_id).add(user_id, allocated)
+
+    def _book(self, robot_id):
+        book = self.books.get(robot_id)
+        if book is None:
+            book = self.books[robot_id] = FollowerBook()
+        return book
+
+    def followers(self, robot_id):
+        with self._lock:
+            book = self.books.get(robot_id)
+            return list(book.users) if book else []
+
+    # --- Fan-out ---
+
+    def on_trade(self, robot_id, pnl):
+        """Applies a bot's approved trade to all its followers; returns how many were hit."""
+        with self._lock:
+            book = self.books.get(robot_id)
+            if not book:
+                return 0
+            book.apply(pnl / self.base_capital)
+            self._dirty.add(robot_id)
+            return len(book)
+
+    def flush(self):
+        """Adds the pending follower figures to the stored portfolios; returns how many users changed."""
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                # Take the pending figures so trades keep landing while we write
+                batches = {robot_id: book.take() for robot_id, book in
+                           ((r, self.books.get(r)) for r in dirty) if book}
+
+            results = {}  # user_id -> {robot_id: (profit, trades)}
+            for robot_id, pending in batches.items():
+                for user_id, figures in pending.items():
+                    results.setdefault(user_id, {})[robot_id] = figures
+            if not results:
+                return 0
+            try:
+                self.pm._apply_copy_results(results)
+            except BaseException:
+                with self._lock:
+                    for robot_id, pending in batches.items():
+                        book = self.books.get(robot_id)
+                        if book is not None:
+                            book.give_back(pending)
+                            self._dirty.add(robot_id)
+                raise
+            return len(results)
+
+    def start(self):
+        """Starts the write-behind flush thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="copy-trading-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[CopyTrading] Flush failed: {e}")
+
+
+def _followed(portfolio):
+    """{robot_id: allocated_balance} of the active robots a portfolio copies."""
+    return {robot['robot_id']: robot['allocated_balance']
+            for robot in portfolio.get('copied_robots', []) if robot.get('is_active', True)}
@@ -0,0 +1,127 @@
+"""
+In-process publish/subscribe bus behind the /api/stream Server-Sent Events
+endpoint.
+
+Publishers (KnowledgeCenter, ChallengeManager, the bot engine) call
+`publish(topic, data)`. The event is encoded once into an SSE frame and
+appended to the queue of every subscriber interested in that topic. Each
+queue is bounded, and when a slow client falls behind the oldest frames
+are dropped. The client is then told how many it missed (a `lagged`
+event) so it can resync with a single fetch. Publishing never blocks on
+a client.
+
+A subscriber waits either on a thread (`get`) or on an asyncio event loop
+(`next`), so a stream served by the ASGI app costs no thread at all.
+"""
+import asyncio
+import datetime
+import json
+import threading
+from collections import deque
+
+TOPICS = ("market", "leaderboard", "verdict", "trade")
+
+
+def _encode(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+class Subscription:
+    def __init__(self, topics, maxlen=256):
+        self.topics = frozenset(topics)
+        self.queue = deque(maxlen=maxlen)
+        self.dropped = 0
+        self._cond = threading.Condition()
+        self._wake = None  # set while next() waits: wakes its event loop
+
+    def push(self, frame):
+        with self._cond:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1  # deque drops the oldest frame for us
+            self.queue.append(frame)
+            self._cond.notify()
+            wake = self._wake
+        if wake is not None:
+            try:
+                wake()
+            except RuntimeError:
+                pass  # the waiting loop has closed
+
+    def get(self, timeout=None):
+        """Waits for frames and returns them all as one bytes blob (b"" on timeout)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.queue, timeout)
+            return self._drain()
+
+    async def next(self, timeout=None):
+        """get() for asyncio: waits on the running event loop instead of blocking a thread."""
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        with self._cond:
+            if self.queue:
+                return self._drain()
+            self._wake = lambda: loop.call_soon_threadsafe(ready.set)
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._wake = None
+        with self._cond:
+            return self._drain()
+
+    def _drain(self):
+        frames = list(self.queue)
+        self.queue.clear()
+        dropped, self.dropped = self.dropped, 0
+        if dropped:
+            frames.insert(0, f"event: lagged\ndata: {dropped}\n\n".encode())
+        return b"".join(frames)
+
+
+class EventBus:
+    def __init__(self):
+        self.subscriptions = set()
+        self.seq = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics=TOPICS, maxlen=256):
+        sub = Subscription([t for t in topics if t in TOPICS] or TOPICS, maxlen)
+        with self._lock:
+            self.subscriptions.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self.subscriptions.discard(sub)
+
+    def publish(self, topic, data):
+        """Sends one event to every subscriber of topic; returns how many got it."""
+        with self._lock:
+            targets = [s for s in self.subscriptions if topic in s.topics]
+            if not targets:
+                return 0
+            self.seq += 1
+            seq = self.seq
+        payload = json.dumps(data, default=_encode, ensure_ascii=False)
+        frame = f"id: {seq}\nevent: {topic}\ndata: {payload}\n\n".encode("utf-8")
+        for sub in targets:
+            sub.push(frame)
+        return len(targets)
+
+
+_bus_instance = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """The process-wide EventBus."""
+    global _bus_instance
+    if _bus_instance is None:
+        with _bus_lock:
+            if _bus_instance is None:
+                _bus_instance = EventBus()
+    return _bus_instance
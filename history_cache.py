@@ -0,0 +1,150 @@
+"""
+Tiered OHLCV history cache used by MarketService.get_history.
+
+Tier 1 is an in-memory LRU of DataFrames, tier 2 is a pickle per
+(symbol, period, interval) on disk so restarts start warm. Stale entries
+are refreshed incrementally: only bars from the last cached bar onward
+are downloaded and merged in. Concurrent misses for the same key wait on
+a single fetch instead of each hitting the provider.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from market_providers import PERIODS
+
+
+class HistoryCache:
+    def __init__(self, fetch, cache_dir=os.path.join("data", "history_cache"), max_entries=64, ttl=60):
+        """
+        Args:
+            fetch: callable(ticker_sym, period, interval, start=None) -> DataFrame
+            cache_dir: directory for the on-disk tier (None disables it)
+            max_entries: size of the in-memory LRU tier
+            ttl: seconds a cached frame is served before an incremental refresh
+        """
+        self.fetch = fetch
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self.entries = OrderedDict()  # key -> {'frame': DataFrame, 'checked_at': float}
+        self._lock = threading.Lock()
+        self._pending = {}  # key -> threading.Event for the fetch in progress
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "incremental": 0, "full": 0, "coalesced": 0}
+
+    def get(self, ticker_sym, period="1mo", interval="1d"):
+        key = (ticker_sym, period, interval)
+        while True:
+            with self._lock:
+                entry = self.entries.get(key)
+                if entry and time.time() - entry['checked_at'] < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry['frame']
+
+                waiter = self._pending.get(key)
+                if waiter is None:
+                    # This thread does the fetch; others wait for it
+                    waiter = self._pending[key] = threading.Event()
+                    break
+                self.stats["coalesced"] += 1
+                if entry:
+                    # A refresh is already running; the slightly stale frame will do
+                    return entry['frame']
+            waiter.wait()
+            with self._lock:
+                entry = self.entries.get(key)
+            if entry:
+                return entry['frame']
+            # The leader's fetch failed; retry (possibly as the new leader)
+
+        try:
+            frame = self._refresh(key, entry)
+        finally:
+            with self._lock:
+                self._pending.pop(key).set()
+        return frame
+
+    def _refresh(self, key, entry):
+        ticker_sym, period, interval = key
+        cached = entry['frame'] if entry else self._load(key)
+        if entry is None and cached is not None:
+            self.stats["disk_hits"] += 1
+
+        if cached is not None and not cached.empty:
+            # Only ask for bars from the last one we have (it may still be forming)
+            try:
+                fresh = self.fetch(ticker_sym, period, interval, start=cached.index[-1])
+            except Exception as e:
+                # Provider hiccup: keep serving what we have
+                print(f"[HistoryCache] Incremental refresh failed for {key}: {e}")
+                fresh = None
+            frame = self._merge(cached, fresh, period)
+            self.stats["incremental"] += 1
+        else:
+            frame = self.fetch(ticker_sym, period, interval)
+            self.stats["full"] += 1
+
+        if frame is None or frame.empty:
+            return frame if frame is not None else pd.DataFrame()
+
+        with self._lock:
+            self.entries[key] = {'frame': frame, 'checked_at': time.time()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        if frame is not cached:
+            self._save(key, frame)
+        return frame
+
+    @staticmethod
+    def _merge(cached, fresh, period):
+        if fresh is None or fresh.empty:
+            return cached
+        merged = pd.concat([cached, fresh])
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        window = PERIODS.get(period)
+        if window is not None:
+            merged = merged[merged.index >= merged.index[-1] - window]
+        return merged
+
+    def _path(self, key):
+        for part in key:
+            # Keys reach us from request parameters; never let one leave cache_dir
+            if not part or "/" in part or "\\" in part or "\0" in part or part in (".", ".."):
+                raise ValueError(f"Unsafe history cache key {key!r}")
+        ticker_sym, period, interval = key
+        return self.cache_dir / f"{ticker_sym}_{period}_{interval}.pkl"
+
+    def _load(self, key):
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            return pd.read_pickle(path)
+        except Exception as e:
+            print(f"[HistoryCache] Dropping unreadable {path}: {e}")
+            return None
+
+    def _save(self, key, frame):
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            frame.to_pickle(tmp)
+            os.replace(tmp, path)  # atomic: readers never see a half-written file
+        except Exception as e:
+            print(f"[HistoryCache] Could not persist {key}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
@@ -0,0 +1,198 @@
+"""
+Streaming technical indicator engine.
+
+Each symbol keeps a small incremental state that is advanced once per
+market refresh in O(1): Wilder RSI(14), MACD(12, 26, 9), Bollinger
+bands(20, 2), EMA 20/50, the average observed price and a rolling swing
+high/low for the Fibonacci bot. After every update the engine publishes a
+frozen {symbol: {indicator: value}} view that all bots share read-only.
+
+Values are None until an indicator has seen enough ticks to warm up.
+"""
+import math
+from collections import deque
+from types import MappingProxyType
+
+
+class EMA:
+    def __init__(self, period):
+        self.alpha = 2.0 / (period + 1)
+        self.value = None
+
+    def update(self, x):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class RollingExtreme:
+    """Rolling max (or min) over the last `window` values via a monotonic deque."""
+    def __init__(self, window, highest=True):
+        self.window = window
+        self.highest = highest
+        self.items = deque()  # (position, value)
+        self.position = 0
+
+    def update(self, x):
+        better = (lambda a, b: a >= b) if self.highest else (lambda a, b: a <= b)
+        while self.items and better(x, self.items[-1][1]):
+            self.items.pop()
+        self.items.append((self.position, x))
+        if self.items[0][0] <= self.position - self.window:
+            self.items.popleft()
+        self.position += 1
+        return self.items[0][1]
+
+
+class SymbolIndicators:
+    RSI_PERIOD = 14
+    BB_PERIOD = 20
+    BB_WIDTH = 2.0
+    SWING_WINDOW = 50
+
+    def __init__(self):
+        self.ticks = 0
+        self.last_price = None
+
+        # RSI (Wilder smoothing, seeded with a simple average)
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.rsi = None
+
+        # MACD
+        self.ema12 = EMA(12)
+        self.ema26 = EMA(26)
+        self.signal_ema = EMA(9)
+        self.macd_hist = None
+        self.macd_cross = 0  # +1 bullish / -1 bearish on the tick it happens
+
+        # Trend EMAs
+        self.ema20 = EMA(20)
+        self.ema50 = EMA(50)
+        self.trend_cross = 0  # price crossing EMA 50
+
+        # Bollinger (running sums over a fixed window)
+        self.window = deque(maxlen=self.BB_PERIOD)
+        self.win_sum = 0.0
+        self.win_sumsq = 0.0
+        self.bollinger = None
+
+        # Average of every observed price (providers give no volume, so no VWAP)
+        self.price_sum = 0.0
+
+        self.swing_high = RollingExtreme(self.SWING_WINDOW, highest=True)
+        self.swing_low = RollingExtreme(self.SWING_WINDOW, highest=False)
+        self.high = self.low = None
+
+    def update(self, price):
+        price = float(price)
+        prev = self.last_price
+        self.ticks += 1
+
+        # RSI
+        if prev is not None:
+            change = price - prev
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            n = self.RSI_PERIOD
+            if self.ticks <= n + 1:
+                self.avg_gain += gain / n
+                self.avg_loss += loss / n
+            else:
+                self.avg_gain = (self.avg_gain * (n - 1) + gain) / n
+                self.avg_loss = (self.avg_loss * (n - 1) + loss) / n
+            if self.ticks > n:
+                if self.avg_loss == 0:
+                    self.rsi = 50.0 if self.avg_gain == 0 else 100.0
+                else:
+                    self.rsi = 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+        # MACD
+        macd = self.ema12.update(price) - self.ema26.update(price)
+        signal = self.signal_ema.update(macd)
+        hist = macd - signal
+        self.macd_cross = 0
+        if self.ticks > 26 and self.macd_hist is not None:
+            if self.macd_hist <= 0 < hist:
+                self.macd_cross = 1
+            elif self.macd_hist >= 0 > hist:
+                self.macd_cross = -1
+        self.macd_hist = hist
+        self.macd = macd
+        self.macd_signal = signal
+
+        # Trend
+        prev_ema50 = self.ema50.value
+        self.ema20.update(price)
+        self.ema50.update(price)
+        self.trend_cross = 0
+        if prev is not None and self.ticks > 50:
+            if prev <= prev_ema50 and price > self.ema50.value:
+                self.trend_cross = 1
+            elif prev >= prev_ema50 and price < self.ema50.value:
+                self.trend_cross = -1
+
+        # Bollinger
+        if len(self.window) == self.window.maxlen:
+            old = self.window[0]
+            self.win_sum -= old
+            self.win_sumsq -= old * old
+        self.window.append(price)
+        self.win_sum += price
+        self.win_sumsq += price * price
+        if len(self.window) == self.BB_PERIOD:
+            n = self.BB_PERIOD
+            mid = self.win_sum / n
+            std = math.sqrt(max(self.win_sumsq / n - mid * mid, 0.0))
+            self.bollinger = (mid - self.BB_WIDTH * std, mid, mid + self.BB_WIDTH * std)
+
+        # Average price
+        self.price_sum += price
+
+        self.high = self.swing_high.update(price)
+        self.low = self.swing_low.update(price)
+        self.last_price = price
+
+    def values(self):
+        warmed_macd = self.ticks >= 26
+        lower, mid, upper = self.bollinger or (None, None, None)
+        return {
+            "price": self.last_price,
+            "ticks": self.ticks,
+            "rsi": round(self.rsi, 2) if self.rsi is not None else None,
+            "macd": self.macd if warmed_macd else None,
+            "macd_signal": self.macd_signal if warmed_macd else None,
+            "macd_hist": self.macd_hist if warmed_macd else None,
+            "macd_cross": self.macd_cross,
+            "ema20": self.ema20.value if self.ticks >= 20 else None,
+            "ema50": self.ema50.value if self.ticks >= 50 else None,
+            "trend_cross": self.trend_cross,
+            "bb_lower": lower,
+            "bb_mid": mid,
+            "bb_upper": upper,
+            "avg_price": self.price_sum / self.ticks,
+            "swing_high": self.high if self.ticks >= self.SWING_WINDOW else None,
+            "swing_low": self.low if self.ticks >= self.SWING_WINDOW else None,
+            "recent": tuple(self.window)[-10:],
+        }
+
+
+class IndicatorEngine:
+    def __init__(self):
+        self.states = {}
+        self.view = MappingProxyType({})
+
+    def update(self, prices):
+        """Advances every symbol in {symbol: price} by one tick; returns the new frozen view."""
+        view = dict(self.view)
+        for symbol, price in prices.items():
+            if price is None:
+                continue
+            state = self.states.get(symbol)
+            if state is None:
+                state = self.states[symbol] = SymbolIndicators()
+            state.update(price)
+            view[symbol] = MappingProxyType(state.values())
+        self.view = MappingProxyType(view)
+        return self.view
+
+    def get(self, symbol):
+        return self.view.get(symbol)
@@ -1,9 +1,13 @@
 from knowledge_center import KnowledgeCenter
-import random
+import numpy as np
 
 class InvestigatorBot:
-    def __init__(self, challenge_manager):
-        self.kc = KnowledgeCenter()
+    RANDOM_AUDIT = 0.1 # Share of otherwise clean signals rejected by spot checks
+    MAX_PRICE_DIFF = 0.05 # > 5% difference is suspicious
+    MAX_RSI_DIFF = 1.0
+
+    def __init__(self, challenge_manager, kc=None):
+        self.kc = kc if kc is not None else KnowledgeCenter()
         self.cm = challenge_manager
         self.name = "المحقق كونان" # Or just "Investigator"
 
@@ -15,64 +19,84 @@ class InvestigatorBot:
         # Fetch market data if not provided
         if market_data is None:
             market_data = self.kc.get_market_snapshot()
-            
-        current_price = market_data.get(signal['symbol'])
-        # Logic:
-        # 1. Check if price matches market data (Anti-cheat)
-        # 2. Check strategy logic (Simulated)
-        # 3. Disqualify if too many bad trades
-        
+        return self.check_batch([(signal, market_data)])[0]
+
+    def check_batch(self, batch):
+        """
+        Audits [(signal, market_data)] in one pass; returns the verdicts in order.
         
-        # 1. Price Reality Check
-        if not current_price:
-            return "REJECTED (Symbol Not Found)"
-            
-        diff = abs(current_price - signal['price']) / current_price
-        if diff > 0.05: # > 5% difference is suspicious
-            return "REJECTED (Price Mismatch > 5%)"
-            
-        # 2. Evidence Audit (New Feature)
-        evidence = signal.get('evidence')
-        if evidence:
-            ev_type = evidence.get('type')
-            ev_data = evidence.get('data', {})
-            
-            audit_steps = []
-            
-            if ev_type == 'technical':
-                # Audit Technical Indicators
-                indicators = ev_data.get('indicators', {})
-                rsi = indicators.get('RSI (14)')
-                if rsi:
-                    if signal['type'] == 'BUY' and rsi > 40: # Suspicious, usually buy at <30
-                         audit_steps.append({"check": "قيمة مؤشر RSI", "status": "WARN", "note": f"القيمة {rsi} مرتفعة قليلاً للشراء"})
-                    else:
-                         audit_steps.append({"check": "قيمة مؤشر RSI", "status": "PASS", "note": "في مناطق التشبع"})
-                else:
-                    audit_steps.append({"check": "المؤشرات الفنية", "status": "PASS", "note": "تتوافق مع شروط الدخول"})
-                    
-                audit_steps.append({"check": "اكتمال الشمعة", "status": "PASS", "note": "تم الإغلاق فوق الدعم"})
+        The numeric checks (price reality, RSI evidence, sentiment, random
+        audit) run as array operations over the whole batch; only the
+        human-readable audit trail is built per signal.
+        """
+        n = len(batch)
+        if not n:
+            return []
+        signals = [signal for signal, _ in batch]
+        evidence = [signal.get('evidence') or {} for signal in signals]
+        kinds = [ev.get('type') for ev in evidence]
+        data = [ev.get('data') or {} for ev in evidence]
+        is_buy = np.array([signal['type'] == 'BUY' for signal in signals])
 
-            elif ev_type == 'volume':
-                # Audit Volume
-                audit_steps.append({"check": "تحليل تدفق السيولة", "status": "PASS", "note": ev_data.get('flow_net')})
-                audit_steps.append({"check": "فحص دفتر الأوامر", "status": "PASS", "note": "طلبات شراء حقيقية (غير وهمية)"})
-                
-            else: # Sentiment
-                sentiment = ev_data.get('sentiment_score', 0.5)
-                action = signal['type']
-                if action == 'BUY' and sentiment < 0.5:
-                     return "REJECTED (Sentiment Mismatch)"
-                audit_steps.append({"check": "تحليل المشاعر", "status": "PASS", "note": f"التوافق: {int(sentiment*100)}%"})
+        # 1. Price Reality Check (Anti-cheat)
+        current = np.array([market_data.get(signal['symbol']) or np.nan for signal, market_data in batch], dtype=float)
+        claimed = np.array([signal['price'] for signal in signals], dtype=float)
+        missing = ~(current > 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            diff = np.abs(current - claimed) / current
+        price_mismatch = ~missing & (diff > self.MAX_PRICE_DIFF)
+
+        # 2. Evidence Audit: the claimed RSI against the shared indicator engine
+        claimed_rsi = np.array([(d.get('indicators') or {}).get('RSI (14)') or np.nan if kind == 'technical' else np.nan
+                                for kind, d in zip(kinds, data)], dtype=float)
+        live_rsi = np.array([((getattr(market_data, 'indicators', {}).get(signal['symbol']) or {}).get('rsi'))
+                             for signal, market_data in batch], dtype=float)
+        with np.errstate(invalid="ignore"):
+            rsi_mismatch = np.abs(live_rsi - claimed_rsi) > self.MAX_RSI_DIFF
+        sentiment = np.array([d.get('sentiment_score', 0.5) if ev and kind not in ('technical', 'volume') else np.nan
+                              for ev, kind, d in zip(evidence, kinds, data)], dtype=float)
+        with np.errstate(invalid="ignore"):
+            sentiment_mismatch = is_buy & (sentiment < 0.5)
 
-            # Common checks
-            audit_steps.append({"check": "تحقق السعر العادل", "status": "PASS", "note": f"الفارق {diff*100:.2f}% مقبول"})
-            
-            signal['audit_trail'] = audit_steps
-        
         # 3. Random Audit
-        if random.random() < 0.1:
-            return "REJECTED (Random Audit Check)"
-            
-        return "APPROVED"
+        spot_check = np.random.random(n) < self.RANDOM_AUDIT
+
+        verdicts = np.select(
+            [missing, price_mismatch, rsi_mismatch, sentiment_mismatch, spot_check],
+            ["REJECTED (Symbol Not Found)", "REJECTED (Price Mismatch > 5%)", "REJECTED (RSI Evidence Mismatch)",
+             "REJECTED (Sentiment Mismatch)", "REJECTED (Random Audit Check)"],
+            "APPROVED").tolist()
+
+        # Audit trail for signals whose evidence passed
+        passed_evidence = ~(missing | price_mismatch | rsi_mismatch | sentiment_mismatch)
+        for i in np.flatnonzero(passed_evidence).tolist():
+            if evidence[i]:
+                signals[i]['audit_trail'] = self._audit_trail(signals[i], kinds[i], data[i], claimed_rsi[i], diff[i])
+        return verdicts
+
+    def _audit_trail(self, signal, ev_type, ev_data, rsi, diff):
+        audit_steps = []
+        if ev_type == 'technical':
+            # Audit Technical Indicators
+            if not np.isnan(rsi):
+                if signal['type'] == 'BUY' and rsi > 40: # Suspicious, usually buy at <30
+                    audit_steps.append({"check": "قيمة مؤشر RSI", "status": "WARN", "note": f"القيمة {rsi:g} مرتفعة قليلاً للشراء"})
+                else:
+                    audit_steps.append({"check": "قيمة مؤشر RSI", "status": "PASS", "note": "في مناطق التشبع"})
+            else:
+                audit_steps.append({"check": "المؤشرات الفنية", "status": "PASS", "note": "تتوافق مع شروط الدخول"})
+
+            audit_steps.append({"check": "اكتمال الشمعة", "status": "PASS", "note": "تم الإغلاق فوق الدعم"})
+
+        elif ev_type == 'volume':
+            # Audit Volume
+            audit_steps.append({"check": "تحليل تدفق السيولة", "status": "PASS", "note": ev_data.get('flow_net')})
+            audit_steps.append({"check": "فحص دفتر الأوامر", "status": "PASS", "note": "طلبات شراء حقيقية (غير وهمية)"})
+
+        else: # Sentiment
+            sentiment = ev_data.get('sentiment_score', 0.5)
+            audit_steps.append({"check": "تحليل المشاعر", "status": "PASS", "note": f"التوافق: {int(sentiment*100)}%"})
 
+        # Common checks
+        audit_steps.append({"check": "تحقق السعر العادل", "status": "PASS", "note": f"الفارق {diff*100:.2f}% مقبول"})
+        return audit_steps
@@ -0,0 +1,179 @@
+"""
+Append-only write-ahead journal for signals and verdicts.
+
+Layout under the journal directory:
+
+    segment-<seq>.jsonl     one JSON record per line: {"kind": ..., "data": ...}
+    checkpoint-<seq>.json   full state; replay continues from segment <seq>
+
+`append` only copies the record into an in-memory batch, so the caller
+pays microseconds. A writer thread drains the batch every
+`flush_interval` seconds with one write and one fsync (group commit).
+When a segment grows past `segment_bytes` the journal rotates to a new
+one and writes a checkpoint, after which older segments are deleted, so
+startup replays one checkpoint plus a short tail. After each commit the
+batch is handed to `on_commit` (e.g. the SQLite storage) off the caller's
+thread.
+
+Replay is idempotent: a record may appear both in a checkpoint and in
+the segment after it, so applying it twice must be harmless.
+"""
+import atexit
+import datetime
+import json
+import os
+import threading
+from pathlib import Path
+
+
+def _encode(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _seq(path):
+    return int(path.stem.split("-")[1])
+
+
+class Journal:
+    def __init__(self, root=os.path.join("data", "journal"), segment_bytes=4 * 1024 * 1024,
+                 flush_interval=0.05, fsync=True, on_commit=None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.on_commit = on_commit
+
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._state = None  # callable returning the checkpoint state
+        self._segment = None
+        self._seq = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _segments(self):
+        return sorted(self.root.glob("segment-*.jsonl"), key=_seq)
+
+    def _checkpoints(self):
+        return sorted(self.root.glob("checkpoint-*.json"), key=_seq)
+
+    def recover(self):
+        """Returns (checkpoint state or None, [(kind, data), ...] written after it)."""
+        state, start = None, 0
+        for path in reversed(self._checkpoints()):
+            try:
+                state = json.loads(path.read_text(encoding="utf-8"))
+                start = _seq(path)
+                break
+            except (OSError, ValueError):
+                continue  # Torn checkpoint: fall back to an older one
+
+        tail = []
+        for path in self._segments():
+            if _seq(path) < start:
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # Torn final write from a crash
+                    tail.append((record["kind"], record["data"]))
+
+        segments = self._segments()
+        self._seq = max([_seq(p) for p in segments] + [start - 1]) + 1
+        return state, tail
+
+    def start(self, state):
+        """Starts the writer thread; `state()` produces the checkpoint contents."""
+        self._state = state
+        with self._write_lock:
+            self._open_segment()
+        self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _open_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+        self._segment = open(self.root / f"segment-{self._seq:08d}.jsonl", "a", encoding="utf-8")
+
+    def append(self, kind, data):
+        """Queues one record for the next group commit (a shallow copy is taken)."""
+        with self._pending_lock:
+            self._pending.append((kind, dict(data)))
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[Journal] Flush failed: {e}")
+
+    def flush(self):
+        """Writes every queued record in one batch and fsyncs it."""
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        with self._write_lock:
+            if self._segment is None:
+                return 0
+            lines = "".join(json.dumps({"kind": kind, "data": data}, default=_encode, ensure_ascii=False) + "\n"
+                            for kind, data in batch)
+            self._segment.write(lines)
+            self._segment.flush()
+            if self.fsync:
+                os.fsync(self._segment.fileno())
+            if self._segment.tell() >= self.segment_bytes:
+                self._rotate()
+        if self.on_commit is not None:
+            try:
+                self.on_commit(batch)
+            except Exception as e:
+                # The journal already holds the batch; the next startup re-applies its tail
+                print(f"[Journal] on_commit failed: {e}")
+        return len(batch)
+
+    def checkpoint(self):
+        """Rotates to a fresh segment and writes the full state, dropping older files."""
+        self.flush()
+        with self._write_lock:
+            if self._segment is not None:
+                self._rotate()
+
+    def _rotate(self):
+        self._seq += 1
+        self._open_segment()
+        if self._state is None:
+            return
+        # Anything logged from here on also lands in the new segment, so the
+        # checkpoint may overlap the tail; replay is idempotent.
+        path = self.root / f"checkpoint-{self._seq:08d}.json"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._state(), f, default=_encode, ensure_ascii=False)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+        for old in self._segments() + self._checkpoints():
+            if _seq(old) < self._seq:
+                old.unlink(missing_ok=True)
+
+    def close(self):
+        atexit.unregister(self.close)
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        # A final checkpoint keeps the next startup's replay short
+        self.checkpoint()
+        with self._write_lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
@@ -1,9 +1,66 @@
 import datetime
-from collections import deque
-import time
+from collections.abc import Mapping
+from types import MappingProxyType
+import os
 import threading
 from market_service import MarketService
 from news_service import NewsService
+from signal_registry import IndexedLog, SignalRegistry
+from journal import Journal
+from storage import get_storage
+from event_bus import get_event_bus
+from indicators import IndicatorEngine
+from tick_store import TickStore
+
+class MarketSnapshot(Mapping):
+    """
+    Immutable {symbol: price} view of the market at one point in time.
+    
+    Every publish creates a new snapshot with a higher version, so readers
+    can iterate freely and cheaply tell whether anything changed.
+    `indicators` is the IndicatorEngine view computed from the same prices;
+    `symbol_versions` maps each symbol to the version its price last
+    changed in; `derived` holds values computed from the snapshot once and
+    then reused (e.g. the strategies' feature matrix).
+    """
+    __slots__ = ("_prices", "version", "timestamp", "indicators", "symbol_versions", "derived")
+
+    def __init__(self, prices, version=0, timestamp=None, indicators=None, symbol_versions=None):
+        self._prices = MappingProxyType(dict(prices))
+        self.version = version
+        self.timestamp = timestamp or datetime.datetime.now()
+        self.indicators = indicators if indicators is not None else MappingProxyType({})
+        self.symbol_versions = MappingProxyType(
+            symbol_versions if symbol_versions is not None else dict.fromkeys(self._prices, version))
+        self.derived = {}
+
+    def changed_since(self, version, symbols=None):
+        """True if any of `symbols` (default: all) changed after `version` (None: never seen)."""
+        if version is None:
+            return True
+        if symbols is None:
+            return self.version > version
+        return any(self.symbol_versions.get(s, -1) > version for s in symbols)
+
+    def __getitem__(self, symbol):
+        return self._prices[symbol]
+
+    def __iter__(self):
+        return iter(self._prices)
+
+    def __len__(self):
+        return len(self._prices)
+
+    def __repr__(self):
+        return f"MarketSnapshot(v{self.version}, {dict(self._prices)})"
+
+    def to_dict(self):
+        return dict(self._prices)
+
+def _restored(record):
+    """A signal/verdict read back from JSON, with its timestamp parsed."""
+    record['timestamp'] = datetime.datetime.fromisoformat(record['timestamp'])
+    return record
 
 class KnowledgeCenter:
     _instance = None
@@ -14,50 +71,85 @@ class KnowledgeCenter:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = super(KnowledgeCenter, cls).__new__(cls)
-                    cls._instance.market_data = {}
-                    cls._instance.bot_signals = deque(maxlen=100)
-                    cls._instance.investigator_logs = deque(maxlen=50)
+                    cls._instance.market_data = MarketSnapshot({})
+                    cls._instance._market_lock = threading.Lock()
+                    # Wakes the bot scheduler the moment a new snapshot is published
+                    cls._instance._market_changed = threading.Condition(cls._instance._market_lock)
+                    # Indexed by id, bot, symbol and status; ids never repeat
+                    cls._instance.bot_signals = SignalRegistry(maxlen=int(os.getenv('SIGNAL_RETENTION', 100)))
+                    # Verdicts keyed by the signal they judge
+                    cls._instance.investigator_logs = IndexedLog(
+                        maxlen=int(os.getenv('VERDICT_RETENTION', 50)), key="signal_id", indexes=("bot_id",))
+                    # Queryable SQLite store shared by all workers (WAL mode)
+                    cls._instance.storage = get_storage()
+                    # Signals and verdicts survive restarts: checkpoint + tail replay,
+                    # each group commit is then written through to the storage.
+                    # Only the engine opens it (start_recording); web workers mirror its state
+                    cls._instance.journal = Journal(os.getenv('JOURNAL_DIR', os.path.join('data', 'journal')),
+                                                    on_commit=cls._instance.storage.apply_journal)
                     # Real Services
                     cls._instance.market_service = MarketService()
                     cls._instance.news_service = NewsService()
+                    # Every observed price is appended here for replay/backtests (by the engine only)
+                    cls._instance.tick_store = TickStore(os.getenv('TICK_STORE_DIR', os.path.join('data', 'ticks')),
+                                                         writable=False)
+                    # Live deltas pushed to /api/stream subscribers
+                    cls._instance.events = get_event_bus()
+                    # Streaming RSI/MACD/Bollinger/EMA state shared by all bots
+                    cls._instance.indicators = IndicatorEngine()
                     
                     # TASI Tickers to track
                     cls._instance.tickers = ["1120.SR", "2222.SR", "2010.SR", "7010.SR", "4030.SR", "1180.SR"] # Added .SR for yfinance
                     
                     # Initialize with mock data to prevent blocking
                     import random
-                    for ticker in cls._instance.tickers:
-                        cls._instance.market_data[ticker] = random.uniform(20.0, 100.0)
+                    cls._instance.publish_market_data(
+                        {ticker: random.uniform(20.0, 100.0) for ticker in cls._instance.tickers},
+                        record=False)
                         
                     cls._instance.market_status = "OPEN"
         return cls._instance
         
-    def update_market_data(self):
-        """Fetches REAL data from MarketService."""
-        new_data = {}
-        print("[KC] Starting market data fetch...") 
-        for ticker in self.tickers:
-            try:
-                price = self.market_service.get_current_price(ticker)
-                print(f"[KC] Fetched {ticker}: {price}") 
-                if price:
-                    new_data[ticker] = price
-            except Exception as e:
-                print(f"[KC] Error fetching {ticker}: {e}") 
+    def publish_market_data(self, prices, record=True):
+        """Builds the next snapshot from fresh prices and swaps it in atomically.
         
-        if new_data:
-            cleaned_data = {k: v for k, v in new_data.items() if v is not None}
-            self.market_data.update(cleaned_data)
-            print(f"[KC] Data Updated: {self.market_data}") 
-        else:
-            print("[KC] No data fetched in this cycle.") 
+        With record=True the prices that moved are real observations: they
+        advance the indicator engine and, once this process records (see
+        start_recording), are appended to the tick store. A
+        price the provider cache hands back again is not a new tick. Only
+        symbols whose price moved get a new symbol version; if none moved,
+        nothing is published and the current snapshot is returned.
+        """
+        with self._market_lock:
+            current = self.market_data
+            changed = {symbol: price for symbol, price in prices.items() if current.get(symbol) != price}
+            if not changed:
+                return current
+            merged = current.to_dict()
+            merged.update(changed)
+            indicators = self.indicators.update(changed) if record else current.indicators
+            version = current.version + 1
+            symbol_versions = dict(current.symbol_versions)
+            symbol_versions.update(dict.fromkeys(changed, version))
+            # Readers holding the old snapshot keep a consistent view
+            snapshot = MarketSnapshot(merged, version=version, indicators=indicators,
+                                      symbol_versions=symbol_versions)
+            self.market_data = snapshot
+            self._market_changed.notify_all()
             
-        return self.market_data
+        if record and self.tick_store.writable:
+            try:
+                self.tick_store.append(changed, snapshot.timestamp.timestamp())
+            except Exception as e:
+                print(f"[KC] Tick store append failed: {e}")
+        # Only the moved prices go out; a page applies them over its last snapshot
+        self.events.publish("market", {"version": snapshot.version, "prices": changed})
+        return snapshot
 
     def log_signal(self, bot_id, symbol, signal_type, price, reason):
         """Log a raw signal from a bot."""
         signal = {
-            "id": len(self.bot_signals) + 1,
+            "id": self.bot_signals.next_id(),
             "timestamp": datetime.datetime.now(),
             "bot_id": bot_id,
             "symbol": symbol,
@@ -67,44 +159,120 @@ class KnowledgeCenter:
             "status": "PENDING" # Pending Investigator review
         }
         self.bot_signals.append(signal)
+        self.journal.append("signal", signal)
         return signal
 
     def log_investigator_verdict(self, signal_id, verdict, message):
-        """Log the investigator's decision."""
-        # Find signal
-        for sig in self.bot_signals:
-            if sig['id'] == signal_id:
-                # Update market data
-                self.update_market_data()
-                    
-                # Simulate slight delay to respect API limits
-                time.sleep(10) 
-                sig['status'] = verdict # 'APPROVED' or 'REJECTED'
-                log_entry = {
-                    "timestamp": datetime.datetime.now(),
-                    "signal_id": signal_id,
-                    "verdict": verdict,
-                    "message": message,
-                    "bot_id": sig['bot_id']
-                }
-                self.investigator_logs.appendleft(log_entry)
-                return log_entry
-        return None
+        """Log the investigator's decision (O(1), never touches the network)."""
+        sig = self.bot_signals.update(signal_id, status=verdict) # 'APPROVED' or 'REJECTED'
+        if sig is None:
+            return None
+            
+        log_entry = {
+            "timestamp": datetime.datetime.now(),
+            "signal_id": signal_id,
+            "verdict": verdict,
+            "message": message,
+            "bot_id": sig['bot_id']
+        }
+        self.investigator_logs.append(log_entry)
+        self.journal.append("verdict", log_entry)
+        self.events.publish("verdict", log_entry)
+        return log_entry
+
+    def start_recording(self):
+        """Makes this process the writer; only the engine process may call this.
+        
+        Replays the journal (what the previous engine wrote), starts journaling
+        new records and opens the tick store for appends. Until then the
+        journal and tick files are never written, so web workers can open
+        them next to a running engine.
+        """
+        self._restore_journal()
+        self.journal.start(self._journal_state)
+        self.tick_store.open_for_append()
+
+    def mirror_logs(self, signals, verdicts, publish=True):
+        """Adopts the engine's latest signals and verdicts (web workers, oldest first)."""
+        for signal in signals:
+            self.bot_signals.append(_restored(signal))
+        for log_entry in verdicts:
+            new = log_entry['signal_id'] not in self.investigator_logs
+            self.investigator_logs.append(_restored(log_entry))
+            if new and publish:
+                self.events.publish("verdict", log_entry)
+
+    def _journal_state(self):
+        """Checkpoint contents: everything still retained plus the id counter."""
+        signals = list(self.bot_signals)
+        return {
+            "next_id": max([s['id'] for s in signals], default=0) + 1,
+            "signals": signals,
+            "verdicts": list(self.investigator_logs),
+        }
+
+    def _restore_journal(self):
+        """Rebuilds signals, verdicts and their indexes from the journal."""
+        state, tail = self.journal.recover()
+        state = state or {}
+        for signal in state.get('signals', []):
+            self.bot_signals.append(_restored(signal))
+        for log_entry in state.get('verdicts', []):
+            self.investigator_logs.append(_restored(log_entry))
+
+        next_id = state.get('next_id', 1)
+        for kind, record in tail:
+            if kind == "signal":
+                self.bot_signals.append(_restored(record))
+                next_id = max(next_id, record['id'] + 1)
+            elif kind == "verdict" and self.bot_signals.update(record['signal_id'], status=record['verdict']):
+                self.investigator_logs.append(_restored(record))
+        self.bot_signals.reset_ids(next_id)
+        # The storage may have missed the last batches before a crash
+        self.storage.apply_journal(tail)
+        if state or tail:
+            print(f"[KC] Restored {len(self.bot_signals)} signals and {len(self.investigator_logs)} verdicts from journal")
+
+    def get_signal(self, signal_id):
+        return self.bot_signals.get(signal_id)
+
+    def get_verdict(self, signal_id):
+        return self.investigator_logs.get(signal_id)
+
+    def get_approved_signals(self, limit=None):
+        """Approved signals, newest (highest id) first."""
+        return self.bot_signals.select("status", "APPROVED", newest_first=True, limit=limit)
 
     def get_latest_logs(self, limit=10):
-        return list(self.investigator_logs)[:limit]
+        return self.investigator_logs.latest(limit)
 
-    def get_bot_history(self, bot_id):
-        """Returns all signals and investigator logs for a specific bot."""
-        signals = [s for s in self.bot_signals if s['bot_id'] == bot_id]
+    def get_bot_history(self, bot_id, since=None, until=None, limit=None):
+        """Returns all signals and investigator logs for a specific bot.
+        
+        Without a time range this is served from the in-memory indexes (recent
+        retention only); with one it is an index range query on the storage.
+        """
+        if since is not None or until is not None:
+            return {
+                "signals": self.storage.signals("bot_id", bot_id, since, until, limit or 100)[::-1],
+                "logs": self.storage.verdicts(bot_id, since, until, limit or 100),
+            }
+        signals = self.bot_signals.select("bot_id", bot_id)
         
         # Get related logs
-        logs = [l for l in self.investigator_logs if l['bot_id'] == bot_id]
+        logs = self.investigator_logs.select("bot_id", bot_id, newest_first=True)
         
         return {
             "signals": signals,
-            "logs": list(logs)
+            "logs": logs
         }
 
     def get_market_snapshot(self):
+        """Returns the current immutable MarketSnapshot."""
         return self.market_data
+
+    def wait_for_market(self, after_version, timeout=None):
+        """Blocks until a snapshot newer than after_version exists (or timeout); returns the current one."""
+        with self._market_changed:
+            self._market_changed.wait_for(lambda: self.market_data.version > after_version, timeout)
+            return self.market_data
@@ -1,22 +1,38 @@
-from flask import Flask, render_template, jsonify, request
-from knowledge_center import KnowledgeCenter
-from challenge_manager import ChallengeManager
+from flask import Flask, Response, render_template, jsonify, request
+from app_context import AppContext
+from chart_serializer import encode_candles
+from market_poller import MarketPoller
+from market_providers import INTERVALS, PERIODS
 from news_service import news_service
+from tick_store import BAR_RULES
+import datetime
+import hashlib
 import threading
-import time
 import random
 import os
-from portfolio_manager import portfolio_manager
+from shared_state import EngineLease, SharedState, StatePublisher, StateFollower
 from news_analyzer import get_analyzer
 from news_fetcher import get_fetcher
 from onesignal_service import get_onesignal_service
 
 app = Flask(__name__)
 
-# Initialize Core Systems
-kc = KnowledgeCenter()
-cm = ChallengeManager()
-cm.start_new_challenge()
+# Initialize Core Systems (built once, injected everywhere)
+ctx = AppContext.create()
+kc, cm, portfolio_manager = ctx.kc, ctx.cm, ctx.portfolios
+# Exactly one gunicorn worker runs the simulation; the others mirror its state.
+# The lease sits next to the database the workers share.
+engine_lease = EngineLease(os.path.join(os.path.dirname(os.getenv('DB_PATH', os.path.join('data', 'tasi.db'))),
+                                        'engine.lock'))
+shared_state = SharedState()
+state_publisher = StatePublisher(shared_state, kc, cm)
+state_follower = StateFollower(shared_state, kc, cm)
+if engine_lease.acquire():
+    # A restart inside the challenge window keeps the scores earned so far
+    if not cm.resume_challenge():
+        cm.start_new_challenge()
+# Static bot profile fields ride along in the cached leaderboard rows
+cm.set_bot_metadata(ctx.bot_metadata())
 
 # Initialize OneSignal (optional - only if keys provided)
 try:
@@ -33,76 +49,85 @@ except Exception as e:
     onesignal = None
 
 def background_market_simulation():
-    """Background thread to keep market data updated."""
-    while True:
-        try:
-            kc.update_market_data()
-        except Exception as e:
-            print(f"Market Data Error: {e}")
-        time.sleep(10) # Wait 10 seconds between fetches
+    """Background thread running the asyncio market-data poller."""
+    # Refresh every 10 market-seconds (shorter when replaying faster)
+    poller = MarketPoller(kc, interval=10 / kc.market_service.provider.speed)
+    poller.run_forever()
 
 def background_bot_engine():
-    """Simulates bots analysing and trading."""
-    from strategies import get_all_bots
-    from investigator import InvestigatorBot
+    """Runs a round of bot analysis for every new market snapshot."""
+    from strategy_executor import StrategyExecutor
+    from bot_scheduler import BotScheduler
+    from audit_pipeline import AuditPipeline
     
-    bots = get_all_bots()
-    investigator = InvestigatorBot(cm)
+    executor = StrategyExecutor.from_env() # Process pool once the bot count makes it worthwhile
     
-    while True:
-        if not cm.is_active:
-            time.sleep(1)
-            continue
-            
-        # 1. Bots make decisions
-        for bot in bots:
-            # Skip if disqualified
-            if cm.bot_scores.get(bot.bot_id, {}).get("status") == "DISQUALIFIED":
-                continue
-                
-            market_data = kc.get_market_snapshot() # Get market data once per bot decision cycle
-            
-            if not market_data:
-                print("Waiting for market data...")
-                continue
-                
-            signal = bot.analyze(market_data)
-            if signal:
-                # Log Intent
-                logged_signal = kc.log_signal(bot.bot_id, signal['symbol'], signal['type'], signal['price'], signal['reason'])
-                
-                # 2. Investigator Review
-                # Note: check_signal now self-fetches market data if needed
-                verdict = investigator.check_signal(logged_signal.copy(), market_data)
-                
-                # Log Verdict
-                kc.log_investigator_verdict(logged_signal['id'], verdict, 
-                                          f"Review of {logged_signal['symbol']} signal")
-                if verdict == "APPROVED":
-                    # Random PnL for simulation (-500 to +1000)
-                    pnl = random.uniform(-500, 1000)
-                    cm.update_score(bot.bot_id, pnl)
-                    print(f"[TRADE] Trade Complete: {bot.name} ({bot.bot_id}) -> {signal['type']} {signal['symbol']} | PnL: {pnl:+.2f} SAR")
-                    
-                    # Send notification for winning trades
-                    if pnl > 0 and onesignal:
-                        try:
-                            onesignal.notify_winning_trade(
-                                robot_name=bot.name,
-                                symbol=logged_signal['symbol'],
-                                profit=pnl
-                            )
-                        except Exception as e:
-                            print(f"Notification error: {e}")
-
-        time.sleep(3) # Wait before next round of analysis
+    def on_signal(bot, signal, market_data):
+        # Log Intent
+        logged_signal = kc.log_signal(bot.bot_id, signal['symbol'], signal['type'], signal['price'], signal['reason'])
+
+        # Investigator Review runs in its own pipeline stage; the engine moves on to the next bot
+        audits.submit({**logged_signal, 'evidence': signal.get('evidence')}, market_data)
+
+    def on_verdict(signal, verdict, market_data):
+        # Log Verdict
+        if kc.log_investigator_verdict(signal['id'], verdict, f"Review of {signal['symbol']} signal") is None:
+            return # Signal already aged out of retention
+        if verdict == "APPROVED":
+            bot = ctx.get_bot(signal['bot_id'])
+            logged_signal = kc.get_signal(signal['id'])
+            # Random PnL for simulation (-500 to +1000)
+            pnl = random.uniform(-500, 1000)
+            cm.update_score(bot.bot_id, pnl)
+            # Fan the trade out to every portfolio copying this bot
+            followers = portfolio_manager.copy_engine.on_trade(bot.bot_id, pnl)
+            trade = {**logged_signal, "pnl": pnl, "followers": followers}
+            state_publisher.add_trade(trade)
+            kc.events.publish("trade", trade)
+            print(f"[TRADE] Trade Complete: {bot.name} ({bot.bot_id}) -> {logged_signal['type']} {logged_signal['symbol']} | PnL: {pnl:+.2f} SAR")
+
+            # Send notification for winning trades
+            if pnl > 0 and onesignal:
+                try:
+                    onesignal.notify_winning_trade(
+                        robot_name=bot.name,
+                        symbol=logged_signal['symbol'],
+                        profit=pnl
+                    )
+                except Exception as e:
+                    print(f"Notification error: {e}")
+
+    audits = AuditPipeline.from_env(ctx.investigator, on_verdict)
+    audits.start()
+
+    scheduler = BotScheduler(kc, cm, ctx.bots, executor.evaluate, on_signal,
+                             market_hours=os.getenv('BOT_MARKET_HOURS', 'True').lower() == 'true')
+    scheduler.run_forever()
+
+def start_engine(promoted=False):
+    """Starts the simulation threads in the worker holding the engine lease."""
+    kc.start_recording()
+    threading.Thread(target=background_market_simulation, name="market-simulation", daemon=True).start()
+    threading.Thread(target=background_bot_engine, name="bot-engine", daemon=True).start()
+    portfolio_manager.copy_engine.start() # Write-behind of copied trades into portfolios
+    state_publisher.start()
+    if promoted:
+        print(f"[Engine] Worker {os.getpid()} took over the engine")
+
+def _try_promote():
+    if not engine_lease.acquire():
+        return False
+    start_engine(promoted=True)
+    return True
 
 # Start background threads
-sim_thread = threading.Thread(target=background_market_simulation, daemon=True)
-bot_thread = threading.Thread(target=background_bot_engine, daemon=True)
-
-sim_thread.start()
-bot_thread.start()
+if engine_lease.held:
+    start_engine()
+else:
+    state_follower.poll()
+    state_follower.start(on_promote=_try_promote)
+portfolio_manager.start_sync(float(os.getenv('PORTFOLIO_SYNC_INTERVAL', 1))) # Portfolio writes from the other workers
+portfolio_manager.start_verifier(float(os.getenv('PORTFOLIO_VERIFY_INTERVAL', 300))) # Running sums vs full recompute
 
 @app.route('/')
 @app.route('/broadcast')
@@ -149,30 +174,24 @@ def portfolio_view():
 @app.route('/trades')
 def trades_view():
     # Pass trades directly to template as a fallback/initial state
-    from strategies import get_all_bots
-    bots_map = {b.bot_id: b for b in get_all_bots()}
-    
     trades = []
-    for signal in kc.bot_signals:
-        if signal.get('status') == 'APPROVED':
-            bot = bots_map.get(signal['bot_id'])
-            # Mock profit for display
-            is_buy = signal['type'] == 'BUY'
-            profit_pct = round(random.uniform(-2.0, 5.0), 2)
-            
-            trades.append({
-                'id': signal['id'],
-                'bot_id': signal['bot_id'],
-                'bot_name': bot.name if bot else 'Unknown',
-                'symbol': signal['symbol'],
-                'type': signal['type'],
-                'price': signal['price'],
-                'time': signal['timestamp'].strftime("%I:%M %p"),
-                'profit': profit_pct
-            })
+    # Approved signals straight from the status index, newest first
+    for signal in kc.get_approved_signals():
+        bot = ctx.get_bot(signal['bot_id'])
+        # Mock profit for display
+        profit_pct = round(random.uniform(-2.0, 5.0), 2)
+        
+        trades.append({
+            'id': signal['id'],
+            'bot_id': signal['bot_id'],
+            'bot_name': bot.name if bot else 'Unknown',
+            'symbol': signal['symbol'],
+            'type': signal['type'],
+            'price': signal['price'],
+            'time': signal['timestamp'].strftime("%I:%M %p"),
+            'profit': profit_pct
+        })
     
-    # Sort by ID descending (newest first)
-    trades.sort(key=lambda x: x['id'], reverse=True)
     return render_template('trades.html', trades=trades)
 
 @app.route('/reporter')
@@ -199,26 +218,19 @@ def robot_details_view(robot_id):
 def api_trade_details(signal_id):
     """Get details for a specific trade/signal"""
     # Find the signal
-    signal = None
-    for sig in kc.bot_signals:
-        if sig['id'] == signal_id:
-            signal = sig.copy()
-            break
-    
+    signal = kc.get_signal(signal_id)
     if not signal:
         return jsonify({'error': 'Trade not found'}), 404
+    signal = signal.copy()
     
     # Get bot info
-    from strategies import get_all_bots
-    bot = next((b for b in get_all_bots() if b.bot_id == signal['bot_id']), None)
+    bot = ctx.get_bot(signal['bot_id'])
     
     # Get investigator log for this signal
-    verdict_log = None
-    for log in kc.investigator_logs:
-        if log.get('signal_id') == signal_id:
-            verdict_log = log.copy()
-            verdict_log['timestamp'] = verdict_log['timestamp'].isoformat()
-            break
+    verdict_log = kc.get_verdict(signal_id)
+    if verdict_log:
+        verdict_log = verdict_log.copy()
+        verdict_log['timestamp'] = verdict_log['timestamp'].isoformat()
     
     # Format signal timestamp
     if 'timestamp' in signal:
@@ -276,7 +288,11 @@ def api_trade_details(signal_id):
     # 2. Generate Technical Proofs based on Bot Strategy (IN ARABIC)
     if bot:
         if 'RSI' in bot.strategy_title or 'Sniper' in bot.name or 'Wave' in bot.name:
-            rsi_val = random.uniform(25, 35) if signal['type'] == 'BUY' else random.uniform(65, 80)
+            # Live RSI from the indicator engine when it has warmed up
+            live = kc.get_market_snapshot().indicators.get(signal['symbol']) or {}
+            rsi_val = live.get('rsi')
+            if rsi_val is None:
+                rsi_val = random.uniform(25, 35) if signal['type'] == 'BUY' else random.uniform(65, 80)
             proofs = {
                 'primary_indicator': {'name': 'مؤشر القوة النسبية (RSI)', 'value': round(rsi_val, 2), 'status': 'تشبع بيعي (فرصة شراء)' if signal['type'] == 'BUY' else 'تشبع شرائي (فرصة بيع)'},
                 'secondary_indicator': {'name': 'مستوى الدعم', 'value': round(signal['price'] * 0.98, 2), 'status': 'ارتداد ناجح'},
@@ -353,54 +369,95 @@ def api_trade_details(signal_id):
 @app.route('/api/trades')
 def api_all_trades():
     """Get all approved trades with details"""
-    from strategies import get_all_bots
-    bots_map = {b.bot_id: b for b in get_all_bots()}
-    
     trades = []
-    for signal in kc.bot_signals:
-        if signal.get('status') == 'APPROVED':
-            bot = bots_map.get(signal['bot_id'])
-            trades.append({
-                'id': signal['id'],
-                'bot_id': signal['bot_id'],
-                'bot_name': bot.name if bot else 'Unknown',
-                'symbol': signal['symbol'],
-                'type': signal['type'],
-                'price': signal['price'],
-                'reason': signal.get('reason', ''),
-                'timestamp': signal['timestamp'].isoformat(),
-                'status': signal['status']
-            })
+    # Newest first, straight from the status index
+    for signal in kc.get_approved_signals():
+        bot = ctx.get_bot(signal['bot_id'])
+        trades.append({
+            'id': signal['id'],
+            'bot_id': signal['bot_id'],
+            'bot_name': bot.name if bot else 'Unknown',
+            'symbol': signal['symbol'],
+            'type': signal['type'],
+            'price': signal['price'],
+            'reason': signal.get('reason', ''),
+            'timestamp': signal['timestamp'].isoformat(),
+            'status': signal['status']
+        })
     
-    # Sort by timestamp descending (newest first)
-    trades.sort(key=lambda x: x['timestamp'], reverse=True)
     return jsonify(trades)
 
 
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+STREAM_PREAMBLE = b"retry: 3000\n\n" # reconnect delay for EventSource
+STREAM_KEEPALIVE = 15
+
+# Served here only without the ASGI entry point (python main.py, gthread workers):
+# every open stream then holds a thread, so keep some free for ordinary requests.
+# asgi.py answers /api/stream on its event loop instead, without this cap.
+_stream_slots = threading.BoundedSemaphore(int(os.getenv('SSE_MAX_STREAMS', 16)))
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events: ?topics=market,leaderboard,verdict,trade (default: all)."""
+    if not _stream_slots.acquire(blocking=False):
+        # live.js falls back to polling when the stream is refused
+        return jsonify({"error": "Too many live streams"}), 503, {'Retry-After': '30'}
+    subscription = kc.events.subscribe(request.args.get('topics', '').split(','))
+    
+    def stream():
+        try:
+            yield STREAM_PREAMBLE
+            while True:
+                # A comment line every 15s keeps proxies from closing an idle stream
+                yield subscription.get(timeout=STREAM_KEEPALIVE) or b": keepalive\n\n"
+        finally:
+            kc.events.unsubscribe(subscription)
+    
+    response = Response(stream(), mimetype='text/event-stream', headers=STREAM_HEADERS)
+    # Runs even if the client leaves before the generator starts
+    response.call_on_close(_stream_slots.release)
+    return response
+
+# /api/status is rendered once per state change: (key, body, etag)
+_status_cache = (None, b"", "")
+_status_lock = threading.Lock()
+
+def render_status():
+    """Serialized status payload and its content hash, rebuilt only when a version moved."""
+    global _status_cache
+    market = kc.get_market_snapshot()
+    key = (market.version, cm.leaderboard.version, kc.investigator_logs.version,
+           cm.is_active, cm.start_date, cm.end_date)
+    with _status_lock:
+        if _status_cache[0] != key:
+            body = app.json.dumps({
+                "market": market.to_dict(),
+                "market_version": market.version,
+                "leaderboard": cm.get_leaderboard(), # Already carries the bots' static metadata
+                "leaderboard_version": cm.leaderboard.version,
+                "investigator_logs": kc.get_latest_logs(),
+                "challenge_info": {
+                    "start": cm.start_date,
+                    "end": cm.end_date,
+                    "active": cm.is_active
+                }
+            }).encode('utf-8')
+            _status_cache = (key, body, hashlib.blake2b(body, digest_size=12).hexdigest())
+        return _status_cache[1], _status_cache[2]
+
 @app.route('/api/status')
 def api_status():
     """Returns the comprehensive state for the Broadcast View."""
-    # Merge Metadata with Live Stats
-    from strategies import get_all_bots
-    bots_meta = {b.bot_id: {"name": b.name, "human_name": b.human_name, "bio": b.bio, "risk": b.risk} for b in get_all_bots()}
-    
-    leaderboard = cm.get_leaderboard()
-    for entry in leaderboard:
-        # Inject static metadata
-        meta = bots_meta.get(entry['id'])
-        if meta:
-            entry.update(meta)
-            
-    return jsonify({
-        "market": kc.get_market_snapshot(),
-        "leaderboard": leaderboard,
-        "investigator_logs": kc.get_latest_logs(),
-        "challenge_info": {
-            "start": cm.start_date,
-            "end": cm.end_date,
-            "active": cm.is_active
-        }
-    })
+    body, etag = render_status()
+    # Unchanged polls get a bodyless 304; browsers revalidate because of no-cache
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 # News Analysis APIs
 @app.route('/api/news/analyzed')
@@ -496,7 +553,7 @@ def get_stock_news(stock_symbol):
 def get_portfolio_api():
     """Get user portfolio"""
     user_id = request.args.get('user_id', 'default_user')
-    portfolio = portfolio_manager.get_portfolio(user_id)
+    portfolio = portfolio_manager.get_portfolio_snapshot(user_id)
     return jsonify(portfolio)
 
 @app.route('/api/portfolio/add_robot', methods=['POST'])
@@ -536,10 +593,8 @@ def update_balance_api():
 @app.route('/api/robots')
 def get_robots_api():
     """Get all robots with their performance"""
-    from strategies import get_all_bots
-    
     # Get original bots
-    original_bots = get_all_bots()
+    original_bots = ctx.bots
     
     # Get performance data from leaderboard
     leaderboard = cm.get_leaderboard()
@@ -598,16 +653,14 @@ def api_news_latest():
 @app.route('/api/user/recommendations')
 def api_recommendations():
     """Returns only APPROVED signals for the User App."""
-    all_signals = kc.bot_signals
-    approved = [s for s in all_signals if s['status'] == 'APPROVED']
-    return jsonify(approved[-20:]) # Return last 20
+    approved = kc.get_approved_signals(limit=20) # Last 20, newest first
+    return jsonify(approved[::-1])
 
 @app.route('/api/bot/<bot_id>')
 def api_bot_details(bot_id):
     """Returns full details for a specific bot."""
     # Base Metadata
-    from strategies import get_all_bots
-    target_bot = next((b for b in get_all_bots() if b.bot_id == bot_id), None)
+    target_bot = ctx.get_bot(bot_id)
     
     if not target_bot:
         return jsonify({"error": "Bot not found"}), 404
@@ -615,8 +668,13 @@ def api_bot_details(bot_id):
     # Stats
     stats = cm.bot_scores.get(bot_id, {"pnl": 0, "trades": 0, "wins": 0})
     
-    # History & Credibility
-    history = kc.get_bot_history(bot_id)
+    # History & Credibility (?hours=N reads the full stored history for that window)
+    hours = request.args.get('hours', type=float)
+    if hours:
+        since = datetime.datetime.now() - datetime.timedelta(hours=hours)
+        history = kc.get_bot_history(bot_id, since=since)
+    else:
+        history = kc.get_bot_history(bot_id)
     
     # Calculate Balance (Base 100k + PnL)
     base_balance = 100000
@@ -637,7 +695,8 @@ def api_bot_details(bot_id):
             "trades": stats['trades'],
             "wins": stats['wins'],
             "balance": current_balance,
-            "initial_balance": base_balance
+            "initial_balance": base_balance,
+            "rank": cm.get_rank(bot_id)
         },
         "history": history
     })
@@ -665,31 +724,41 @@ def api_get_news_summary():
 
 @app.route('/api/chart/<symbol>')
 def api_get_chart(symbol):
-    # Fetch 6 months for better context
-    df = kc.market_service.get_history(symbol, period="6mo")
+    # 6 months of daily candles by default for better context
+    period = request.args.get('period', '6mo')
+    interval = request.args.get('interval', '1d')
+    layout = request.args.get('format', 'rows')
+    # Both end up in the history cache key and its file name
+    if period not in PERIODS or interval not in INTERVALS:
+        return jsonify({"error": "Unsupported period or interval",
+                        "periods": list(PERIODS), "intervals": list(INTERVALS)}), 400
+    
+    df = kc.market_service.get_history(symbol, period=period, interval=interval)
     if df.empty:
         return jsonify({"error": "No data"}), 404
         
-    # Clean data (remove NaNs which break charts)
-    df = df.dropna()
+    # Format for Lightweight Charts (NaN rows are dropped, they break charts)
+    intraday = interval not in ('1d', '5d', '1wk', '1mo', '3mo')
+    body = encode_candles(df, layout=layout, intraday=intraday)
+    return Response(body, mimetype='application/json')
+
+@app.route('/api/ticks/<symbol>')
+def api_get_ticks(symbol):
+    """Observed prices for a symbol from the tick store (start/end are epoch seconds)."""
+    start = request.args.get('start', type=float)
+    end = request.args.get('end', type=float)
+    rule = request.args.get('bars')
+    ticker_sym = symbol if symbol.endswith(".SR") else f"{symbol}.SR"
     
-    # Format for Lightweight Charts
-    data = []
-    for index, row in df.iterrows():
-        # Handle timezone-aware datetime
-        if hasattr(index, 'date'):
-            t_str = index.date().strftime('%Y-%m-%d')
-        else:
-            t_str = index.strftime('%Y-%m-%d')
+    if rule:
+        # e.g. ?bars=1min -> OHLC candles built from the raw ticks
+        if rule not in BAR_RULES:
+            return jsonify({"error": "Unsupported bars rule", "bars": list(BAR_RULES)}), 400
+        bars = kc.tick_store.ohlc(ticker_sym, rule=rule, start=start, end=end)
+        return Response(encode_candles(bars, layout='columnar', intraday=True), mimetype='application/json')
         
-        data.append({
-            "time": t_str,
-            "open": float(row['Open']),
-            "high": float(row['High']),
-            "low": float(row['Low']),
-            "close": float(row['Close'])
-        })
-    return jsonify(data)
+    stamps, prices = kc.tick_store.query(ticker_sym, start=start, end=end)
+    return jsonify({"time": stamps.tolist(), "price": prices.tolist()})
 
 @app.route('/design-studio')
 def design_studio_view():
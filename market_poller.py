@@ -0,0 +1,146 @@
+"""
+Asyncio market-data poller.
+
+Replaces the serial fetch-then-sleep loop: every tracked symbol has its
+own jittered refresh schedule, due symbols are fetched concurrently (in
+small batches) with a per-request timeout, and fresh prices are
+published into KnowledgeCenter in one atomic swap. Symbols that fall due
+shortly after a batch is cut ride along with it, so the jitter does not
+turn into one provider round trip per symbol. A slow or failing symbol
+only delays itself.
+"""
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MarketPoller:
+    def __init__(self, kc, interval=10.0, timeout=5.0, jitter=0.2,
+                 max_in_flight=4, batch_size=8, max_backoff=8, coalesce=None):
+        """
+        Args:
+            kc: KnowledgeCenter to read tickers from and publish prices into
+            interval: target seconds between refreshes of each symbol
+            timeout: seconds before a single fetch is abandoned
+            jitter: +/- fraction applied to every symbol's schedule
+            max_in_flight: cap on concurrent provider requests (backpressure)
+            batch_size: symbols due together are fetched in batches this big
+            max_backoff: largest multiple of interval a failing symbol waits
+            coalesce: symbols due within this many seconds join the current
+                batches (default: the full jitter spread, 2 * jitter * interval)
+        """
+        self.kc = kc
+        self.interval = interval
+        self.timeout = timeout
+        self.jitter = jitter
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.coalesce = 2 * jitter * interval if coalesce is None else coalesce
+
+        self.next_due = {}
+        self.backoff = {}
+        self.in_flight = set()
+        self.last_latency = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="market-poll")
+        self._running = False
+
+    def _schedule(self, symbol, now, failed=False):
+        """Sets the next due time for a symbol, backing off while it fails."""
+        if failed:
+            self.backoff[symbol] = min(self.backoff.get(symbol, 1) * 2, self.max_backoff)
+        else:
+            self.backoff[symbol] = 1
+        delay = self.interval * self.backoff[symbol]
+        self.next_due[symbol] = now + delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _fetch(self, batch, slots):
+        """Fetches one batch in the worker pool and publishes what came back."""
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        try:
+            future = loop.run_in_executor(self._executor, self.kc.market_service.get_current_prices, batch)
+        except RuntimeError:
+            # Executor already shut down (interpreter exiting)
+            slots.release()
+            self.in_flight.difference_update(batch)
+            return {}
+        # The slot and the batch's in-flight marks are only freed once the
+        # worker thread really finishes, so a hung provider throttles new
+        # requests instead of piling up threads.
+        def finished(_):
+            slots.release()
+            self.in_flight.difference_update(batch)
+        future.add_done_callback(finished)
+        try:
+            prices = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            print(f"[Poller] Timeout fetching {batch}")
+            prices = {}
+        except Exception as e:
+            print(f"[Poller] Error fetching {batch}: {e}")
+            prices = {}
+
+        now = time.monotonic()
+        for symbol in batch:
+            self.last_latency[symbol] = now - started
+            self._schedule(symbol, now, failed=symbol not in prices)
+
+        fresh = {k: v for k, v in prices.items() if v is not None}
+        if fresh:
+            self.kc.publish_market_data(fresh)
+        return fresh
+
+    async def _dispatch(self, slots):
+        """Starts a fetch task for every batch of due symbols."""
+        now = time.monotonic()
+        pending = {s: self.next_due.get(s, 0) for s in self.kc.tickers if s not in self.in_flight}
+        if not any(due_at <= now for due_at in pending.values()):
+            return []
+        due = [s for s, due_at in pending.items() if due_at <= now + self.coalesce]
+        tasks = []
+        for i in range(0, len(due), self.batch_size):
+            batch = due[i:i + self.batch_size]
+            # Blocks here while max_in_flight requests are outstanding
+            await slots.acquire()
+            self.in_flight.update(batch)
+            tasks.append(asyncio.create_task(self._fetch(batch, slots)))
+        return tasks
+
+    async def poll_once(self):
+        """Fetches every due symbol and waits for the results; returns the prices published."""
+        tasks = await self._dispatch(asyncio.Semaphore(self.max_in_flight))
+        fresh = {}
+        for result in await asyncio.gather(*tasks):
+            fresh.update(result)
+        return fresh
+
+    async def run(self):
+        self._running = True
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks = set()
+        # Spread the first round so symbols don't stay in lock-step
+        start = time.monotonic()
+        for symbol in self.kc.tickers:
+            self.next_due.setdefault(symbol, start + random.uniform(0, self.interval * self.jitter))
+
+        while self._running:
+            try:
+                for task in await self._dispatch(slots):
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            except Exception as e:
+                print(f"Market Data Error: {e}")
+
+            now = time.monotonic()
+            pending = [self.next_due.get(s, now) for s in self.kc.tickers if s not in self.in_flight]
+            wait = min(pending) - now if pending else self.interval
+            await asyncio.sleep(min(max(wait, 0.05), self.interval))
+
+    def run_forever(self):
+        """Blocking entry point for a background thread."""
+        asyncio.run(self.run())
+
+    def stop(self):
+        self._running = False
@@ -0,0 +1,237 @@
+"""
+Market data providers used behind MarketService.
+
+YFinanceProvider talks to Yahoo Finance. ReplayProvider streams recorded
+OHLCV/tick CSV files from disk on an accelerated clock so the bots, the
+investigator and the chart API can run (and be load-tested) offline.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+# Tadawul trades on Riyadh time, whatever the server's local zone is
+RIYADH = ZoneInfo("Asia/Riyadh")
+
+# yfinance style period strings -> lookback window (None = everything)
+PERIODS = {
+    "1d": timedelta(days=1),
+    "5d": timedelta(days=5),
+    "1mo": timedelta(days=31),
+    "3mo": timedelta(days=92),
+    "6mo": timedelta(days=183),
+    "1y": timedelta(days=366),
+    "2y": timedelta(days=731),
+    "5y": timedelta(days=1827),
+    "10y": timedelta(days=3653),
+    "max": None,
+}
+
+# yfinance style interval strings -> pandas resample rule
+INTERVALS = {
+    "1m": "1min", "2m": "2min", "5m": "5min", "15m": "15min", "30m": "30min",
+    "60m": "60min", "90m": "90min", "1h": "60min",
+    "1d": "1D", "5d": "5D", "1wk": "1W", "1mo": "1MS", "3mo": "3MS",
+}
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class MarketDataProvider:
+    """Interface every market data backend implements."""
+    name = "base"
+    # Seconds MarketService may cache a price fetched from this provider
+    cache_ttl = 60
+    # How much faster than wall-clock the provider's market time runs
+    speed = 1.0
+    # (requests per second, burst) enforced by MarketService; None = unlimited
+    rate_limit = (None, 1)
+
+    def get_prices(self, ticker_syms):
+        """Returns {ticker_sym: last price} for the symbols that have data."""
+        raise NotImplementedError
+
+    def get_history(self, ticker_sym, period="1mo", interval="1d", start=None):
+        """Returns an OHLCV DataFrame indexed by timestamp (empty if no data)."""
+        raise NotImplementedError
+
+    def now(self):
+        """Current market time as a naive Riyadh-local datetime."""
+        return datetime.now(RIYADH).replace(tzinfo=None)
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Live data from Yahoo Finance."""
+    name = "yfinance"
+    # Stay well inside Yahoo's unofficial limits
+    rate_limit = (float(os.getenv("MARKET_FETCH_RATE", "1")), 4)
+
+    def __init__(self):
+        import yfinance as yf
+        self.yf = yf
+
+    def get_prices(self, ticker_syms):
+        ticker_syms = list(ticker_syms)
+        prices = {}
+        if not ticker_syms:
+            return prices
+
+        # One request for every ticker instead of one per symbol
+        data = self.yf.download(ticker_syms, period="1d", progress=False, group_by="column")
+        if data.empty:
+            return prices
+
+        closes = data['Close']
+        if isinstance(closes, pd.Series):
+            # Single ticker downloads come back with flat columns
+            closes = closes.to_frame(ticker_syms[0])
+
+        for ticker_sym in ticker_syms:
+            if ticker_sym not in closes:
+                continue
+            series = closes[ticker_sym].dropna()
+            if not series.empty:
+                prices[ticker_sym] = series.iloc[-1]
+        return prices
+
+    def get_history(self, ticker_sym, period="1mo", interval="1d", start=None):
+        ticker = self.yf.Ticker(ticker_sym)
+        if start is not None:
+            return ticker.history(start=start, interval=interval)
+        return ticker.history(period=period, interval=interval)
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Replays recorded market data from a directory of CSV files.
+
+    Each file is named after its ticker (e.g. ``1120.SR.csv``) and holds
+    either OHLCV bars (yfinance ``to_csv`` layout) or raw ticks with a
+    ``price`` column. A virtual clock starts at the earliest recorded
+    timestamp and advances ``speed`` times faster than wall-clock time;
+    prices and history are only visible up to that clock, so consumers
+    see the market unfold exactly as it was recorded.
+    """
+    name = "replay"
+    cache_ttl = 0
+
+    def __init__(self, data_dir, speed=1.0, loop=True, start=None):
+        self.data_dir = Path(data_dir)
+        self.speed = float(speed)
+        self.loop = loop
+        self.frames = {}
+        for path in sorted(self.data_dir.glob("*.csv")):
+            frame = self._load(path)
+            if not frame.empty:
+                self.frames[path.name[:-len(".csv")]] = frame
+
+        if not self.frames:
+            raise ValueError(f"No replay files found in {self.data_dir}")
+
+        self.first = min(f.index[0] for f in self.frames.values())
+        self.last = max(f.index[-1] for f in self.frames.values())
+        self.origin = pd.Timestamp(start, tz="UTC") if start is not None else self.first
+        self.wall_origin = time.monotonic()
+
+    def _load(self, path):
+        frame = pd.read_csv(path, index_col=0)
+        frame.index = pd.to_datetime(frame.index, utc=True)
+        frame = frame.sort_index()
+
+        if "Close" not in frame.columns:
+            # Tick file: every tick is a flat one-price bar
+            price_col = next((c for c in frame.columns if c.lower() == "price"), None)
+            if price_col is None:
+                return pd.DataFrame()
+            price = frame[price_col].astype(float)
+            volume_col = next((c for c in frame.columns if c.lower() == "volume"), None)
+            frame = pd.DataFrame({
+                "Open": price, "High": price, "Low": price, "Close": price,
+                "Volume": frame[volume_col] if volume_col else 0,
+            })
+
+        for column in OHLCV_COLUMNS:
+            if column not in frame.columns:
+                frame[column] = frame["Close"] if column != "Volume" else 0
+        return frame[OHLCV_COLUMNS]
+
+    def clock(self):
+        """Current replay position as a UTC timestamp."""
+        elapsed = (time.monotonic() - self.wall_origin) * self.speed
+        position = self.origin + pd.Timedelta(seconds=elapsed)
+        if self.loop and position > self.last:
+            span = (self.last - self.first).total_seconds() or 1.0
+            offset = (position - self.first).total_seconds() % span
+            position = self.first + pd.Timedelta(seconds=offset)
+        return position
+
+    def now(self):
+        return self.clock().floor("us").tz_convert("Asia/Riyadh").to_pydatetime().replace(tzinfo=None)
+
+    def get_prices(self, ticker_syms):
+        position = self.clock()
+        prices = {}
+        for ticker_sym in ticker_syms:
+            frame = self.frames.get(ticker_sym)
+            if frame is None:
+                continue
+            idx = frame.index.searchsorted(position, side="right") - 1
+            if idx >= 0:
+                prices[ticker_sym] = float(frame["Close"].iloc[idx])
+        return prices
+
+    def get_history(self, ticker_sym, period="1mo", interval="1d", start=None):
+        frame = self.frames.get(ticker_sym)
+        if frame is None:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+        position = self.clock()
+        if start is not None:
+            begin = pd.Timestamp(start)
+            begin = begin.tz_localize("UTC") if begin.tzinfo is None else begin
+        else:
+            window = PERIODS.get(period)
+            begin = position - window if window is not None else frame.index[0]
+        visible = frame.loc[(frame.index >= begin) & (frame.index <= position)]
+
+        rule = INTERVALS.get(interval)
+        if rule and not visible.empty:
+            visible = visible.resample(rule).agg({
+                "Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum",
+            }).dropna(subset=["Close"])
+        return visible
+
+
+def record_history(symbols, out_dir, period="1mo", interval="1d", provider=None):
+    """Saves provider history for each symbol as a replay-ready CSV file."""
+    provider = provider or YFinanceProvider()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for symbol in symbols:
+        frame = provider.get_history(symbol, period=period, interval=interval)
+        if frame is None or frame.empty:
+            continue
+        path = out_dir / f"{symbol}.csv"
+        frame[[c for c in OHLCV_COLUMNS if c in frame.columns]].to_csv(path)
+        written.append(path)
+    return written
+
+
+def provider_from_env():
+    """
+    Builds the provider selected by the environment.
+
+    MARKET_DATA_PROVIDER=replay enables ReplayProvider, reading files from
+    MARKET_REPLAY_DIR (default data/replay) at MARKET_REPLAY_SPEED (default 1).
+    Anything else uses live yfinance data.
+    """
+    if os.getenv("MARKET_DATA_PROVIDER", "yfinance").lower() == "replay":
+        return ReplayProvider(
+            os.getenv("MARKET_REPLAY_DIR", os.path.join("data", "replay")),
+            speed=float(os.getenv("MARKET_REPLAY_SPEED", "1")),
+        )
+    return YFinanceProvider()
@@ -1,8 +1,49 @@
-import yfinance as yf
+import datetime
 import pandas as pd
-from datetime import datetime
 import threading
 import time
+from history_cache import HistoryCache
+from market_providers import provider_from_env
+
+class FetchScheduler:
+    """
+    Token-bucket throttle in front of every provider request.
+    
+    Replaces the old sleep-after-every-verdict approach to respecting API
+    limits: callers from any thread run their fetch through run(), which
+    waits only as long as needed to stay under `rate` requests per second
+    (with bursts of up to `burst`). rate=None means unlimited.
+    """
+    def __init__(self, rate=None, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self._lock = threading.Lock()
+        self.clock = clock
+        self.sleep = sleep
+        self.configure(rate, burst)
+
+    def configure(self, rate, burst=1):
+        with self._lock:
+            self.rate = rate
+            self.burst = max(burst, 1)
+            self.tokens = float(self.burst)
+            self.updated = self.clock()
+
+    def _reserve(self):
+        """Takes a token; returns how long the caller must wait before using it."""
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            # A negative balance is a queue: each caller waits for its own slot
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def run(self, fetch, *args, **kwargs):
+        wait = self._reserve()
+        if wait > 0:
+            self.sleep(wait)
+        return fetch(*args, **kwargs)
 
 class MarketService:
     _instance = None
@@ -14,51 +55,79 @@ class MarketService:
                 if cls._instance is None:
                     cls._instance = super(MarketService, cls).__new__(cls)
                     cls._instance.cache = {}
+                    cls._instance.provider = provider_from_env()
+                    cls._instance.scheduler = FetchScheduler(*cls._instance.provider.rate_limit)
+                    cls._instance.history_cache = HistoryCache(
+                        cls._instance._fetch_history, ttl=cls._instance.provider.cache_ttl)
         return cls._instance
 
+    def set_provider(self, provider):
+        """Swaps the market data backend (e.g. live yfinance or offline replay)."""
+        self.provider = provider
+        self.cache = {}
+        self.scheduler.configure(*provider.rate_limit)
+        self.history_cache.ttl = provider.cache_ttl
+        self.history_cache.clear()
+
     def get_current_price(self, symbol):
         """Fetches real-time price for a symbol (e.g., '1120.SR')."""
-        try:
+        return self.get_current_prices([symbol]).get(symbol)
+
+    def get_current_prices(self, symbols):
+        """Fetches real-time prices for many symbols in one batched request.
+        
+        Returns {symbol: price} for every symbol that has data; symbols
+        without data are left out.
+        """
+        prices = {}
+        to_fetch = {}
+        now = time.time()
+        ttl = self.provider.cache_ttl
+        
+        for symbol in symbols:
             # Ticker format for Saudi format is .SR
             ticker_sym = symbol if symbol.endswith(".SR") else f"{symbol}.SR"
-            
-            # Check cache first (valid for 60 seconds)
             cached = self.cache.get(ticker_sym)
-            if cached and (time.time() - cached['timestamp'] < 60):
-                return cached['price']
-
-            # Fetch live
-            ticker = yf.Ticker(ticker_sym)
-            data = ticker.history(period="1d")
-            
-            if data.empty:
-                return None
+            if cached and (now - cached['timestamp'] < ttl):
+                prices[symbol] = cached['price']
+            else:
+                to_fetch[ticker_sym] = symbol
                 
-            price = data['Close'].iloc[-1]
+        if not to_fetch:
+            return prices
+            
+        try:
+            fetched = self.scheduler.run(self.provider.get_prices, list(to_fetch))
+        except Exception as e:
+            print(f"Error fetching prices for {list(to_fetch)}: {e}")
+            return prices
             
+        fetched_at = time.time()
+        for ticker_sym, price in fetched.items():
             # Update cache
             self.cache[ticker_sym] = {
                 'price': price,
-                'timestamp': time.time()
+                'timestamp': fetched_at
             }
-            return price
+            prices[to_fetch[ticker_sym]] = price
             
-        except Exception as e:
-            print(f"Error fetching price for {symbol}: {e}")
-            return None
+        return prices
 
     def get_history(self, symbol, period="1mo", interval="1d"):
-        """Fetches historical OHLCV data."""
+        """Fetches historical OHLCV data (served from the history cache when fresh)."""
         try:
             ticker_sym = symbol if symbol.endswith(".SR") else f"{symbol}.SR"
-            ticker = yf.Ticker(ticker_sym)
-            return ticker.history(period=period, interval=interval)
+            return self.history_cache.get(ticker_sym, period=period, interval=interval)
         except Exception:
             return pd.DataFrame()
 
+    def _fetch_history(self, ticker_sym, period, interval, start=None):
+        return self.scheduler.run(self.provider.get_history, ticker_sym,
+                                  period=period, interval=interval, start=start)
+
     def get_market_status(self):
         """Checks if TASI is currently open (approximate)."""
-        now = datetime.now()
+        now = self.provider.now()
         # Sunday to Thursday
         if now.weekday() in [4, 5]: # Fri, Sat
             return "CLOSED"
@@ -68,3 +137,14 @@ class MarketService:
         if (hour > 10 or (hour == 10 and minute >= 0)) and (hour < 15 or (hour == 15 and minute <= 20)):
             return "OPEN"
         return "CLOSED"
+
+    def seconds_until_open(self):
+        """Market-clock seconds until the next session opens (0 while open)."""
+        if self.get_market_status() == "OPEN":
+            return 0.0
+        now = self.provider.now()
+        for days in range(8):
+            opening = (now + datetime.timedelta(days=days)).replace(hour=10, minute=0, second=0, microsecond=0)
+            if opening > now and opening.weekday() not in [4, 5]:
+                return (opening - now).total_seconds()
+        return 0.0
@@ -1,132 +1,262 @@
 """
 Portfolio Manager - إدارة المحافظ الشخصية ونسخ الروبوتات
+
+قاعدة البيانات هي المرجع لكل العمال: كل تعديل يقرأ الصف المخزن ويعدّله
+ويكتبه في معاملة واحدة، وكل عامل يلتقط ما كتبه الآخرون عبر sync()
 """
+import copy
 import json
-import os
+import threading
+import time
+from contextlib import ExitStack
 from datetime import datetime
 from pathlib import Path
 
+from copy_trading import CopyTradingEngine
+from storage import get_storage
+
 class PortfolioManager:
-    def __init__(self):
+    LOCK_STRIPES = 64
+    AGGREGATES = ('total_balance', 'current_value', 'total_profit', 'profit_percent',
+                  'active_trades', 'completed_trades', 'success_rate')
+
+    def __init__(self, storage=None):
         self.data_dir = Path('data')
         self.data_dir.mkdir(exist_ok=True)
-        self.portfolio_file = self.data_dir / 'portfolios.json'
-        self.portfolios = self._load_portfolios()
+        self.portfolio_file = self.data_dir / 'portfolios.json' # Legacy format, imported once
+        self.storage = storage or get_storage()
+        self.portfolios = {} # user_id -> portfolio, loaded on first access
+        self._robots = {} # user_id -> {robot_id: robot} inside that portfolio
+        self._seqs = {} # user_id -> seq of the stored row the cached portfolio came from
+        # Requests for the same user serialize, different users run in parallel
+        self._stripes = [threading.RLock() for _ in range(self.LOCK_STRIPES)]
+        self._import_legacy_file()
+        # robot_id -> followers, fed by every approved bot trade
+        self.copy_engine = CopyTradingEngine(self)
+        # Read the seq first: rows written while loading are picked up again by sync()
+        self._synced = self.storage.portfolio_seq()
+        self.copy_engine.rebuild(self.storage.load_portfolios())
     
-    def _load_portfolios(self):
-        """تحميل المحافظ من الملف"""
-        if self.portfolio_file.exists():
+    def _import_legacy_file(self):
+        """استيراد ملف JSON القديم عند أول تشغيل"""
+        if self.storage.count_portfolios() == 0 and self.portfolio_file.exists():
             with open(self.portfolio_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
+                self.storage.save_portfolios(json.load(f))
+    
+    def _user_lock(self, user_id):
+        """قفل المستخدم (مشترك بين المستخدمين الذين يقعون في نفس الشريحة)"""
+        return self._stripes[hash(user_id) % self.LOCK_STRIPES]
+    
+    def _install(self, user_id, portfolio, seq):
+        """وضع نسخة مخزنة من المحفظة في الذاكرة"""
+        self._robots[user_id] = {r['robot_id']: r for r in portfolio['copied_robots']}
+        self.portfolios[user_id] = portfolio
+        self._seqs[user_id] = seq
+    
+    def _forget(self, user_id):
+        """إسقاط النسخة المحلية؛ تُقرأ من قاعدة البيانات عند الوصول التالي"""
+        self.portfolios.pop(user_id, None)
+        self._robots.pop(user_id, None)
+        self._seqs.pop(user_id, None)
     
-    def _save_portfolios(self):
-        """حفظ المحافظ إلى الملف"""
-        with open(self.portfolio_file, 'w', encoding='utf-8') as f:
-            json.dump(self.portfolios, f, ensure_ascii=False, indent=2)
+    def _modify(self, user_ids, change):
+        """قراءة-تعديل-كتابة للمحافظ المخزنة في معاملة واحدة
+        
+        change(user_id, portfolio) يعدّل المحفظة ويعيد النتيجة؛ تُحفظ المحفظة
+        فقط إذا كانت النتيجة ناجحة. أقفال المستخدمين تؤخذ قبل قفل الكتابة دائماً
+        """
+        results = {}
+        
+        def update(user_id, stored, seq):
+            if stored is not None:
+                self._install(user_id, stored, seq) # عامل آخر عدّلها منذ قراءتنا
+            portfolio = self.get_portfolio(user_id)
+            results[user_id] = change(user_id, portfolio)
+            return portfolio if results[user_id]['success'] else None
+        
+        with ExitStack() as stack:
+            for stripe in sorted({hash(user_id) % self.LOCK_STRIPES for user_id in user_ids}):
+                stack.enter_context(self._stripes[stripe])
+            try:
+                written = self.storage.modify_portfolios(
+                    user_ids, update, {user_id: self._seqs.get(user_id) for user_id in user_ids})
+            except BaseException:
+                for user_id in user_ids:
+                    self._forget(user_id) # الذاكرة قد تحمل تعديلاً لم يُحفظ
+                raise
+            for user_id, seq in written.items():
+                self._seqs[user_id] = seq
+                self.copy_engine.track(user_id, self.portfolios[user_id])
+        return results
+    
+    def sync(self):
+        """التقاط المحافظ التي كتبها عمال آخرون منذ آخر مزامنة؛ يعيد عدد الصفوف"""
+        rows = self.storage.portfolios_since(self._synced)
+        for user_id, portfolio, seq in rows:
+            with self._user_lock(user_id):
+                if seq > self._seqs.get(user_id, 0): # لا نستبدل نسخة أحدث كتبناها نحن
+                    if user_id in self.portfolios:
+                        self._install(user_id, portfolio, seq)
+                    self.copy_engine.track(user_id, portfolio)
+            self._synced = seq
+        return len(rows)
+    
+    def start_sync(self, interval=1.0):
+        """تشغيل المزامنة الدورية في الخلفية"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.sync()
+                except Exception as e:
+                    print(f"[Portfolio] Sync failed: {e}")
+        threading.Thread(target=run, name="portfolio-sync", daemon=True).start()
     
     def get_portfolio(self, user_id='default_user'):
         """الحصول على محفظة المستخدم"""
-        if user_id not in self.portfolios:
-            self.portfolios[user_id] = {
-                'user_id': user_id,
-                'total_balance': 0,
-                'current_value': 0,
-                'total_profit': 0,
-                'profit_percent': 0,
-                'copied_robots': [],
-                'active_trades': 0,
-                'completed_trades': 0,
-                'success_rate': 0
-            }
-            self._save_portfolios()
-        return self.portfolios[user_id]
+        with self._user_lock(user_id):
+            if user_id not in self.portfolios:
+                stored = self.storage.load_portfolio_row(user_id)
+                if stored is not None:
+                    self._install(user_id, *stored)
+                    return stored[0]
+                # New portfolios are only written once something changes
+                self._robots[user_id] = {}
+                self.portfolios[user_id] = {
+                    'user_id': user_id,
+                    'total_balance': 0,
+                    'current_value': 0,
+                    'total_profit': 0,
+                    'profit_percent': 0,
+                    'copied_robots': [],
+                    'active_trades': 0,
+                    'completed_trades': 0,
+                    'success_rate': 0
+                }
+            return self.portfolios[user_id]
+    
+    def get_portfolio_snapshot(self, user_id='default_user'):
+        """نسخة ثابتة من المحفظة للعرض (لا تتغير أثناء التسلسل)"""
+        with self._user_lock(user_id):
+            return copy.deepcopy(self.get_portfolio(user_id))
     
     def add_robot(self, robot_id, robot_name, emoji, allocated_balance, user_id='default_user'):
         """إضافة روبوت للمحفظة"""
-        portfolio = self.get_portfolio(user_id)
-        
-        # تحقق من عدم وجود الروبوت مسبقاً
-        for robot in portfolio['copied_robots']:
-            if robot['robot_id'] == robot_id:
+        def change(user_id, portfolio):
+            # تحقق من عدم وجود الروبوت مسبقاً
+            if self._find_robot(user_id, robot_id) is not None:
                 return {'success': False, 'message': 'الروبوت موجود بالفعل'}
         
-        # إضافة الروبوت
-        new_robot = {
-            'robot_id': robot_id,
-            'robot_name': robot_name,
-            'emoji': emoji,
-            'allocated_balance': allocated_balance,
-            'current_balance': allocated_balance,
-            'profit': 0,
-            'profit_percent': 0,
-            'active_trades': 0,
-            'total_trades': 0,
-            'success_rate': 0,
-            'is_active': True,
-            'copied_at': datetime.now().isoformat()
-        }
-        
-        portfolio['copied_robots'].append(new_robot)
-        portfolio['total_balance'] += allocated_balance
-        portfolio['current_value'] += allocated_balance
+            # إضافة الروبوت
+            new_robot = {
+                'robot_id': robot_id,
+                'robot_name': robot_name,
+                'emoji': emoji,
+                'allocated_balance': allocated_balance,
+                'current_balance': allocated_balance,
+                'profit': 0,
+                'profit_percent': 0,
+                'active_trades': 0,
+                'total_trades': 0,
+                'success_rate': 0,
+                'is_active': True,
+                'copied_at': datetime.now().isoformat()
+            }
         
-        self._save_portfolios()
-        return {'success': True, 'robot': new_robot}
+            portfolio['copied_robots'].append(new_robot)
+            self._robots[user_id][robot_id] = new_robot
+            self._apply_delta(portfolio, allocated=allocated_balance, current=allocated_balance)
+            return {'success': True, 'robot': new_robot}
+        return self._modify([user_id], change)[user_id]
     
     def remove_robot(self, robot_id, user_id='default_user'):
         """إزالة روبوت من المحفظة"""
-        portfolio = self.get_portfolio(user_id)
+        def change(user_id, portfolio):
+            robot = self._robots[user_id].pop(robot_id, None)
+            if robot is None:
+                return {'success': False, 'message': 'الروبوت غير موجود'}
         
-        for i, robot in enumerate(portfolio['copied_robots']):
-            if robot['robot_id'] == robot_id:
-                removed_robot = portfolio['copied_robots'].pop(i)
-                portfolio['total_balance'] -= removed_robot['allocated_balance']
-                portfolio['current_value'] -= removed_robot['current_balance']
-                self._save_portfolios()
-                return {'success': True, 'message': 'تم إزالة الروبوت'}
-        
-        return {'success': False, 'message': 'الروبوت غير موجود'}
+            portfolio['copied_robots'].remove(robot)
+            self._apply_delta(portfolio, allocated=-robot['allocated_balance'], current=-robot['current_balance'],
+                              active=-robot['active_trades'], trades=-robot['total_trades'])
+            return {'success': True, 'message': 'تم إزالة الروبوت'}
+        return self._modify([user_id], change)[user_id]
     
     def update_robot_balance(self, robot_id, new_balance, user_id='default_user'):
         """تحديث رصيد روبوت"""
-        portfolio = self.get_portfolio(user_id)
+        def change(user_id, portfolio):
+            robot = self._find_robot(user_id, robot_id)
+            if robot is None:
+                return {'success': False, 'message': 'الروبوت غير موجود'}
         
-        for robot in portfolio['copied_robots']:
-            if robot['robot_id'] == robot_id:
-                old_balance = robot['allocated_balance']
-                robot['allocated_balance'] = new_balance
-                
-                # تحديث الرصيد الكلي
-                portfolio['total_balance'] = portfolio['total_balance'] - old_balance + new_balance
-                
-                self._save_portfolios()
-                return {'success': True, 'message': 'تم تحديث الرصيد'}
+            old_balance = robot['allocated_balance']
+            robot['allocated_balance'] = new_balance
         
-        return {'success': False, 'message': 'الروبوت غير موجود'}
+            # تحديث الرصيد الكلي
+            self._apply_delta(portfolio, allocated=new_balance - old_balance)
+            return {'success': True, 'message': 'تم تحديث الرصيد'}
+        return self._modify([user_id], change)[user_id]
     
     def update_robot_performance(self, robot_id, profit, active_trades, total_trades, user_id='default_user'):
         """تحديث أداء الروبوت"""
-        portfolio = self.get_portfolio(user_id)
+        def change(user_id, portfolio):
+            robot = self._find_robot(user_id, robot_id)
+            if robot is None:
+                return {'success': False, 'message': 'الروبوت غير موجود'}
         
-        for robot in portfolio['copied_robots']:
-            if robot['robot_id'] == robot_id:
-                robot['profit'] = profit
-                robot['current_balance'] = robot['allocated_balance'] + profit
-                robot['profit_percent'] = (profit / robot['allocated_balance'] * 100) if robot['allocated_balance'] > 0 else 0
-                robot['active_trades'] = active_trades
-                robot['total_trades'] = total_trades
-                robot['success_rate'] = ((total_trades - active_trades) / total_trades * 100) if total_trades > 0 else 0
-                
-                # تحديث الإحصائيات الكلية
-                self._update_portfolio_stats(user_id)
-                self._save_portfolios()
-                return {'success': True}
+            self._set_performance(portfolio, robot, profit, active_trades, total_trades)
+            return {'success': True}
+        return self._modify([user_id], change)[user_id]
+    
+    def _apply_copy_results(self, results):
+        """إضافة أرباح وصفقات النسخ المعلّقة {user_id: {robot_id: (profit, trades)}} إلى المحافظ المخزنة"""
+        def change(user_id, portfolio):
+            changed = False
+            for robot_id, (profit, trades) in results[user_id].items():
+                robot = self._find_robot(user_id, robot_id)
+                if robot is not None: # ربما أُزيل الروبوت منذ الصفقة
+                    self._set_performance(portfolio, robot, robot['profit'] + profit, robot['active_trades'],
+                                          robot['total_trades'] + trades)
+                    changed = True
+            return {'success': changed}
+        return self._modify(list(results), change)
+    
+    def _find_robot(self, user_id, robot_id):
+        """البحث عن روبوت في محفظة المستخدم (O(1))"""
+        self.get_portfolio(user_id)
+        return self._robots[user_id].get(robot_id)
+    
+    def _set_performance(self, portfolio, robot, profit, active_trades, total_trades):
+        """تحديث أداء روبوت وتعديل الإجماليات بالفرق فقط"""
+        current_delta = robot['allocated_balance'] + profit - robot['current_balance']
+        active_delta = active_trades - robot['active_trades']
+        trades_delta = total_trades - robot['total_trades']
+        
+        robot['profit'] = profit
+        robot['current_balance'] = robot['allocated_balance'] + profit
+        robot['profit_percent'] = (profit / robot['allocated_balance'] * 100) if robot['allocated_balance'] > 0 else 0
+        robot['active_trades'] = active_trades
+        robot['total_trades'] = total_trades
+        robot['success_rate'] = ((total_trades - active_trades) / total_trades * 100) if total_trades > 0 else 0
+        
+        self._apply_delta(portfolio, current=current_delta, active=active_delta, trades=trades_delta)
+    
+    def _apply_delta(self, portfolio, allocated=0, current=0, active=0, trades=0):
+        """تعديل المجاميع الجارية للمحفظة ثم اشتقاق النسب منها - O(1) مهما كان عدد الروبوتات"""
+        portfolio['total_balance'] += allocated
+        portfolio['current_value'] += current
+        portfolio['active_trades'] += active
+        portfolio['completed_trades'] += trades - active
         
-        return {'success': False, 'message': 'الروبوت غير موجود'}
+        total_balance = portfolio['total_balance']
+        current_value = portfolio['current_value']
+        total_trades = portfolio['completed_trades'] + portfolio['active_trades']
+        portfolio['total_profit'] = current_value - total_balance
+        portfolio['profit_percent'] = ((current_value - total_balance) / total_balance * 100) if total_balance > 0 else 0
+        portfolio['success_rate'] = (portfolio['completed_trades'] / total_trades * 100) if total_trades > 0 else 0
     
     def _update_portfolio_stats(self, user_id='default_user'):
-        """تحديث إحصائيات المحفظة الكلية"""
+        """تحديث إحصائيات المحفظة الكلية (إعادة حساب كاملة، تُستخدم للتحقق)"""
         portfolio = self.get_portfolio(user_id)
         
         total_balance = 0
@@ -148,15 +278,47 @@ class PortfolioManager:
         portfolio['completed_trades'] = total_trades - active_trades
         portfolio['success_rate'] = ((total_trades - active_trades) / total_trades * 100) if total_trades > 0 else 0
     
+    def _recompute(self, user_id, portfolio):
+        self._update_portfolio_stats(user_id)
+        return {'success': True}
+    
+    def verify_aggregates(self, repair=True, tolerance=1e-6):
+        """التحقق من المجاميع الجارية بإعادة الحساب الكاملة؛ يعيد المستخدمين الذين انحرفت محافظهم"""
+        drifted = []
+        for user_id in list(self.portfolios):
+            with self._user_lock(user_id):
+                portfolio = self.portfolios.get(user_id)
+                if portfolio is None: # أُسقطت من الذاكرة بعد فشل حفظ
+                    continue
+                running = {k: portfolio[k] for k in self.AGGREGATES}
+                self._update_portfolio_stats(user_id)
+                if any(abs(running[k] - portfolio[k]) > tolerance * max(1.0, abs(portfolio[k])) for k in self.AGGREGATES):
+                    drifted.append(user_id)
+                    print(f"[Portfolio] Aggregate drift for {user_id}: {running}")
+                    if repair:
+                        # إعادة الحساب على الصف المخزن نفسه (قد يكون عامل آخر عدّله)
+                        self._modify([user_id], self._recompute)
+                    else:
+                        portfolio.update(running)
+                else:
+                    portfolio.update(running) # Keep the running sums bit-for-bit
+        return drifted
+    
+    def start_verifier(self, interval=300):
+        """تشغيل التحقق الدوري في الخلفية"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.verify_aggregates()
+                except Exception as e:
+                    print(f"[Portfolio] Verify failed: {e}")
+        threading.Thread(target=run, name="portfolio-verify", daemon=True).start()
+    
     def get_robot_performance(self, robot_id, user_id='default_user'):
         """الحصول على أداء روبوت معين"""
-        portfolio = self.get_portfolio(user_id)
-        
-        for robot in portfolio['copied_robots']:
-            if robot['robot_id'] == robot_id:
-                return robot
-        
-        return None
+        with self._user_lock(user_id):
+            return self._find_robot(user_id, robot_id)
 
 # مثيل واحد للاستخدام في التطبيق
 portfolio_manager = PortfolioManager()
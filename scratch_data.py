@@ -0,0 +1,27 @@
+"""
+Throwaway data directory for the tests and benchmarks.
+
+isolate() points DB_PATH, JOURNAL_DIR, TICK_STORE_DIR and SHARED_STATE_DIR
+at one fresh temp directory, unless they are already set, and removes it
+when the process exits. Call it before importing anything that builds the
+KnowledgeCenter or main, so nothing lands in the checkout's data/.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+_root = None
+
+
+def isolate(prefix="tasi_"):
+    """Sets up the temp data directory once per process; returns its path."""
+    global _root
+    if _root is None:
+        _root = tempfile.mkdtemp(prefix=prefix)
+        atexit.register(shutil.rmtree, _root, ignore_errors=True)
+        os.environ.setdefault("DB_PATH", os.path.join(_root, "tasi.db"))
+        os.environ.setdefault("JOURNAL_DIR", os.path.join(_root, "journal"))
+        os.environ.setdefault("TICK_STORE_DIR", os.path.join(_root, "ticks"))
+        os.environ.setdefault("SHARED_STATE_DIR", _root)
+    return _root
@@ -0,0 +1,247 @@
+"""
+One engine process, many web workers.
+
+gunicorn imports main.py once per worker. Only the worker that wins the
+EngineLease (an flock on data/engine.lock) runs the market poller, bot
+engine and copy-trading flush. It publishes the state the web layer reads
+(market prices, challenge scores, recent signals, verdicts and trades)
+as one JSON document in shared memory (/dev/shm when available). Every
+change is written with write-to-temp + os.replace, so readers always see
+a complete document.
+
+The other workers run a StateFollower. It notices a new document with a
+single stat() and mirrors it into that worker's own KnowledgeCenter and
+ChallengeManager, so every endpoint, the ETag cache and the /api/stream
+events keep working unchanged in every worker. A worker's state is the
+engine's state, at most one poll interval late.
+
+Followers never write the engine's files: the journal and tick store
+stay closed for writing until a worker becomes the engine. Portfolios
+are not part of the document. Every worker reads and writes them in the
+shared database, and PortfolioManager.sync() brings each worker's cache
+and the engine's copy-trading books up to date with the others' writes.
+
+The lock dies with its process, and followers keep trying it. If the
+engine worker exits, a follower takes over the engine role.
+"""
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, a single process is always the engine
+    fcntl = None
+
+
+def _encode(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def default_state_path():
+    """Shared-memory path for this checkout's state (one per data directory)."""
+    directory = os.getenv('SHARED_STATE_DIR') or ('/dev/shm' if os.path.isdir('/dev/shm') else 'data')
+    tag = zlib.crc32(os.path.abspath(os.getenv('DB_PATH', os.path.join('data', 'tasi.db'))).encode())
+    return os.path.join(directory, f"tasi-engine-{tag:08x}.json")
+
+
+class EngineLease:
+    """Exclusive, non-blocking flock; held until the process exits."""
+
+    def __init__(self, path=os.path.join('data', 'engine.lock')):
+        self.path = path
+        self.held = False
+        self._fd = None
+
+    def acquire(self):
+        """Returns True if this process is (now) the engine."""
+        if self.held:
+            return True
+        if fcntl is None:
+            self.held = True
+            return True
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        self.held = True
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)  # closing the descriptor drops the flock
+            self._fd = None
+        self.held = False
+
+
+class SharedState:
+    """A JSON document replaced atomically; readers reload only when it changed."""
+
+    def __init__(self, path=None):
+        self.path = path or default_state_path()
+        self._stamp = None
+
+    def write(self, doc):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        data = json.dumps(doc, default=_encode, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tasi-state-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def read_if_changed(self):
+        """The document if it changed since the last call, else None."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)  # os.replace always brings a new inode
+        if stamp == self._stamp:
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                doc = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        self._stamp = stamp
+        return doc
+
+
+class StatePublisher:
+    """Engine side: rewrites the shared document whenever the event bus reports a change."""
+
+    SIGNALS = 100
+    VERDICTS = 50
+    TRADES = 50
+
+    def __init__(self, state, kc, cm, interval=0.1):
+        self.state = state
+        self.kc = kc
+        self.cm = cm
+        self.interval = interval  # bursts of events within this window share one write
+        self.seq = 0
+        self.trades = deque(maxlen=self.TRADES)  # (seq, payload); followers replay the new ones
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add_trade(self, payload):
+        with self._lock:
+            self.seq += 1
+            self.trades.append({"seq": self.seq, "data": payload})
+
+    def document(self):
+        market = self.kc.get_market_snapshot()
+        with self._lock:
+            self.seq += 1
+            seq, trades = self.seq, list(self.trades)
+        return {
+            "seq": seq,
+            "pid": os.getpid(),
+            "market": {"version": market.version, "prices": market.to_dict()},
+            "challenge": {"start": self.cm.start_date, "end": self.cm.end_date, "active": self.cm.is_active},
+            "scores": {bot_id: dict(stats) for bot_id, stats in list(self.cm.bot_scores.items())},
+            # Oldest first, so appending them in order keeps the follower's recency order
+            "signals": self.kc.bot_signals.latest(self.SIGNALS)[::-1],
+            "verdicts": self.kc.get_latest_logs(self.VERDICTS)[::-1],
+            "trades": trades,
+        }
+
+    def publish(self):
+        self.state.write(self.document())
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="state-publisher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        sub = self.kc.events.subscribe()
+        while True:
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"[SharedState] Publish failed: {e}")
+            sub.get(timeout=5.0)  # any event (or a heartbeat) triggers the next write
+            time.sleep(self.interval)
+
+
+class StateFollower:
+    """Web-worker side: mirrors the engine's document into the local KC/CM."""
+
+    def __init__(self, state, kc, cm, interval=0.2):
+        self.state = state
+        self.kc = kc
+        self.cm = cm
+        self.interval = interval
+        self.engine_pid = None
+        self.last_trade = None  # None until the first document: history is not replayed
+        self._thread = None
+
+    def poll(self):
+        """Applies the shared document if it changed; returns True if it did."""
+        doc = self.state.read_if_changed()
+        if doc is None:
+            return False
+        self.apply(doc)
+        return True
+
+    def apply(self, doc):
+        if doc["pid"] != self.engine_pid:
+            # New engine process: its sequence numbers start over
+            self.engine_pid, self.last_trade = doc["pid"], None
+        replay = self.last_trade is not None
+        prices = doc["market"]["prices"]
+        if prices != self.kc.get_market_snapshot().to_dict():
+            self.kc.publish_market_data(prices, record=False)
+        challenge = doc["challenge"]
+        self.cm.mirror_state(doc["scores"], _parse_time(challenge["start"]),
+                             _parse_time(challenge["end"]), challenge["active"])
+        self.kc.mirror_logs(doc["signals"], doc["verdicts"], publish=replay)
+        last = self.last_trade or 0
+        for trade in doc["trades"]:
+            if trade["seq"] > last:
+                if replay:
+                    self.kc.events.publish("trade", trade["data"])
+                last = trade["seq"]
+        self.last_trade = last
+
+    def start(self, on_promote=None):
+        """Polls in the background; calls on_promote() if this worker wins the engine role."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(on_promote,), name="state-follower", daemon=True)
+            self._thread.start()
+
+    def _run(self, on_promote):
+        while True:
+            try:
+                self.poll()
+                if on_promote is not None and on_promote():
+                    return
+            except Exception as e:
+                print(f"[SharedState] Follow failed: {e}")
+            time.sleep(self.interval)
+
+
+def _parse_time(value):
+    return datetime.datetime.fromisoformat(value) if value else None
@@ -0,0 +1,126 @@
+"""
+Bounded, indexed in-memory logs for bot signals and investigator verdicts.
+
+IndexedLog keeps records in insertion order with a hash index on the
+primary key plus secondary indexes (e.g. bot_id, symbol, status). Every
+index is maintained on insert, update and eviction, so lookups by key or
+by any indexed field cost O(1) no matter how large the retention is.
+Each index bucket is kept in primary key order, so a record that moves
+into a bucket late (e.g. a signal approved after newer ones) still lists
+by key.
+"""
+import itertools
+import threading
+
+
+class IndexedLog:
+    def __init__(self, maxlen=None, key="id", indexes=()):
+        """
+        Args:
+            maxlen: records kept before the oldest is evicted (None = unbounded)
+            key: field holding each record's unique primary key
+            indexes: fields to maintain secondary indexes for
+        """
+        self.maxlen = maxlen
+        self.key = key
+        self.indexes = {field: {} for field in indexes}
+        self._records = {}  # key -> record, oldest first (dicts keep insertion order)
+        self.version = 0  # bumped on every change, cheap "did anything move?" check
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        """Oldest to newest; iterates over a copy so writers never break readers."""
+        with self._lock:
+            return iter(list(self._records.values()))
+
+    def __contains__(self, key):
+        return key in self._records
+
+    def _index(self, record):
+        pk = record[self.key]
+        for field, index in self.indexes.items():
+            index.setdefault(record.get(field), {})[pk] = record
+
+    def _file(self, field, record):
+        """Adds record to its bucket for field, keeping the bucket in key order."""
+        pk = record[self.key]
+        value = record.get(field)
+        bucket = self.indexes[field].setdefault(value, {})
+        last = next(reversed(bucket), None)
+        bucket[pk] = record
+        if last is not None and last > pk:
+            self.indexes[field][value] = dict(sorted(bucket.items()))
+
+    def _unindex(self, record, fields=None):
+        pk = record[self.key]
+        for field in (fields if fields is not None else self.indexes):
+            bucket = self.indexes[field].get(record.get(field))
+            if bucket is not None:
+                bucket.pop(pk, None)
+                if not bucket:
+                    del self.indexes[field][record.get(field)]
+
+    def append(self, record):
+        with self._lock:
+            pk = record[self.key]
+            previous = self._records.pop(pk, None)
+            if previous is not None:
+                self._unindex(previous)
+            self._records[pk] = record
+            self._index(record)
+            while self.maxlen is not None and len(self._records) > self.maxlen:
+                oldest = self._records.pop(next(iter(self._records)))
+                self._unindex(oldest)
+            self.version += 1
+        return record
+
+    def get(self, key, default=None):
+        return self._records.get(key, default)
+
+    def update(self, key, **fields):
+        """Changes fields of a stored record, moving it between secondary indexes."""
+        with self._lock:
+            record = self._records.get(key)
+            if record is None:
+                return None
+            moved = [f for f in fields if f in self.indexes and record.get(f) != fields[f]]
+            self._unindex(record, moved)
+            record.update(fields)
+            for field in moved:
+                self._file(field, record)
+            self.version += 1
+            return record
+
+    def select(self, field, value, newest_first=False, limit=None):
+        """Records whose indexed `field` equals `value`, in key order."""
+        with self._lock:
+            bucket = self.indexes[field].get(value)
+            if not bucket:
+                return []
+            records = reversed(bucket.values()) if newest_first else iter(bucket.values())
+            return list(itertools.islice(records, limit))
+
+    def latest(self, limit=None):
+        """Newest records first."""
+        with self._lock:
+            return list(itertools.islice(reversed(self._records.values()), limit))
+
+
+class SignalRegistry(IndexedLog):
+    """Bot signals with globally unique, monotonically increasing ids."""
+
+    def __init__(self, maxlen=None, start_id=1):
+        super().__init__(maxlen=maxlen, key="id", indexes=("bot_id", "symbol", "status"))
+        self._ids = itertools.count(start_id)
+
+    def next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def reset_ids(self, start_id):
+        """Continues numbering from start_id (e.g. after restoring from the journal)."""
+        with self._lock:
+            self._ids = itertools.count(start_id)
@@ -1,9 +1,12 @@
+let recentLogs = [];
+
 function updateDashboard() {
     fetch('/api/status')
         .then(response => response.json())
         .then(data => {
             updateLeaderboard(data.leaderboard);
-            updateInvestigator(data.investigator_logs);
+            recentLogs = data.investigator_logs;
+            updateInvestigator(recentLogs);
             // Simulate adding actions to feed based on logs for now
             // In a real socket setup, we'd append. Here we just show recent logs as actions.
         })
@@ -64,6 +67,12 @@ function simulateAction() {
     }
 }
 
-// Init
-setInterval(updateDashboard, 2000);
+// Init: one full fetch, then pushed updates (requires live.js)
+updateDashboard();
+Live.on('leaderboard', data => updateLeaderboard(data.leaderboard));
+Live.on('verdict', log => {
+    recentLogs = [log, ...recentLogs].slice(0, 10);
+    updateInvestigator(recentLogs);
+});
+Live.onResync(updateDashboard);
 setInterval(simulateAction, 3000); // Visual fluff
@@ -0,0 +1,64 @@
+// Live updates pushed from /api/stream (Server-Sent Events).
+//
+// Pages register handlers with Live.on(topic, fn); one EventSource per page
+// carries every registered topic. `lagged` (events were dropped because we
+// fell behind) and reconnects call the Live.onResync handlers so the page
+// can refetch its full state once. Browsers without EventSource, and pages
+// the server refuses a stream (503 when all stream slots are taken), fall
+// back to polling the resync handlers.
+const Live = (() => {
+    const handlers = {};
+    const resyncHandlers = [];
+    let source = null;
+    let polling = null;
+
+    function resync() {
+        resyncHandlers.forEach(fn => fn());
+    }
+
+    function poll() {
+        if (!polling) polling = setInterval(resync, 5000);
+    }
+
+    function connect() {
+        if (source) return;
+        const topics = Object.keys(handlers);
+        if (!window.EventSource) {
+            poll();
+            return;
+        }
+        source = new EventSource('/api/stream?topics=' + topics.join(','));
+        topics.forEach(topic => {
+            source.addEventListener(topic, event => {
+                const data = JSON.parse(event.data);
+                handlers[topic].forEach(fn => fn(data));
+            });
+        });
+        source.addEventListener('lagged', resync);
+        source.onerror = () => {
+            // CLOSED means the server refused the stream; EventSource won't retry
+            if (source.readyState === EventSource.CLOSED) poll();
+        };
+        let opened = false;
+        source.onopen = () => {
+            if (opened) resync(); // Reconnected: we may have missed events
+            opened = true;
+        };
+    }
+
+    function on(topic, fn) {
+        (handlers[topic] = handlers[topic] || []).push(fn);
+        if (source) {
+            // Topics are fixed per connection; reconnect to include the new one
+            source.close();
+            source = null;
+        }
+        setTimeout(connect, 0);
+    }
+
+    function onResync(fn) {
+        resyncHandlers.push(fn);
+    }
+
+    return { on, onResync };
+})();
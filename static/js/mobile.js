@@ -505,17 +505,19 @@ function initDealChart(symbol, botProfile) {
     }
 
     // Fetch Data
-    fetch(`/api/chart/${symbol}`)
+    fetch(`/api/chart/${symbol}?format=columnar`)
         .then(res => res.json())
-        .then(data => {
-            if (data.error) return;
-
-            // Format Data
-            let formattedData = [];
-            if (type === 'Line' || type === 'Area') {
-                formattedData = data.map(d => ({ time: d.time, value: d.close }));
-            } else {
-                formattedData = data;
+        .then(cols => {
+            if (cols.error) return;
+
+            // Format Data (columnar payload: {time: [...], open: [...], ...})
+            let formattedData = new Array(cols.time.length);
+            for (let i = 0; i < formattedData.length; i++) {
+                if (type === 'Line' || type === 'Area') {
+                    formattedData[i] = { time: cols.time[i], value: cols.close[i] };
+                } else {
+                    formattedData[i] = { time: cols.time[i], open: cols.open[i], high: cols.high[i], low: cols.low[i], close: cols.close[i] };
+                }
             }
 
             series.setData(formattedData);
@@ -553,6 +555,12 @@ function renderRecs(recs) {
     }
 }
 
-// Reload every 5 seconds
+// Initial load, then pushed updates instead of polling (requires live.js)
 loadApp();
-setInterval(loadApp, 5000);
+Live.on('leaderboard', data => renderBots(data.leaderboard));
+Live.on('trade', () => {
+    fetch('/api/user/recommendations')
+        .then(res => res.json())
+        .then(recs => renderRecs(recs));
+});
+Live.onResync(loadApp);
@@ -0,0 +1,336 @@
+"""
+Embedded SQLite storage shared by the KnowledgeCenter, ChallengeManager
+and PortfolioManager.
+
+The database runs in WAL mode, so readers in any number of gunicorn
+workers never block the single writer (or each other). Connections come
+from a small pool. Every statement is a module-level constant, so
+sqlite3's per-connection statement cache keeps them prepared. Signals
+and verdicts are indexed by (bot_id, ts), (symbol, ts) and (status, ts),
+so range queries such as "trades for bot X in the last hour" are index
+scans.
+
+Every portfolio write stamps its row with the next `seq`, one counter
+for the whole table. A worker catches up with portfolio changes made
+by the others by reading the rows whose seq is above the last one it
+saw (`portfolios_since`).
+"""
+import datetime
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    id      INTEGER PRIMARY KEY,
+    ts      REAL NOT NULL,
+    bot_id  TEXT NOT NULL,
+    symbol  TEXT NOT NULL,
+    type    TEXT NOT NULL,
+    price   REAL,
+    reason  TEXT,
+    status  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS signals_bot_ts ON signals (bot_id, ts);
+CREATE INDEX IF NOT EXISTS signals_symbol_ts ON signals (symbol, ts);
+CREATE INDEX IF NOT EXISTS signals_status_ts ON signals (status, ts);
+
+CREATE TABLE IF NOT EXISTS verdicts (
+    signal_id  INTEGER PRIMARY KEY,
+    ts         REAL NOT NULL,
+    verdict    TEXT NOT NULL,
+    message    TEXT,
+    bot_id     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS verdicts_bot_ts ON verdicts (bot_id, ts);
+
+CREATE TABLE IF NOT EXISTS scores (
+    bot_id  TEXT PRIMARY KEY,
+    pnl     REAL NOT NULL DEFAULT 0,
+    trades  INTEGER NOT NULL DEFAULT 0,
+    wins    INTEGER NOT NULL DEFAULT 0,
+    status  TEXT NOT NULL DEFAULT 'ACTIVE'
+);
+CREATE INDEX IF NOT EXISTS scores_pnl ON scores (pnl);
+
+CREATE TABLE IF NOT EXISTS challenge (
+    id        INTEGER PRIMARY KEY CHECK (id = 1),
+    start_ts  REAL NOT NULL,
+    end_ts    REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS portfolios (
+    user_id     TEXT PRIMARY KEY,
+    data        TEXT NOT NULL,
+    updated_at  REAL NOT NULL,
+    seq         INTEGER NOT NULL DEFAULT 0
+);
+"""
+# Databases created before portfolios had a seq column
+ADD_PORTFOLIO_SEQ = "ALTER TABLE portfolios ADD COLUMN seq INTEGER NOT NULL DEFAULT 0"
+INDEX_PORTFOLIO_SEQ = "CREATE INDEX IF NOT EXISTS portfolios_seq ON portfolios (seq)"
+
+UPSERT_SIGNAL = """
+INSERT INTO signals (id, ts, bot_id, symbol, type, price, reason, status)
+VALUES (:id, :ts, :bot_id, :symbol, :type, :price, :reason, :status)
+ON CONFLICT (id) DO UPDATE SET status = excluded.status
+"""
+UPSERT_VERDICT = """
+INSERT OR REPLACE INTO verdicts (signal_id, ts, verdict, message, bot_id)
+VALUES (:signal_id, :ts, :verdict, :message, :bot_id)
+"""
+SET_SIGNAL_STATUS = "UPDATE signals SET status = :verdict WHERE id = :signal_id"
+SELECT_SIGNALS_BY_BOT = """
+SELECT * FROM signals WHERE bot_id = ? AND ts >= ? AND ts <= ? ORDER BY ts DESC LIMIT ?
+"""
+SELECT_SIGNALS_BY_SYMBOL = """
+SELECT * FROM signals WHERE symbol = ? AND ts >= ? AND ts <= ? ORDER BY ts DESC LIMIT ?
+"""
+SELECT_SIGNALS_BY_STATUS = """
+SELECT * FROM signals WHERE status = ? AND ts >= ? AND ts <= ? ORDER BY ts DESC LIMIT ?
+"""
+SELECT_VERDICTS_BY_BOT = """
+SELECT * FROM verdicts WHERE bot_id = ? AND ts >= ? AND ts <= ? ORDER BY ts DESC LIMIT ?
+"""
+UPSERT_SCORE = """
+INSERT OR REPLACE INTO scores (bot_id, pnl, trades, wins, status)
+VALUES (:bot_id, :pnl, :trades, :wins, :status)
+"""
+SELECT_SCORES = "SELECT * FROM scores ORDER BY pnl DESC"
+DELETE_SCORES = "DELETE FROM scores"
+UPSERT_CHALLENGE = "INSERT OR REPLACE INTO challenge (id, start_ts, end_ts) VALUES (1, ?, ?)"
+SELECT_CHALLENGE = "SELECT start_ts, end_ts FROM challenge WHERE id = 1"
+UPSERT_PORTFOLIO = """
+INSERT OR REPLACE INTO portfolios (user_id, data, updated_at, seq)
+VALUES (?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM portfolios))
+"""
+SELECT_PORTFOLIO = "SELECT data, seq FROM portfolios WHERE user_id = ?"
+SELECT_PORTFOLIOS = "SELECT user_id, data FROM portfolios"
+SELECT_PORTFOLIOS_SINCE = "SELECT user_id, data, seq FROM portfolios WHERE seq > ? ORDER BY seq"
+SELECT_PORTFOLIO_SEQ = "SELECT COALESCE(MAX(seq), 0) FROM portfolios"
+COUNT_PORTFOLIOS = "SELECT COUNT(*) FROM portfolios"
+
+_SIGNAL_SELECTS = {
+    "bot_id": SELECT_SIGNALS_BY_BOT,
+    "symbol": SELECT_SIGNALS_BY_SYMBOL,
+    "status": SELECT_SIGNALS_BY_STATUS,
+}
+
+
+def _epoch(value):
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    return float(value)
+
+
+def encode_portfolio(portfolio):
+    return json.dumps(portfolio, ensure_ascii=False, separators=(",", ":"))
+
+
+def _row(row):
+    record = dict(row)
+    if "ts" in record:
+        record["timestamp"] = datetime.datetime.fromtimestamp(record.pop("ts"))
+    return record
+
+
+class Storage:
+    def __init__(self, path=os.path.join("data", "tasi.db"), pool_size=4, timeout=5.0):
+        self.path = str(path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.timeout = timeout
+        self._pool = queue.LifoQueue()
+        self._write_lock = threading.Lock()  # SQLite has one writer; queue in-process writers here
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        with self._write_lock, self.connection() as conn:
+            conn.executescript(SCHEMA)
+            if "seq" not in {row["name"] for row in conn.execute("PRAGMA table_info(portfolios)")}:
+                conn.execute(ADD_PORTFOLIO_SEQ)
+            conn.execute(INDEX_PORTFOLIO_SEQ)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                               isolation_level=None, cached_statements=64)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrows a pooled connection (for reads)."""
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """A pooled connection inside BEGIN IMMEDIATE ... COMMIT (rolled back on error)."""
+        with self._write_lock, self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    # --- Signals & verdicts ---
+
+    def apply_journal(self, batch):
+        """Writes a batch of journal records ("signal" / "verdict") in one transaction."""
+        signals, verdicts = [], []
+        for kind, data in batch:
+            if kind == "signal":
+                signals.append({**data, "ts": _epoch(data["timestamp"])})
+            elif kind == "verdict":
+                verdicts.append({**data, "ts": _epoch(data["timestamp"])})
+        if not signals and not verdicts:
+            return
+        with self.transaction() as conn:
+            conn.executemany(UPSERT_SIGNAL, signals)
+            conn.executemany(UPSERT_VERDICT, verdicts)
+            conn.executemany(SET_SIGNAL_STATUS, verdicts)
+
+    def signals(self, field, value, since=None, until=None, limit=100):
+        """Signals whose `field` (bot_id, symbol or status) equals value, newest first."""
+        args = (value, _epoch(since) if since is not None else float("-inf"),
+                _epoch(until) if until is not None else float("inf"), limit)
+        with self.connection() as conn:
+            return [_row(r) for r in conn.execute(_SIGNAL_SELECTS[field], args)]
+
+    def verdicts(self, bot_id, since=None, until=None, limit=100):
+        args = (bot_id, _epoch(since) if since is not None else float("-inf"),
+                _epoch(until) if until is not None else float("inf"), limit)
+        with self.connection() as conn:
+            return [_row(r) for r in conn.execute(SELECT_VERDICTS_BY_BOT, args)]
+
+    # --- Challenge scores ---
+
+    def save_score(self, bot_id, stats):
+        with self.transaction() as conn:
+            conn.execute(UPSERT_SCORE, {**stats, "bot_id": bot_id})
+
+    def reset_scores(self, scores):
+        """Replaces all scores with {bot_id: stats}."""
+        with self.transaction() as conn:
+            conn.execute(DELETE_SCORES)
+            conn.executemany(UPSERT_SCORE, [{**stats, "bot_id": bid} for bid, stats in scores.items()])
+
+    def load_scores(self):
+        with self.connection() as conn:
+            return {row["bot_id"]: {k: row[k] for k in ("pnl", "trades", "wins", "status")}
+                    for row in conn.execute(SELECT_SCORES)}
+
+    def start_challenge(self, start_date, end_date, scores):
+        """Records a new challenge window and its starting scores in one transaction."""
+        with self.transaction() as conn:
+            conn.execute(UPSERT_CHALLENGE, (_epoch(start_date), _epoch(end_date)))
+            conn.execute(DELETE_SCORES)
+            conn.executemany(UPSERT_SCORE, [{**stats, "bot_id": bid} for bid, stats in scores.items()])
+
+    def load_challenge(self):
+        """(start_date, end_date) of the last challenge started, or None."""
+        with self.connection() as conn:
+            row = conn.execute(SELECT_CHALLENGE).fetchone()
+        if row is None:
+            return None
+        return datetime.datetime.fromtimestamp(row["start_ts"]), datetime.datetime.fromtimestamp(row["end_ts"])
+
+    # --- Portfolios ---
+
+    def save_portfolio(self, user_id, portfolio):
+        """Atomically replaces one user's portfolio row; other users are untouched."""
+        data = encode_portfolio(portfolio)
+        with self.transaction() as conn:
+            conn.execute(UPSERT_PORTFOLIO, (user_id, data, datetime.datetime.now().timestamp()))
+
+    def save_portfolios(self, portfolios):
+        """Upserts {user_id: portfolio} in one transaction."""
+        self.save_encoded_portfolios({uid: encode_portfolio(p) for uid, p in portfolios.items()})
+
+    def save_encoded_portfolios(self, rows):
+        """Upserts {user_id: encode_portfolio(...) output} in one transaction."""
+        now = datetime.datetime.now().timestamp()
+        with self.transaction() as conn:
+            conn.executemany(UPSERT_PORTFOLIO, [(uid, data, now) for uid, data in rows.items()])
+
+    def modify_portfolios(self, user_ids, update, known=None):
+        """Read-modify-write of several users' rows in one transaction.
+        
+        No other worker can write between the read and the write.
+        update(user_id, stored, seq) gets the stored portfolio and its seq;
+        stored is None when the user has no row yet or when `known`
+        ({user_id: seq}) shows the caller already holds that version. It
+        returns the portfolio to write, or None to leave the row alone.
+        Returns {user_id: new seq} for the rows written.
+        """
+        known = known or {}
+        written = {}
+        with self.transaction() as conn:
+            now = datetime.datetime.now().timestamp()
+            for user_id in user_ids:
+                row = conn.execute(SELECT_PORTFOLIO, (user_id,)).fetchone()
+                seq = row["seq"] if row else 0
+                stored = json.loads(row["data"]) if row and known.get(user_id) != seq else None
+                portfolio = update(user_id, stored, seq)
+                if portfolio is not None:
+                    conn.execute(UPSERT_PORTFOLIO, (user_id, encode_portfolio(portfolio), now))
+                    written[user_id] = conn.execute(SELECT_PORTFOLIO_SEQ).fetchone()[0]
+        return written
+
+    def load_portfolio(self, user_id):
+        row = self.load_portfolio_row(user_id)
+        return row[0] if row else None
+
+    def load_portfolio_row(self, user_id):
+        """(portfolio, seq) for one user, or None."""
+        with self.connection() as conn:
+            row = conn.execute(SELECT_PORTFOLIO, (user_id,)).fetchone()
+        return (json.loads(row["data"]), row["seq"]) if row else None
+
+    def load_portfolios(self):
+        with self.connection() as conn:
+            return {row["user_id"]: json.loads(row["data"]) for row in conn.execute(SELECT_PORTFOLIOS)}
+
+    def portfolios_since(self, seq):
+        """[(user_id, portfolio, seq), ...] written after `seq`, oldest first."""
+        with self.connection() as conn:
+            return [(row["user_id"], json.loads(row["data"]), row["seq"])
+                    for row in conn.execute(SELECT_PORTFOLIOS_SINCE, (seq,))]
+
+    def portfolio_seq(self):
+        """seq of the latest portfolio write (0 if there is none)."""
+        with self.connection() as conn:
+            return conn.execute(SELECT_PORTFOLIO_SEQ).fetchone()[0]
+
+    def count_portfolios(self):
+        with self.connection() as conn:
+            return conn.execute(COUNT_PORTFOLIOS).fetchone()[0]
+
+
+_storage_instance = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    """The process-wide Storage (database path from DB_PATH)."""
+    global _storage_instance
+    if _storage_instance is None:
+        with _storage_lock:
+            if _storage_instance is None:
+                _storage_instance = Storage(os.getenv("DB_PATH", os.path.join("data", "tasi.db")))
+    return _storage_instance
@@ -1,7 +1,55 @@
 import random
 
+import numpy as np
+
+_rng = np.random.default_rng()
+
+# Columns of the symbol x feature matrix every strategy rule reads
+FEATURES = ("price", "rsi", "macd_cross", "trend_cross", "bb_lower", "bb_upper",
+            "ema20", "ema50", "swing_high", "swing_low")
+(F_PRICE, F_RSI, F_MACD_CROSS, F_TREND_CROSS, F_BB_LOWER, F_BB_UPPER,
+ F_EMA20, F_EMA50, F_SWING_HIGH, F_SWING_LOW) = range(len(FEATURES))
+
+def feature_matrix(market_data):
+    """Returns (symbols, X) with one row per symbol; missing indicators are NaN.
+    
+    Built once per snapshot and cached on it, so every bot and every round
+    evaluated against the same version shares one matrix.
+    """
+    cached = market_data.derived.get("features")
+    if cached is not None:
+        return cached
+    symbols = list(market_data.keys())
+    X = np.full((len(symbols), len(FEATURES)), np.nan)
+    for row, sym in enumerate(symbols):
+        X[row, F_PRICE] = market_data[sym]
+        ind = market_data.indicators.get(sym)
+        if ind:
+            X[row, 1:] = [np.nan if ind[f] is None else ind[f] for f in FEATURES[1:]]
+    X.setflags(write=False)
+    market_data.derived["features"] = (symbols, X)
+    return symbols, X
+
+def _no_signal(n_bots):
+    return np.full(n_bots, -1), np.zeros(n_bots, dtype=np.int8)
+
+def _first_signal(actions, n_bots):
+    """Deterministic rules: every bot takes the first symbol with a signal."""
+    hits = np.flatnonzero(actions)
+    if not len(hits):
+        return _no_signal(n_bots)
+    first = int(hits[0])
+    return np.full(n_bots, first), np.full(n_bots, actions[first], dtype=np.int8)
+
+def _round(value, digits=2):
+    return round(value, digits) if value is not None else None
+
 class BaseStrategy:
-    def __init__(self, bot_id, name, human_name, bio, risk, strategy_title, scientific_explanation):
+    # Minimum market-seconds between two evaluations of one bot
+    CADENCE = 3.0
+
+    def __init__(self, bot_id, name, human_name, bio, risk, strategy_title, scientific_explanation,
+                 cadence=None, symbols=None):
         self.bot_id = bot_id
         self.name = name
         self.human_name = human_name
@@ -9,11 +57,19 @@ class BaseStrategy:
         self.risk = risk
         self.strategy_title = strategy_title
         self.scientific_explanation = scientific_explanation
+        self.cadence = self.CADENCE if cadence is None else cadence
+        # Symbols this bot trades; None subscribes it to the whole market
+        self.symbols = frozenset(symbols) if symbols is not None else None
+        # MarketSnapshot version this bot last analysed
+        self.last_seen_version = None
         
     
+    # Signal reason per action (+1 BUY / -1 SELL)
+    REASONS = {}
+
     def analyze(self, market_data):
         """
-        Input: market_data (dict) -> {symbol: price}
+        Input: market_data (MarketSnapshot) -> {symbol: price}
         Output: Signal or None
         Signal: {
             "symbol": str, 
@@ -23,46 +79,74 @@ class BaseStrategy:
             "evidence": dict  <-- NEW: Rich Evidence Data
         }
         """
+        for _, signal in evaluate_bots([self], market_data):
+            return signal
+        return None
+
+    @classmethod
+    def vector_rule(cls, X, n_bots, rng):
+        """
+        Strategy rule over the whole market at once.
+        
+        X is the symbol x feature matrix from feature_matrix(). Returns
+        (symbol_index, action) arrays of length n_bots where action is
+        +1 BUY, -1 SELL or 0 for no signal.
+        """
         raise NotImplementedError
 
-    def generate_evidence(self, symbol, action):
-        """Generates simulated rich evidence based on the specific strategy type."""
+    def build_signal(self, symbol, action, market_data):
+        side = "BUY" if action > 0 else "SELL"
+        return {
+            "symbol": symbol,
+            "type": side,
+            "price": market_data[symbol],
+            "reason": self.REASONS[action],
+            "evidence": self.generate_evidence(symbol, side, market_data.indicators.get(symbol))
+        }
+
+    def generate_evidence(self, symbol, action, indicators=None):
+        """Builds rich evidence for a signal; technical bots quote the live indicator values."""
         
         # Default: Social/News Evidence (for Sentiment, Random, Contrarian)
         evidence_type = "sentiment"
         data = {}
+        ind = indicators or {}
         
         # 1. Technical Strategy Evidence (RSI, MACD, Bollinger, Trend, Golden)
         if isinstance(self, (RSI_Bot, MACD_Bot, BollingerBot, TrendFollower, GoldenRatioBot)):
             evidence_type = "technical"
             
-            # Simulate Indicator Values based on the Bot
+            # Indicator values straight from the shared IndicatorEngine
             indicators = {}
-            chart_points = []
             
             if isinstance(self, RSI_Bot):
-                val = random.randint(20, 29) if action == "BUY" else random.randint(71, 85)
-                indicators = {"RSI (14)": val, "Support": "Strong"}
+                val = ind.get("rsi")
+                indicators = {"RSI (14)": val, "Support": _round(ind.get("bb_lower"))}
                 note = f"مؤشر RSI وصل مستويات {val} مما يدعم الانعكاس."
                 
             elif isinstance(self, MACD_Bot):
-                indicators = {"MACD": "Positive Cross", "Histogram": "+0.45"}
-                note = "تقاطع إيجابي لخطوط الماكد مع تزايد الزخم."
+                hist = ind.get("macd_hist") or 0.0
+                indicators = {"MACD": _round(ind.get("macd"), 4), "Histogram": f"{hist:+.4f}"}
+                note = "تقاطع إيجابي لخطوط الماكد مع تزايد الزخم." if action == "BUY" else "تقاطع سلبي لخطوط الماكد مع تراجع الزخم."
                 
             elif isinstance(self, BollingerBot):
-                indicators = {"Band Width": "Squeeze", "Price": "Lower Band"}
-                note = "السعر يلامس الحد السفلي للبولنجر مع انحراف معياري منخفض."
+                band = "Lower Band" if action == "BUY" else "Upper Band"
+                width = (ind["bb_upper"] - ind["bb_lower"]) if ind.get("bb_upper") is not None else None
+                indicators = {"Band Width": _round(width), "Price": band,
+                              "Lower": _round(ind.get("bb_lower")), "Upper": _round(ind.get("bb_upper"))}
+                note = "السعر يلامس الحد السفلي للبولنجر." if action == "BUY" else "السعر يلامس الحد العلوي للبولنجر."
                 
             else: # Trend / Golden
-                indicators = {"EMA 50": "Above", "Trend": "Bullish"}
-                note = "السعر يتداول بثبات فوق المتوسطات المتحركة الرئيسية."
-
-            # Simulate simple chart data (last 10 candles)
-            start_price = 100.0
-            for _ in range(10):
-                change = random.uniform(-1, 1)
-                start_price += change
-                chart_points.append(round(start_price, 2))
+                ema20, ema50 = ind.get("ema20"), ind.get("ema50")
+                trend = "Bullish" if ema20 is not None and ema50 is not None and ema20 > ema50 else "Bearish"
+                indicators = {"EMA 20": _round(ema20), "EMA 50": _round(ema50), "Trend": trend}
+                if isinstance(self, GoldenRatioBot):
+                    indicators["Swing High"] = _round(ind.get("swing_high"))
+                    indicators["Swing Low"] = _round(ind.get("swing_low"))
+                note = "السعر يتداول بثبات فوق المتوسطات المتحركة الرئيسية." if trend == "Bullish" else "السعر يتداول تحت المتوسطات المتحركة الرئيسية."
+
+            # Last observed prices (up to 10 ticks)
+            chart_points = [round(p, 2) for p in ind.get("recent", ())]
                 
             data = {
                 "indicators": indicators,
@@ -82,7 +166,7 @@ class BaseStrategy:
                 "volume_surge": f"+{random.randint(200, 600)}%",
                 "flow_net": "Inflow (شرائي)",
                 "order_book": {"bids": bids, "asks": asks},
-                "vwap": "102.50"
+                "avg_price": f"{ind['avg_price']:.2f}" if ind.get("avg_price") is not None else None
             }
             
         # 3. Sentiment/Fundamental (Default Logic)
@@ -106,88 +190,146 @@ class BaseStrategy:
         }
 
 class RandomBot(BaseStrategy):
-    def analyze(self, market_data):
-        # 10% chance to trade
-        if random.random() > 0.1:
-            return None
-        
-        symbol = random.choice(list(market_data.keys()))
-        price = market_data[symbol]
-        action = random.choice(["BUY", "SELL"])
-        
-        return {
-            "symbol": symbol,
-            "type": action,
-            "price": price,
-            "reason": "Random gut feeling",
-            "evidence": self.generate_evidence(symbol, action)
-        }
+    REASONS = {1: "Random gut feeling", -1: "Random gut feeling"}
+
+    @classmethod
+    def vector_rule(cls, X, n_bots, rng):
+        # 10% chance to trade, random symbol and side
+        fire = rng.random(n_bots) <= 0.1
+        sides = rng.choice(np.array([1, -1], dtype=np.int8), n_bots)
+        return rng.integers(len(X), size=n_bots), np.where(fire, sides, 0)
 
 class TrendFollower(BaseStrategy):
-    def analyze(self, market_data):
-        # Checks if price is above 50 (dummy logic for trend)
-        for sym, price in market_data.items():
-            if price > 50 and random.random() < 0.2:
-                 return {"symbol": sym, "type": "BUY", "price": price, "reason": "Price above 50 SAR breakout", "evidence": self.generate_evidence(sym, "BUY")}
-        return None
+    REASONS = {1: "Price crossed above EMA 50"}
+
+    @classmethod
+    def vector_rule(cls, X, n_bots, rng):
+        # Price crossing above its 50-tick EMA starts a new up-leg
+        actions = np.where(X[:, F_TREND_CROSS] == 1, 1, 0)
+        return _first_signal(actions, n_bots)
 
 class RSI_Bot(BaseStrategy):
-    def analyze(self, market_data):
-        # Simulates RSI logic
-        sym = random.choice(list(market_data.keys()))
-        price = market_data[sym]
-        return {"symbol": sym, "type": "SELL", "price": price, "reason": "RSI Overbought (>70)", "evidence": self.generate_evidence(sym, "SELL")}
+    REASONS = {1: "RSI Oversold (<30)", -1: "RSI Overbought (>70)"}
+
+    @classmethod
+    def vector_rule(cls, X, n_bots, rng):
+        # Most stretched RSI across the market
+        rsi = X[:, F_RSI]
+        stretch = np.abs(rsi - 50)
+        if np.isnan(stretch).all():
+            return _no_signal(n_bots)
+        best = int(np.nanargmax(stretch))
+        action = 1 if rsi[best] <= 30 else -1 if rsi[best] >= 70 else 0
+        return np.full(n_bots, best), np.full(n_bots, action, dtype=np.int8)
 
 class MACD_Bot(BaseStrategy):
-    def analyze(self, market_data):
-        sym = random.choice(list(market_data.keys()))
-        price = market_data[sym]
-        return {"symbol": sym, "type": "BUY", "price": price, "reason": "MACD Golden Cross", "evidence": self.generate_evidence(sym, "BUY")}
+    REASONS = {1: "MACD Golden Cross", -1: "MACD Death Cross"}
+
+    @classmethod
+    def vector_rule(cls, X, n_bots, rng):
+        actions = np.nan_to_num(X[:, F_MACD_CROSS]).astype(np.int8)
+        return _first_signal(actions, n_bots)
 
 class BollingerBot(BaseStrategy):
-    def analyze(self, market_data):
-        sym = random.choice(list(market_data.keys()))
-        price = market_data[sym]
-        return {"symbol": sym, "type": "BUY", "price": price, "reason": "Lower Band Touch", "evidence": self.generate_evidence(sym, "BUY")}
+    REASONS = {1: "Lower Band Touch", -1: "Upper Band Touch"}
+
+    @classmethod
+    def vector_rule(cls, X, n_bots, rng):
+        price, lower, upper = X[:, F_PRICE], X[:, F_BB_LOWER], X[:, F_BB_UPPER]
+        with np.errstate(invalid="ignore"):
+            valid = upper > lower
+            actions = np.where(valid & (price <= lower), 1, np.where(valid & (price >= upper), -1, 0))
+        return _first_signal(actions, n_bots)
 
 class VolumeBot(BaseStrategy):
-    def analyze(self, market_data):
-        sym = random.choice(list(market_data.keys()))
-        price = market_data[sym]
-        return {"symbol": sym, "type": "BUY", "price": price, "reason": "Volume Spike Detected", "evidence": self.generate_evidence(sym, "BUY")}
+    REASONS = {1: "Volume Spike Detected"}
+
+    @classmethod
+    def vector_rule(cls, X, n_bots, rng):
+        return rng.integers(len(X), size=n_bots), np.ones(n_bots, dtype=np.int8)
 
 class SentimentBot(BaseStrategy):
-    def analyze(self, market_data):
-        sym = random.choice(list(market_data.keys()))
-        price = market_data[sym]
-        return {"symbol": sym, "type": "BUY", "price": price, "reason": "Positive Social Sentiment", "evidence": self.generate_evidence(sym, "BUY")}
+    REASONS = {1: "Positive Social Sentiment"}
+
+    @classmethod
+    def vector_rule(cls, X, n_bots, rng):
+        return rng.integers(len(X), size=n_bots), np.ones(n_bots, dtype=np.int8)
 
 class GoldenRatioBot(BaseStrategy):
-    def analyze(self, market_data):
-        sym = random.choice(list(market_data.keys()))
-        price = market_data[sym]
-        return {"symbol": sym, "type": "SELL", "price": price, "reason": "Fibonacci Retracement 61.8%", "evidence": self.generate_evidence(sym, "SELL")}
+    FIB_LEVEL = 0.618
+    TOLERANCE = 0.02
+    REASONS = {1: "Fibonacci Retracement 61.8%", -1: "Fibonacci Retracement 61.8%"}
+
+    @classmethod
+    def vector_rule(cls, X, n_bots, rng):
+        high, low = X[:, F_SWING_HIGH], X[:, F_SWING_LOW]
+        ema20, ema50 = X[:, F_EMA20], X[:, F_EMA50]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            span = high - low
+            # Where the price sits inside the recent swing (0 = low, 1 = high)
+            position = (X[:, F_PRICE] - low) / span
+            # Down-trend bounced 61.8% of the way back up: sell the rally
+            sell = (span > 0) & (ema20 < ema50) & (np.abs(position - cls.FIB_LEVEL) <= cls.TOLERANCE)
+            # Up-trend pulled back 61.8% of the move: buy the dip
+            buy = (span > 0) & (ema20 > ema50) & (np.abs(position - (1 - cls.FIB_LEVEL)) <= cls.TOLERANCE)
+        return _first_signal(np.where(sell, -1, np.where(buy, 1, 0)), n_bots)
 
 class ScalperBot(BaseStrategy):
-    def analyze(self, market_data):
+    REASONS = {1: "Micro-structure arbitrage"}
+    CADENCE = 0.0 # Reacts to every tick
+
+    @classmethod
+    def vector_rule(cls, X, n_bots, rng):
         # High frequency, low change
-        if random.random() < 0.5:
-             sym = random.choice(list(market_data.keys()))
-             price = market_data[sym]
-             return {"symbol": sym, "type": "BUY", "price": price, "reason": "Micro-structure arbitrage", "evidence": self.generate_evidence(sym, "BUY")}
-        return None
+        fire = rng.random(n_bots) < 0.5
+        return rng.integers(len(X), size=n_bots), fire.astype(np.int8)
 
 class ContrarianBot(BaseStrategy):
-    def analyze(self, market_data):
-        sym = random.choice(list(market_data.keys()))
-        price = market_data[sym]
-        return {
-            "symbol": sym,
-            "type": "SELL",
-            "price": price,
-            "reason": "Fading the noise",
-            "evidence": self.generate_evidence(sym, "SELL")
-        }
+    REASONS = {-1: "Fading the noise"}
+
+    @classmethod
+    def vector_rule(cls, X, n_bots, rng):
+        return rng.integers(len(X), size=n_bots), np.full(n_bots, -1, dtype=np.int8)
+
+def group_bots(bots, symbols):
+    """{(strategy class, matrix rows or None): [(position, bot)]}.
+    
+    Bots of one class that subscribe to the same symbols share one rule
+    evaluation; rows are the matrix rows of their symbols (None = all).
+    """
+    groups = {}
+    for position, bot in enumerate(bots):
+        rows = None
+        if bot.symbols is not None:
+            rows = tuple(i for i, sym in enumerate(symbols) if sym in bot.symbols)
+        groups.setdefault((type(bot), rows), []).append((position, bot))
+    return groups
+
+def evaluate_bots(bots, market_data, rng=None):
+    """
+    Evaluates every bot against the snapshot in one vectorized pass.
+    
+    The snapshot is turned into a symbol x feature matrix once; each
+    strategy class then runs its rule over the whole matrix for all of
+    its bots at the same time. Returns [(bot, signal)] in bot order.
+    """
+    if not bots or not market_data:
+        return []
+    rng = rng or _rng
+    symbols, X = feature_matrix(market_data)
+
+    fired = []
+    for (cls, rows), members in group_bots(bots, symbols).items():
+        if rows == ():
+            continue # None of their symbols are quoted yet
+        sym_idx, actions = cls.vector_rule(X if rows is None else X[list(rows)], len(members), rng)
+        for (position, bot), i, action in zip(members, sym_idx.tolist(), actions.tolist()):
+            if action and i >= 0:
+                i = i if rows is None else rows[i]
+                fired.append((position, bot, bot.build_signal(symbols[i], int(action), market_data)))
+
+    fired.sort(key=lambda f: f[0])
+    return [(bot, signal) for _, bot, signal in fired]
 
 # Factory to get all bots
 def get_all_bots():
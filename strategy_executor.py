@@ -0,0 +1,211 @@
+"""
+Runs bot strategies on a process pool, outside the engine's GIL.
+
+Each round the snapshot's symbol x feature matrix (strategies.feature_matrix)
+is copied once into a shared-memory block. The bots of every strategy class
+are split into shards, and each shard is one pool task carrying only the
+block name, the matrix shape, the subscribed rows, the strategy class, the
+shard size and an RNG seed. Workers map the block read-only, so the market
+is never pickled per bot. A worker returns two small arrays (symbol index,
+action) per shard. The engine turns hits into signals, since evidence
+needs the full snapshot.
+
+Results are gathered against a deadline. Bots whose shard has not finished
+in time sit this round out. A late result is dropped when it arrives, so
+one slow strategy cannot hold up the round. A running shard cannot be
+cancelled, so its strategy class also sits out the following rounds until
+the shard ends; otherwise every round would queue another slow task behind
+it and the pool would fill up. Small rounds, where spawning
+tasks costs more than the rules themselves, run inline through
+evaluate_bots().
+"""
+import atexit
+import contextlib
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from strategies import evaluate_bots, feature_matrix, group_bots
+
+# --- Worker side ---
+
+_attached = None  # (name, SharedMemory) of the block this worker has mapped
+
+
+def _matrix(shm_name, shape):
+    global _attached
+    if _attached is None or _attached[0] != shm_name:
+        if _attached is not None:
+            _attached[1].close()  # The engine moved to a bigger block
+        _attached = (shm_name, shared_memory.SharedMemory(name=shm_name))
+    X = np.ndarray(shape, dtype=np.float64, buffer=_attached[1].buf)
+    X.setflags(write=False)
+    return X
+
+
+def _run_shard(shm_name, shape, rows, strategy_cls, n_bots, seed):
+    X = _matrix(shm_name, shape)
+    sym_idx, actions = strategy_cls.vector_rule(X if rows is None else X[list(rows)], n_bots,
+                                                np.random.default_rng(seed))
+    return np.asarray(sym_idx), np.asarray(actions)
+
+
+# --- Engine side ---
+
+def _pool_context():
+    """forkserver (preloading only this module), never fork: the engine process runs many threads."""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+@contextlib.contextmanager
+def _without_main_script():
+    """Stops new workers from re-importing the parent's __main__ script.
+    
+    multiprocessing runs it again in every worker (as __mp_main__), which
+    for `python main.py` would mean a whole second app per worker.
+    Strategy classes live in importable modules, so workers never need it.
+    """
+    main = sys.modules.get("__main__")
+    path = getattr(main, "__file__", None)
+    if path is None:
+        yield
+        return
+    del main.__file__
+    try:
+        yield
+    finally:
+        main.__file__ = path
+
+
+class StrategyExecutor:
+    def __init__(self, workers=None, deadline=1.0, inline_below=64, shard_size=None):
+        """
+        Args:
+            workers: pool processes (default: one per core; 0 keeps everything inline)
+            deadline: seconds a round waits for its shards
+            inline_below: rounds with fewer bots skip the pool
+            shard_size: bots per task (default: each class split evenly over the workers)
+        """
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.deadline = deadline
+        self.inline_below = inline_below
+        self.shard_size = shard_size
+        self.late = 0  # shards dropped for missing the deadline
+        self.skipped = 0  # class groups held back while their late shard still runs
+        self._busy = {}  # late future -> strategy class, until the worker finishes it
+        self._pool = None
+        self._shm = None
+        self._shm_source = None  # the feature matrix currently in the block
+        self._rng = np.random.default_rng()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        workers = os.getenv('STRATEGY_WORKERS')
+        return cls(workers=int(workers) if workers else None,
+                   deadline=float(os.getenv('STRATEGY_DEADLINE', 1.0)),
+                   inline_below=int(os.getenv('STRATEGY_INLINE_BELOW', 64)))
+
+    def evaluate(self, bots, market_data):
+        """Drop-in for strategies.evaluate_bots(): [(bot, signal)] in bot order."""
+        if not bots or not market_data:
+            return []
+        if self.workers <= 0 or len(bots) < self.inline_below:
+            return evaluate_bots(bots, market_data)
+        with self._lock:
+            try:
+                return self._evaluate_pooled(bots, market_data)
+            except BrokenProcessPool as e:
+                print(f"[StrategyExecutor] Pool died ({e}); running this round inline")
+                self._pool = None
+                return evaluate_bots(bots, market_data)
+
+    def _evaluate_pooled(self, bots, market_data):
+        symbols, X = feature_matrix(market_data)
+        shm_name = self._publish(X)
+        pool = self._ensure_pool()
+        self._busy = {f: cls for f, cls in self._busy.items() if not f.done()}
+        busy = set(self._busy.values())
+
+        tasks = {}
+        for (cls, rows), members in group_bots(bots, symbols).items():
+            if rows == ():
+                continue
+            if cls in busy:
+                self.skipped += 1
+                continue
+            size = self.shard_size or -(-len(members) // self.workers)
+            for start in range(0, len(members), size):
+                shard = members[start:start + size]
+                future = pool.submit(_run_shard, shm_name, X.shape, rows, cls, len(shard),
+                                     int(self._rng.integers(2 ** 63)))
+                tasks[future] = (shard, rows, cls)
+
+        done, late = wait(tasks, timeout=self.deadline)
+        for future in late:
+            # Not started yet: never runs. Running: its result is ignored
+            if not future.cancel():
+                self._busy[future] = tasks[future][2]
+        self.late += len(late)
+
+        fired = []
+        for future in done:
+            try:
+                sym_idx, actions = future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                print(f"[StrategyExecutor] Strategy shard failed: {e}")
+                continue
+            shard, rows, _ = tasks[future]
+            for (position, bot), i, action in zip(shard, sym_idx.tolist(), actions.tolist()):
+                if action and i >= 0:
+                    i = i if rows is None else rows[i]
+                    fired.append((position, bot, bot.build_signal(symbols[i], int(action), market_data)))
+        fired.sort(key=lambda f: f[0])
+        return [(bot, signal) for _, bot, signal in fired]
+
+    def _publish(self, X):
+        """Copies X into the shared block (once per snapshot); returns its name."""
+        nbytes = max(X.nbytes, 8)
+        if self._shm is None or self._shm.size < nbytes:
+            self._release_shm()
+            # Headroom so a few more symbols do not force a new block
+            self._shm = shared_memory.SharedMemory(create=True, size=nbytes * 2)
+            self._shm_source = None
+        if self._shm_source is not X:
+            np.ndarray(X.shape, dtype=np.float64, buffer=self._shm.buf)[:] = X
+            self._shm_source = X
+        return self._shm.name
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            with _without_main_script():
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=_pool_context())
+                self._pool.submit(int).result()  # all workers start on the first task
+            atexit.register(self.close)
+        return self._pool
+
+    def _release_shm(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def close(self):
+        """Stops the pool and frees the shared block."""
+        atexit.unregister(self.close)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._release_shm()
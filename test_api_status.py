@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+import asgi
+import main
+from event_bus import EventBus
+
+
+class TestStatusEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = main.app.test_client()
+
+    def test_unchanged_state_returns_304(self):
+        # The background engine may move a version between two requests; retry a few times
+        for _ in range(5):
+            first = self.client.get('/api/status')
+            again = self.client.get('/api/status', headers={'If-None-Match': first.headers['ETag']})
+            if again.status_code == 304:
+                break
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b"")
+        self.assertIn('leaderboard', first.get_json())
+
+    def test_state_change_changes_etag(self):
+        etag = self.client.get('/api/status').headers['ETag']
+        main.kc.publish_market_data({'1120.SR': 12.34}, record=False)
+        response = self.client.get('/api/status', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.get_json()['market']['1120.SR'], 12.34)
+
+    def test_challenge_state_change_changes_etag(self):
+        etag = self.client.get('/api/status').headers['ETag']
+        ended = not main.cm.is_active
+        with mock.patch.object(main.cm, 'is_active', ended):
+            response = self.client.get('/api/status', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['challenge_info']['active'], ended)
+
+
+class TestChartEndpoint(unittest.TestCase):
+    def test_unknown_period_or_interval_is_rejected(self):
+        client = main.app.test_client()
+        with mock.patch.object(main.kc.market_service, 'get_history',
+                               side_effect=AssertionError("reached the cache")):
+            for query in ('period=../../x', 'interval=1d/../../x', 'period=7y'):
+                self.assertEqual(client.get(f'/api/chart/1120.SR?{query}').status_code, 400, query)
+
+    def test_unknown_bars_rule_is_rejected(self):
+        client = main.app.test_client()
+        self.assertEqual(client.get('/api/ticks/1120?bars=1s').status_code, 400)
+        self.assertEqual(client.get('/api/ticks/9999?bars=5min').status_code, 200)
+
+
+class TestStreamEndpoint(unittest.TestCase):
+    def test_streams_above_the_cap_are_refused(self):
+        client = main.app.test_client()
+        with mock.patch.object(main, '_stream_slots', threading.BoundedSemaphore(1)):
+            first = client.get('/api/stream?topics=trade')
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(client.get('/api/stream').status_code, 503)
+            first.close()  # frees the slot
+            again = client.get('/api/stream')
+            self.assertEqual(again.status_code, 200)
+            again.close()
+
+
+class TestAsgiStream(unittest.TestCase):
+    def test_stream_is_served_on_the_event_loop(self):
+        bus = EventBus()
+        sent = []
+
+        async def run():
+            disconnect = asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                sent.append(message)
+                if b"event: trade" in message.get("body", b""):
+                    disconnect.set()  # the client leaves after its first trade
+
+            threading.Timer(0.05, bus.publish, args=("trade", {"id": 1})).start()
+            await asyncio.wait_for(asgi.stream({"query_string": b"topics=trade"}, receive, send, events=bus), 5)
+
+        asyncio.run(run())
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertIn((b"content-type", b"text/event-stream; charset=utf-8"), sent[0]["headers"])
+        self.assertIn(b"event: trade", sent[-1]["body"])
+        self.assertEqual(bus.subscriptions, set())  # unsubscribed on disconnect
+
+
+class TestInjectedServices(unittest.TestCase):
+    def test_handlers_never_rebuild_the_bot_roster(self):
+        ctx = main.ctx
+        self.assertIs(ctx.cm.kc, ctx.kc)
+        self.assertIs(ctx.investigator.kc, ctx.kc)
+        client = main.app.test_client()
+        with mock.patch('strategies.get_all_bots', side_effect=AssertionError("rebuilt per request")):
+            for path in ('/api/robots', '/api/bot/jewel', '/api/trades', '/trades'):
+                self.assertEqual(client.get(path).status_code, 200, path)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
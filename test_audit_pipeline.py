@@ -0,0 +1,77 @@
+import threading
+import unittest
+from unittest import mock
+
+from audit_pipeline import AuditPipeline
+from investigator import InvestigatorBot
+from knowledge_center import MarketSnapshot
+
+
+def _signal(i, symbol, price, side="BUY", evidence=None):
+    return {"id": i, "bot_id": "b", "symbol": symbol, "type": side, "price": price, "evidence": evidence}
+
+
+class TestInvestigatorBatch(unittest.TestCase):
+    def setUp(self):
+        self.investigator = InvestigatorBot(None)
+        self.investigator.RANDOM_AUDIT = 0.0
+        self.market = MarketSnapshot({"A": 100.0, "B": 50.0}, version=1,
+                                     indicators={"A": {"rsi": 28.0}, "B": {"rsi": None}})
+
+    def test_batch_matches_each_check(self):
+        technical = lambda rsi: {"type": "technical", "data": {"indicators": {"RSI (14)": rsi}}}  # noqa: E731
+        sentiment = lambda score: {"type": "sentiment", "data": {"sentiment_score": score}}  # noqa: E731
+        signals = [
+            _signal(1, "A", 101.0, evidence=technical(28.4)),
+            _signal(2, "Z", 10.0),
+            _signal(3, "B", 60.0),
+            _signal(4, "A", 100.0, evidence=technical(35.0)),
+            _signal(5, "B", 50.0, evidence=sentiment(0.2)),
+            _signal(6, "B", 50.0, side="SELL", evidence=sentiment(0.2)),
+        ]
+        verdicts = self.investigator.check_batch([(s, self.market) for s in signals])
+        self.assertEqual(verdicts, ["APPROVED", "REJECTED (Symbol Not Found)", "REJECTED (Price Mismatch > 5%)",
+                                    "REJECTED (RSI Evidence Mismatch)", "REJECTED (Sentiment Mismatch)", "APPROVED"])
+        self.assertEqual(signals[0]["audit_trail"][0]["check"], "قيمة مؤشر RSI")
+        self.assertNotIn("audit_trail", signals[3])
+        self.assertEqual(self.investigator.check_signal(_signal(7, "A", 99.0), self.market), "APPROVED")
+
+    def test_pipeline_batches_and_writes_every_verdict(self):
+        written = []
+        release = threading.Event()
+
+        def on_verdict(signal, verdict, market_data):
+            release.wait()
+            written.append((signal["id"], verdict))
+
+        pipeline = AuditPipeline(self.investigator, on_verdict, workers=2, batch_size=16, maxsize=64)
+        pipeline.start()
+        for i in range(50):
+            pipeline.submit(_signal(i, "A", 100.0), self.market)  # never waits on an audit
+        release.set()
+        pipeline.join()
+        self.assertEqual(sorted(written), [(i, "APPROVED") for i in range(50)])
+        self.assertEqual(pipeline.audited, 50)
+        self.assertLess(pipeline.batches, 50)
+
+    def test_failed_audit_still_gives_every_signal_a_verdict(self):
+        check_batch = self.investigator.check_batch
+
+        def flaky(batch):
+            if any(signal["symbol"] == "BAD" for signal, _ in batch):
+                raise ValueError("corrupt evidence")
+            return check_batch(batch)
+
+        written = {}
+        pipeline = AuditPipeline(self.investigator, lambda s, v, m: written.__setitem__(s["id"], v),
+                                 batch_size=16, linger=0.05)
+        with mock.patch.object(self.investigator, "check_batch", side_effect=flaky):
+            for i in range(10):
+                pipeline.submit(_signal(i, "BAD" if i == 3 else "A", 100.0), self.market)
+            pipeline.start()
+            pipeline.join()
+        self.assertEqual(written, {i: AuditPipeline.AUDIT_ERROR if i == 3 else "APPROVED" for i in range(10)})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,90 @@
+import datetime
+import threading
+import time
+import unittest
+
+from bot_scheduler import BotScheduler
+from knowledge_center import KnowledgeCenter, MarketSnapshot
+from market_service import MarketService
+from strategies import ScalperBot, TrendFollower
+
+
+class FakeProvider:
+    speed = 1.0
+
+    def __init__(self, now):
+        self.current = now
+
+    def now(self):
+        return self.current
+
+
+class FakeMarketService:
+    def __init__(self, now):
+        self.provider = FakeProvider(now)
+
+    get_market_status = MarketService.get_market_status
+    seconds_until_open = MarketService.seconds_until_open
+
+
+class FakeKnowledgeCenter:
+    def __init__(self, now):
+        self.market_service = FakeMarketService(now)
+
+
+class FakeChallenge:
+    is_active = True
+    bot_scores = {}
+
+
+class TestBotScheduler(unittest.TestCase):
+    def setUp(self):
+        self.kc = FakeKnowledgeCenter(datetime.datetime(2024, 1, 7, 11, 0))  # Sunday, in session
+        self.now = 100.0
+        self.evaluated = []
+        self.scheduler = BotScheduler(self.kc, FakeChallenge(), [], self.evaluate, lambda *a: None,
+                                      clock=lambda: self.now)
+
+    def evaluate(self, bots, snapshot):
+        self.evaluated.append((snapshot.version, sorted(b.bot_id for b in bots)))
+        return []
+
+    def test_bots_run_on_their_symbols_and_cadence(self):
+        fast = ScalperBot("fast", "", "", "", "", "", "", symbols=["A"])
+        slow = TrendFollower("slow", "", "", "", "", "", "", cadence=10)
+        self.scheduler.bots = [fast, slow]
+
+        v1 = MarketSnapshot({"A": 1.0, "B": 2.0}, version=1)
+        self.assertIsNone(self.scheduler.run_round(v1))
+        self.scheduler.run_round(v1)  # same version: no second round
+        # Only B moved: the A-only bot stays asleep, the slow one waits for its cadence
+        v2 = MarketSnapshot({"A": 1.0, "B": 2.5}, version=2, symbol_versions={"A": 1, "B": 2})
+        self.now += 4
+        self.assertEqual(self.scheduler.run_round(v2), 6)
+        self.now += 6
+        self.scheduler.run_round(v2)
+        self.assertEqual(self.evaluated, [(1, ["fast", "slow"]), (2, ["slow"])])
+
+    def test_idles_until_the_market_opens(self):
+        self.assertEqual(self.scheduler.idle_for(), 0.0)
+        self.kc.market_service.provider.current = datetime.datetime(2024, 1, 11, 16, 0)  # Thursday close
+        self.assertEqual(self.kc.market_service.seconds_until_open(), 66 * 3600)  # Sunday 10:00
+        self.assertEqual(self.scheduler.idle_for(), BotScheduler.IDLE_CHECK)
+        self.assertEqual(self.kc.market_status, "CLOSED")
+
+    def test_new_snapshot_wakes_waiter_immediately(self):
+        kc = KnowledgeCenter()
+        version = kc.get_market_snapshot().version
+        timer = threading.Timer(0.05, kc.publish_market_data, args=({"1120.SR": 50.0},), kwargs={"record": False})
+        started = time.perf_counter()
+        timer.start()
+        snapshot = kc.wait_for_market(version, timeout=5)
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(snapshot.version, version + 1)
+        self.assertEqual(snapshot.symbol_versions["1120.SR"], version + 1)
+        self.assertTrue(snapshot.changed_since(version, {"1120.SR"}))
+        self.assertFalse(snapshot.changed_since(version, {"2222.SR"}))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,75 @@
+import datetime
+import os
+import random
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from challenge_manager import ChallengeManager, Leaderboard
+from event_bus import EventBus
+from storage import Storage
+
+
+class TestLeaderboard(unittest.TestCase):
+    def test_matches_full_sort_after_random_updates(self):
+        board = Leaderboard(lambda bot_id, stats: {"id": bot_id, "pnl": stats["pnl"]})
+        scores = {f"bot{i}": 0.0 for i in range(500)}
+        for bot_id, pnl in scores.items():
+            board.update(bot_id, {"pnl": pnl})
+
+        rng = random.Random(3)
+        for _ in range(2000):
+            bot_id = rng.choice(list(scores))
+            scores[bot_id] += rng.uniform(-500, 1000)
+            board.update(bot_id, {"pnl": scores[bot_id]})
+
+        expected = sorted(scores, key=lambda b: scores[b], reverse=True)
+        self.assertEqual([row["id"] for row in board.ranking()], expected)
+        self.assertEqual(board.rank(expected[0]), 1)
+        self.assertEqual(board.rank(expected[123]), 124)
+
+    def test_ranking_is_cached_per_version(self):
+        cm = ChallengeManager()
+        cm.start_new_challenge()
+        first = cm.get_leaderboard()
+        self.assertIs(cm.get_leaderboard(), first)
+
+        version = cm.leaderboard.version
+        cm.update_score("wave", 750.0)
+        self.assertGreater(cm.leaderboard.version, version)
+        self.assertEqual(cm.get_leaderboard()[0]["id"], "wave")
+        self.assertEqual(cm.get_rank("wave"), 1)
+
+
+class TestChallengeRestart(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = Storage(os.path.join(self.tmp.name, "test.db"))
+        self.kc = SimpleNamespace(storage=self.storage, events=EventBus())
+
+    def tearDown(self):
+        self.storage.close()
+        self.tmp.cleanup()
+
+    def test_running_challenge_survives_a_restart(self):
+        cm = ChallengeManager(self.kc)
+        self.assertFalse(cm.resume_challenge())  # nothing stored yet
+        cm.start_new_challenge()
+        cm.update_score("wave", 750.0)
+
+        restarted = ChallengeManager(self.kc)
+        self.assertTrue(restarted.resume_challenge())
+        self.assertTrue(restarted.is_active)
+        self.assertEqual(restarted.bot_scores["wave"]["pnl"], 750.0)
+        self.assertEqual(restarted.get_rank("wave"), 1)
+        self.assertEqual(restarted.end_date, cm.end_date)
+
+    def test_finished_challenge_is_not_resumed(self):
+        now = datetime.datetime.now()
+        self.storage.start_challenge(now - datetime.timedelta(days=6), now - datetime.timedelta(days=1),
+                                     {"wave": {"pnl": 5.0, "trades": 1, "wins": 1, "status": "ACTIVE"}})
+        self.assertFalse(ChallengeManager(self.kc).resume_challenge())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,39 @@
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from chart_serializer import encode_candles
+
+
+class TestEncodeCandles(unittest.TestCase):
+    def setUp(self):
+        index = pd.DatetimeIndex(["2024-01-01 10:00", "2024-01-02 10:00", "2024-01-03 23:30"], tz="Asia/Riyadh")
+        self.df = pd.DataFrame({
+            "Open": [10.0, np.nan, 12.0], "High": [11.0, 12.0, 13.0],
+            "Low": [9.5, 10.5, 11.5], "Close": [10.5, 11.5, 12.5], "Volume": [1, 2, 3],
+        }, index=index)
+
+    def test_rows_layout_matches_lightweight_charts(self):
+        rows = json.loads(encode_candles(self.df))
+        self.assertEqual(rows, [
+            {"time": "2024-01-01", "open": 10.0, "high": 11.0, "low": 9.5, "close": 10.5},
+            {"time": "2024-01-03", "open": 12.0, "high": 13.0, "low": 11.5, "close": 12.5},
+        ])
+
+    def test_columnar_layout(self):
+        cols = json.loads(encode_candles(self.df, layout="columnar"))
+        self.assertEqual(cols["time"], ["2024-01-01", "2024-01-03"])
+        self.assertEqual(cols["close"], [10.5, 12.5])
+
+    def test_intraday_uses_epoch_seconds(self):
+        cols = json.loads(encode_candles(self.df, layout="columnar", intraday=True))
+        self.assertEqual(cols["time"][0], int(pd.Timestamp("2024-01-01 07:00", tz="UTC").timestamp()))
+
+    def test_empty_frame(self):
+        self.assertEqual(json.loads(encode_candles(self.df.iloc[:0])), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,55 @@
+import asyncio
+import datetime
+import json
+import threading
+import time
+import unittest
+
+from event_bus import EventBus
+
+
+class TestEventBus(unittest.TestCase):
+    def test_topic_filtering(self):
+        bus = EventBus()
+        trades = bus.subscribe(["trade"])
+        everything = bus.subscribe()
+
+        self.assertEqual(bus.publish("verdict", {"verdict": "APPROVED", "timestamp": datetime.datetime(2025, 1, 1)}), 1)
+        bus.publish("trade", {"id": 2, "symbol": "1120.SR"})
+
+        frames = trades.get(timeout=0).decode().strip().split("\n\n")
+        self.assertEqual(len(frames), 1)
+        self.assertIn("event: trade", frames[0])
+        self.assertEqual(json.loads(frames[0].split("data: ")[1])["id"], 2)
+        self.assertIn(b'"2025-01-01T00:00:00"', everything.get(timeout=0))
+
+        bus.unsubscribe(trades)
+        self.assertEqual(bus.publish("trade", {}), 1)
+
+    def test_slow_client_drops_oldest(self):
+        bus = EventBus()
+        slow = bus.subscribe(["trade"], maxlen=3)
+        for i in range(10):
+            bus.publish("trade", {"id": i})
+
+        frames = slow.get(timeout=0).decode().strip().split("\n\n")
+        self.assertEqual(frames[0], "event: lagged\ndata: 7")
+        self.assertEqual([json.loads(f.split("data: ")[1])["id"] for f in frames[1:]], [7, 8, 9])
+        self.assertEqual(slow.get(timeout=0), b"")
+
+    def test_async_wait_wakes_on_publish(self):
+        bus = EventBus()
+        sub = bus.subscribe(["market"])
+
+        async def wait():
+            threading.Timer(0.05, bus.publish, args=("market", {"version": 1, "prices": {}})).start()
+            return await sub.next(timeout=5)
+
+        started = time.monotonic()
+        self.assertIn(b"event: market", asyncio.run(wait()))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(asyncio.run(sub.next(timeout=0.01)), b"")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,88 @@
+import tempfile
+import threading
+import time
+import unittest
+
+import pandas as pd
+
+from history_cache import HistoryCache
+
+
+def bars(start, count):
+    index = pd.date_range(start, periods=count, freq="1D", tz="UTC")
+    close = [float(i) for i in range(count)]
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close}, index=index)
+
+
+class FakeFetch:
+    def __init__(self, full, delay=0):
+        self.full = full
+        self.delay = delay
+        self.calls = []
+
+    def __call__(self, ticker_sym, period, interval, start=None):
+        self.calls.append(start)
+        time.sleep(self.delay)
+        if start is None:
+            return self.full
+        return self.full[self.full.index >= start]
+
+
+class TestHistoryCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_memory_hit_skips_provider(self):
+        fetch = FakeFetch(bars("2024-01-01", 30))
+        cache = HistoryCache(fetch, cache_dir=None, ttl=60)
+        first = cache.get("1120.SR", "1mo", "1d")
+        second = cache.get("1120.SR", "1mo", "1d")
+        self.assertIs(first, second)
+        self.assertEqual(fetch.calls, [None])
+
+    def test_incremental_refresh_only_fetches_new_bars(self):
+        fetch = FakeFetch(bars("2024-01-01", 30))
+        cache = HistoryCache(fetch, cache_dir=None, ttl=0)
+        cache.get("1120.SR", "max", "1d")
+
+        fetch.full = bars("2024-01-01", 32)
+        frame = cache.get("1120.SR", "max", "1d")
+        self.assertEqual(fetch.calls[1], pd.Timestamp("2024-01-30", tz="UTC"))
+        self.assertEqual(len(frame), 32)
+        self.assertTrue(frame.index.is_unique)
+
+    def test_disk_tier_survives_restart(self):
+        fetch = FakeFetch(bars("2024-01-01", 10))
+        HistoryCache(fetch, cache_dir=self.tmp.name).get("2222.SR", "1mo", "1d")
+
+        restarted = HistoryCache(fetch, cache_dir=self.tmp.name)
+        frame = restarted.get("2222.SR", "1mo", "1d")
+        self.assertEqual(len(frame), 10)
+        self.assertEqual(restarted.stats["disk_hits"], 1)
+        self.assertIsNotNone(fetch.calls[-1])  # incremental, not a full download
+
+    def test_keys_cannot_leave_cache_dir(self):
+        cache = HistoryCache(FakeFetch(bars("2024-01-01", 10)), cache_dir=self.tmp.name)
+        for key in (("1120.SR", "../x", "1d"), ("..", "1mo", "1d"), ("1120.SR", "1mo", "a\\b")):
+            with self.assertRaises(ValueError):
+                cache._path(key)
+
+    def test_concurrent_misses_share_one_fetch(self):
+        fetch = FakeFetch(bars("2024-01-01", 10), delay=0.2)
+        cache = HistoryCache(fetch, cache_dir=None)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get("7010.SR", "1mo", "1d")))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(fetch.calls), 1)
+        self.assertEqual(len(results), 8)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,91 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorEngine
+from knowledge_center import MarketSnapshot
+from strategies import BollingerBot, MACD_Bot, RSI_Bot, SentimentBot, evaluate_bots
+
+
+def wilder_rsi(prices, n=14):
+    changes = np.diff(prices)
+    gains, losses = np.clip(changes, 0, None), np.clip(-changes, 0, None)
+    avg_gain, avg_loss = gains[:n].mean(), losses[:n].mean()
+    for g, l in zip(gains[n:], losses[n:]):
+        avg_gain = (avg_gain * (n - 1) + g) / n
+        avg_loss = (avg_loss * (n - 1) + l) / n
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+class TestIndicatorEngine(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.prices = 50 + np.cumsum(rng.normal(0, 0.5, 120))
+        self.engine = IndicatorEngine()
+        for price in self.prices:
+            view = self.engine.update({"1120.SR": price})
+        self.values = view["1120.SR"]
+
+    def test_matches_batch_reference(self):
+        series = pd.Series(self.prices)
+        self.assertAlmostEqual(self.values["rsi"], wilder_rsi(self.prices), places=2)
+        self.assertAlmostEqual(self.values["ema50"], series.ewm(span=50, adjust=False).mean().iloc[-1])
+
+        macd = series.ewm(span=12, adjust=False).mean() - series.ewm(span=26, adjust=False).mean()
+        self.assertAlmostEqual(self.values["macd"], macd.iloc[-1])
+        self.assertAlmostEqual(self.values["macd_signal"], macd.ewm(span=9, adjust=False).mean().iloc[-1])
+
+        mid = series.rolling(20).mean().iloc[-1]
+        std = series.rolling(20).std(ddof=0).iloc[-1]
+        self.assertAlmostEqual(self.values["bb_mid"], mid)
+        self.assertAlmostEqual(self.values["bb_upper"], mid + 2 * std)
+        self.assertAlmostEqual(self.values["swing_high"], series.iloc[-50:].max())
+        self.assertAlmostEqual(self.values["avg_price"], series.mean())
+
+    def test_view_is_read_only(self):
+        with self.assertRaises(TypeError):
+            self.values["rsi"] = 10
+
+    def test_indicators_warm_up(self):
+        engine = IndicatorEngine()
+        values = engine.update({"2222.SR": 30.0})["2222.SR"]
+        self.assertIsNone(values["rsi"])
+        self.assertIsNone(values["bb_lower"])
+
+
+class TestTechnicalBots(unittest.TestCase):
+    def snapshot_after(self, prices):
+        engine = IndicatorEngine()
+        for price in prices:
+            view = engine.update({"1120.SR": price})
+        return MarketSnapshot({"1120.SR": prices[-1]}, version=1, indicators=view)
+
+    def test_rsi_bot_signals_only_on_extremes(self):
+        bot = RSI_Bot("sniper", "ذيب", "ذيب", "", "", "القنص الدقيق", "")
+        rising = self.snapshot_after([50 + i for i in range(30)])
+        signal = bot.analyze(rising)
+        self.assertEqual(signal["type"], "SELL")
+        self.assertEqual(signal["evidence"]["data"]["indicators"]["RSI (14)"], 100.0)
+
+        flat = self.snapshot_after([50 + (i % 2) for i in range(30)])
+        self.assertIsNone(bot.analyze(flat))
+
+    def test_bollinger_bot_buys_lower_band(self):
+        bot = BollingerBot("guardian", "رزين", "رزين", "", "", "الحماية الحكيمة", "")
+        snapshot = self.snapshot_after([50 + (i % 2) for i in range(25)] + [40])
+        self.assertEqual(bot.analyze(snapshot)["type"], "BUY")
+
+    def test_batch_evaluation_matches_single_bot(self):
+        snapshot = self.snapshot_after([50 + i for i in range(30)])
+        bots = [RSI_Bot(f"rsi{i}", "", "", "", "", "", "") for i in range(50)]
+        bots += [MACD_Bot("macd", "", "", "", "", "", ""), SentimentBot("analyst", "", "", "", "", "", "")]
+
+        fired = evaluate_bots(bots, snapshot)
+        self.assertEqual([b.bot_id for b, _ in fired], [f"rsi{i}" for i in range(50)] + ["analyst"])
+        self.assertEqual(fired[0][1]["reason"], bots[0].analyze(snapshot)["reason"])
+        self.assertIsNone(bots[-2].analyze(snapshot))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+from knowledge_center import KnowledgeCenter, MarketSnapshot
+from market_service import FetchScheduler
+from signal_registry import SignalRegistry
+
+
+class TestMarketSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.kc = KnowledgeCenter()
+
+    def test_snapshot_is_immutable(self):
+        snapshot = MarketSnapshot({"1120.SR": 80.0}, version=3)
+        with self.assertRaises(TypeError):
+            snapshot["1120.SR"] = 1.0
+        self.assertEqual(snapshot.to_dict(), {"1120.SR": 80.0})
+        self.assertEqual(snapshot.version, 3)
+
+    def test_publish_swaps_in_new_version(self):
+        before = self.kc.get_market_snapshot()
+        after = self.kc.publish_market_data({"1120.SR": 81.5})
+
+        self.assertIs(self.kc.get_market_snapshot(), after)
+        self.assertEqual(after.version, before.version + 1)
+        self.assertEqual(after["1120.SR"], 81.5)
+        # The old snapshot is untouched
+        self.assertNotEqual(before.get("1120.SR"), 81.5)
+
+    def test_only_moved_symbols_get_a_new_version(self):
+        before = self.kc.get_market_snapshot()
+        self.assertIs(self.kc.publish_market_data({"1120.SR": before["1120.SR"]}), before)
+
+        after = self.kc.publish_market_data({"1120.SR": before["1120.SR"], "2222.SR": before["2222.SR"] + 1})
+        self.assertEqual(after.version, before.version + 1)
+        self.assertEqual(after.symbol_versions["2222.SR"], after.version)
+        self.assertFalse(after.changed_since(before.version, {"1120.SR"}))
+
+    def test_market_event_carries_only_the_moved_prices(self):
+        subscription = self.kc.events.subscribe(["market"])
+        self.addCleanup(self.kc.events.unsubscribe, subscription)
+        before = self.kc.get_market_snapshot()
+        after = self.kc.publish_market_data({"1120.SR": before["1120.SR"], "2222.SR": before["2222.SR"] + 1},
+                                            record=False)
+
+        frames = subscription.get(timeout=0).decode().strip().split("\n\n")
+        events = [json.loads(frame.split("data: ")[1]) for frame in frames]
+        self.assertIn({"version": after.version, "prices": {"2222.SR": after["2222.SR"]}}, events)
+
+    def test_repeated_price_is_not_a_new_tick(self):
+        self.kc.publish_market_data({"1180.SR": 10.0})
+        ticks = self.kc.indicators.get("1180.SR")["ticks"]
+        self.kc.publish_market_data({"1180.SR": 10.0})
+        self.assertEqual(self.kc.indicators.get("1180.SR")["ticks"], ticks)
+
+    def test_verdict_logging_never_waits_on_the_provider(self):
+        signal = self.kc.log_signal("wave", "1120.SR", "BUY", 80.0, "test")
+        blocked = FetchScheduler(rate=0.001, sleep=lambda s: self.fail("verdict logging waited for a fetch"))
+        blocked._reserve()  # bucket empty: the next fetch would have to wait
+        with mock.patch.object(self.kc.market_service, 'scheduler', blocked):
+            started = time.perf_counter()
+            entry = self.kc.log_investigator_verdict(signal["id"], "APPROVED", "ok")
+        self.assertLess(time.perf_counter() - started, 0.1)
+        self.assertEqual(entry["bot_id"], "wave")
+        self.assertEqual(self.kc.bot_signals.get(signal["id"])["status"], "APPROVED")
+
+    def test_readers_never_see_concurrent_writes(self):
+        errors = []
+        before = self.kc.get_market_snapshot()
+        tickers = self.kc.tickers
+        # The singleton is shared with other tests: no new symbols, no recorded ticks
+        self.addCleanup(self.kc.publish_market_data, before.to_dict(), record=False)
+
+        def writer():
+            for i in range(2000):
+                self.kc.publish_market_data({tickers[i % len(tickers)]: float(i)}, record=False)
+
+        def reader():
+            try:
+                for _ in range(2000):
+                    snapshot = self.kc.get_market_snapshot()
+                    sum(price for _, price in snapshot.items())
+            except RuntimeError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+
+class TestSignalRegistry(unittest.TestCase):
+    def test_indexes_follow_updates_and_eviction(self):
+        registry = SignalRegistry(maxlen=3)
+        for bot in ("a", "b", "a", "c"):
+            registry.append({"id": registry.next_id(), "bot_id": bot, "symbol": "1120.SR", "status": "PENDING"})
+
+        self.assertNotIn(1, registry)  # evicted
+        self.assertEqual([s["id"] for s in registry.select("bot_id", "a")], [3])
+        registry.update(2, status="APPROVED")
+        registry.update(4, status="APPROVED")
+        self.assertEqual([s["id"] for s in registry.select("status", "APPROVED", newest_first=True)], [4, 2])
+        self.assertEqual([s["id"] for s in registry.select("status", "PENDING")], [3])
+        self.assertEqual(registry.next_id(), 5)
+
+    def test_late_approval_keeps_id_order(self):
+        registry = SignalRegistry()
+        for _ in range(4):
+            registry.append({"id": registry.next_id(), "bot_id": "a", "symbol": "1120.SR", "status": "PENDING"})
+        for signal_id in (3, 1, 4, 2):  # verdicts from parallel audit batches
+            registry.update(signal_id, status="APPROVED")
+        self.assertEqual([s["id"] for s in registry.select("status", "APPROVED", newest_first=True)], [4, 3, 2, 1])
+        self.assertEqual([s["id"] for s in registry.select("status", "APPROVED", limit=2)], [1, 2])
+
+    def test_no_op_update_keeps_record_indexed(self):
+        registry = SignalRegistry()
+        registry.append({"id": registry.next_id(), "bot_id": "a", "symbol": "1120.SR", "status": "PENDING"})
+        registry.update(1, status="PENDING")  # e.g. a journal replay over a checkpoint
+        self.assertEqual([s["id"] for s in registry.select("status", "PENDING")], [1])
+        self.assertEqual([s["id"] for s in registry.select("bot_id", "a")], [1])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
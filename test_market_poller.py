@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from market_poller import MarketPoller
+
+
+class FakeMarketService:
+    def __init__(self, delays):
+        self.delays = delays
+        self.calls = []
+
+    def get_current_prices(self, symbols):
+        self.calls.append(list(symbols))
+        time.sleep(max(self.delays.get(s, 0) for s in symbols))
+        return {s: 10.0 + i for i, s in enumerate(symbols)}
+
+
+class FakeKnowledgeCenter:
+    def __init__(self, tickers, delays):
+        self.tickers = tickers
+        self.market_service = FakeMarketService(delays)
+        self.market_data = {}
+        self.lock = threading.Lock()
+
+    def publish_market_data(self, prices):
+        with self.lock:
+            self.market_data = {**self.market_data, **prices}
+
+
+class TestMarketPoller(unittest.TestCase):
+    def test_slow_symbol_does_not_delay_others(self):
+        kc = FakeKnowledgeCenter(["A", "B", "C"], {"C": 1.0})
+        poller = MarketPoller(kc, interval=10, timeout=0.2, batch_size=1, max_in_flight=3)
+
+        started = time.monotonic()
+        fresh = asyncio.run(poller.poll_once())
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(set(fresh), {"A", "B"})
+        self.assertEqual(set(kc.market_data), {"A", "B"})
+        self.assertLess(elapsed, 0.8)
+        # The timed-out symbol backs off, the healthy ones keep their cadence
+        self.assertEqual(poller.backoff["C"], 2)
+        self.assertEqual(poller.backoff["A"], 1)
+        self.assertGreater(poller.next_due["C"], poller.next_due["A"])
+
+    def test_due_symbols_are_batched(self):
+        kc = FakeKnowledgeCenter(["A", "B", "C", "D", "E"], {})
+        poller = MarketPoller(kc, interval=10, batch_size=2)
+        asyncio.run(poller.poll_once())
+        self.assertEqual(sorted(len(c) for c in kc.market_service.calls), [1, 2, 2])
+
+        # Nothing is due again until the schedule comes round
+        self.assertEqual(asyncio.run(poller.poll_once()), {})
+
+    def test_symbols_due_soon_join_the_batch(self):
+        kc = FakeKnowledgeCenter(["A", "B", "C"], {})
+        poller = MarketPoller(kc, interval=10, jitter=0.2)
+        now = time.monotonic()
+        poller.next_due = {"A": now, "B": now + 1.5, "C": now + 8}
+        asyncio.run(poller.poll_once())
+        self.assertEqual(kc.market_service.calls, [["A", "B"]])
+
+    def test_timed_out_batch_stays_in_flight_until_its_thread_ends(self):
+        kc = FakeKnowledgeCenter(["A", "C"], {"C": 0.5})
+        poller = MarketPoller(kc, interval=10, timeout=0.1, batch_size=1, max_in_flight=2)
+
+        async def scenario():
+            await poller.poll_once()
+            self.assertEqual(poller.in_flight, {"C"})
+            # Abandoned, but still occupying a worker: C must not be fetched again
+            poller.next_due["C"] = 0
+            self.assertEqual(await poller._dispatch(asyncio.Semaphore(2)), [])
+            await asyncio.sleep(0.6)
+            self.assertEqual(poller.in_flight, set())
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
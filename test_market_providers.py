@@ -0,0 +1,124 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from market_providers import MarketDataProvider, ReplayProvider, YFinanceProvider
+from market_service import MarketService
+
+
+@unittest.skipUnless(hasattr(time, "tzset"), "time.tzset is POSIX only")
+class TestMarketClock(unittest.TestCase):
+    def setUp(self):
+        self.saved_tz = os.environ.get("TZ")
+        os.environ["TZ"] = "UTC"
+        time.tzset()
+
+    def tearDown(self):
+        if self.saved_tz is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = self.saved_tz
+        time.tzset()
+
+    def test_now_is_riyadh_time_on_a_utc_host(self):
+        riyadh = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=3)  # no DST in Riyadh
+        self.assertLess(abs(MarketDataProvider().now() - riyadh), timedelta(seconds=5))
+        self.assertGreater(MarketDataProvider().now() - datetime.now(), timedelta(hours=2, minutes=59))
+
+
+class TestYFinanceProvider(unittest.TestCase):
+    def provider(self, frame):
+        """A YFinanceProvider whose yf.download returns frame (no network, no yfinance needed)."""
+        self.downloads = []
+
+        def download(tickers, **kwargs):
+            self.downloads.append(list(tickers))
+            return frame
+
+        with mock.patch.dict("sys.modules", yfinance=SimpleNamespace(download=download)):
+            return YFinanceProvider()
+
+    def test_multi_ticker_download(self):
+        index = pd.date_range("2024-01-07 07:00", periods=3, freq="1min")
+        columns = pd.MultiIndex.from_product([["Close", "Open"], ["1120.SR", "2222.SR", "2010.SR"]])
+        frame = pd.DataFrame(np.nan, index=index, columns=columns)
+        frame[("Close", "1120.SR")] = [80.0, 80.5, np.nan]  # last bar not printed yet
+        frame[("Close", "2222.SR")] = [30.0, 30.1, 30.2]
+        # 2010.SR is all NaN, 7010.SR is missing from the download altogether
+        provider = self.provider(frame)
+        prices = provider.get_prices(["1120.SR", "2222.SR", "2010.SR", "7010.SR"])
+        self.assertEqual(prices, {"1120.SR": 80.5, "2222.SR": 30.2})
+        self.assertEqual(self.downloads, [["1120.SR", "2222.SR", "2010.SR", "7010.SR"]])  # one request
+
+    def test_single_ticker_download_has_flat_columns(self):
+        frame = pd.DataFrame({"Open": [79.0, 80.0], "Close": [80.0, 81.0]},
+                             index=pd.date_range("2024-01-07 07:00", periods=2, freq="1min"))
+        self.assertEqual(self.provider(frame).get_prices(["1120.SR"]), {"1120.SR": 81.0})
+
+    def test_empty_download(self):
+        self.assertEqual(self.provider(pd.DataFrame()).get_prices(["1120.SR", "2222.SR"]), {})
+        self.assertEqual(self.provider(pd.DataFrame()).get_prices([]), {})
+        self.assertEqual(self.downloads, [])  # nothing to ask for
+
+
+class TestReplayProvider(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        index = pd.date_range("2024-01-07 07:00", periods=60, freq="1min", tz="UTC")
+        bars = pd.DataFrame({
+            "Open": range(60), "High": range(60), "Low": range(60),
+            "Close": [float(i) for i in range(60)], "Volume": [100] * 60,
+        }, index=index)
+        bars.index.name = "Datetime"
+        bars.to_csv(os.path.join(self.tmp.name, "1120.SR.csv"))
+
+        ticks = pd.DataFrame({"price": [30.0, 31.5]}, index=index[[0, 30]])
+        ticks.index.name = "timestamp"
+        ticks.to_csv(os.path.join(self.tmp.name, "2222.SR.csv"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_prices_follow_replay_clock(self):
+        provider = ReplayProvider(self.tmp.name, speed=1.0, loop=False)
+        prices = provider.get_prices(["1120.SR", "2222.SR", "9999.SR"])
+        self.assertEqual(prices, {"1120.SR": 0.0, "2222.SR": 30.0})
+
+        # At 1x speed 20 replay minutes take 20 wall minutes: move the wall origin back instead
+        provider.wall_origin -= 20 * 60
+        prices = provider.get_prices(["1120.SR", "2222.SR"])
+        self.assertEqual(prices["1120.SR"], 20.0)
+        self.assertEqual(prices["2222.SR"], 30.0)
+
+    def test_history_hides_future_bars_and_resamples(self):
+        provider = ReplayProvider(self.tmp.name, speed=100.0, loop=False)
+        provider.wall_origin = time.monotonic() - 18  # 30 replay minutes
+        history = provider.get_history("1120.SR", period="1d", interval="1m")
+        self.assertEqual(history["Close"].iloc[-1], 30.0)
+
+        bars = provider.get_history("1120.SR", period="1d", interval="15m")
+        self.assertEqual(list(bars["Close"]), [14.0, 29.0, 30.0])
+        self.assertEqual(bars["Volume"].iloc[0], 1500)
+
+    def test_market_service_uses_provider(self):
+        service = MarketService()
+        previous = service.provider
+        try:
+            service.set_provider(ReplayProvider(self.tmp.name, loop=False))
+            self.assertEqual(service.get_current_price("1120"), 0.0)
+            self.assertEqual(service.get_current_prices(["2222.SR"]), {"2222.SR": 30.0})
+            self.assertEqual(service.get_market_status(), "OPEN")  # Sunday 10:00 Riyadh
+            self.assertEqual(service.seconds_until_open(), 0.0)
+        finally:
+            service.set_provider(previous)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,50 @@
+import unittest
+
+from market_service import FetchScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestFetchScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = FetchScheduler(rate=2, burst=2, clock=self.clock, sleep=self.clock.sleep)
+
+    def fetch(self):
+        return self.scheduler.run(lambda: self.clock.now)
+
+    def test_burst_then_rate_limit(self):
+        self.assertEqual([self.fetch() for _ in range(4)], [0.0, 0.0, 0.5, 1.0])
+        self.assertEqual(self.clock.sleeps, [0.5, 0.5])
+
+    def test_tokens_refill_up_to_burst(self):
+        self.fetch()
+        self.fetch()
+        self.clock.now += 10  # idle long enough to refill far past the burst
+        self.assertEqual([self.fetch() for _ in range(3)], [10.0, 10.0, 10.5])
+
+    def test_concurrent_callers_queue_for_their_own_slot(self):
+        # Reservations made at the same instant wait 0, 0, 0.5, 1.0, 1.5 seconds
+        waits = [self.scheduler._reserve() for _ in range(5)]
+        self.assertEqual(waits, [0.0, 0.0, 0.5, 1.0, 1.5])
+
+    def test_unlimited_never_sleeps(self):
+        self.scheduler.configure(None)
+        for _ in range(100):
+            self.fetch()
+        self.assertEqual(self.clock.sleeps, [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
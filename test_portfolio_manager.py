@@ -0,0 +1,156 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from portfolio_manager import PortfolioManager
+from storage import Storage
+
+
+class TestPortfolioPersistence(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "test.db")
+        self.storage = Storage(self.path)
+        self.pm = PortfolioManager(storage=self.storage)
+
+    def tearDown(self):
+        self.storage.close()
+        self.tmp.cleanup()
+
+    def test_reading_a_new_portfolio_writes_nothing(self):
+        before = self.storage.count_portfolios()
+        self.pm.get_portfolio("visitor")
+        self.assertEqual(self.storage.count_portfolios(), before)
+        self.assertIsNone(self.storage.load_portfolio("visitor"))
+
+    def test_mutations_persist_only_that_user(self):
+        self.pm.add_robot("sniper", "ذيب", "🐺", 5000, user_id="u1")
+        self.pm.add_robot("wave", "موج", "🌊", 3000, user_id="u2")
+        self.storage.save_portfolio("u2", {"user_id": "u2", "marker": True})
+
+        self.pm.update_robot_balance("sniper", 8000, user_id="u1")
+        self.assertTrue(self.storage.load_portfolio("u2")["marker"])  # u2's row was not rewritten
+
+        reopened = PortfolioManager(storage=Storage(self.path))
+        portfolio = reopened.get_portfolio("u1")
+        self.assertEqual(portfolio["total_balance"], 8000)
+        self.assertEqual(portfolio["copied_robots"][0]["robot_name"], "ذيب")
+
+    def test_concurrent_adds_for_one_user_are_not_lost(self):
+        def add(worker):
+            for i in range(25):
+                self.pm.add_robot(f"bot-{worker}-{i}", "", "", 100, user_id="hot")
+
+        threads = [threading.Thread(target=add, args=(w,)) for w in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        portfolio = self.storage.load_portfolio("hot")
+        self.assertEqual(len(portfolio["copied_robots"]), 200)
+        self.assertEqual(portfolio["total_balance"], 20000)
+
+    def test_running_aggregates_match_full_recompute(self):
+        self.pm.add_robot("sniper", "", "", 10000, user_id="u1")
+        self.pm.add_robot("wave", "", "", 5000, user_id="u1")
+        self.pm.update_robot_performance("sniper", 700, 1, 4, user_id="u1")
+        self.pm.update_robot_performance("wave", -200, 0, 2, user_id="u1")
+        self.pm.update_robot_balance("wave", 6000, user_id="u1")
+        self.pm.remove_robot("sniper", user_id="u1")
+        self.assertEqual(self.pm.verify_aggregates(), [])
+
+        portfolio = self.pm.get_portfolio("u1")
+        self.assertEqual((portfolio["total_balance"], portfolio["completed_trades"]), (6000, 2))
+        portfolio["current_value"] += 1  # simulated drift
+        self.assertEqual(self.pm.verify_aggregates(), ["u1"])
+        self.assertEqual(self.storage.load_portfolio("u1")["current_value"], 4800)
+
+
+class TestCopyTrading(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = Storage(os.path.join(self.tmp.name, "test.db"))
+        self.pm = PortfolioManager(storage=self.storage)
+
+    def tearDown(self):
+        self.storage.close()
+        self.tmp.cleanup()
+
+    def test_approved_trade_reaches_every_follower(self):
+        self.pm.add_robot("sniper", "ذيب", "🐺", 10000, user_id="u1")
+        self.pm.add_robot("sniper", "ذيب", "🐺", 5000, user_id="u2")
+        self.pm.add_robot("wave", "موج", "🌊", 5000, user_id="u2")
+        self.pm.add_robot("sniper", "ذيب", "🐺", 1000, user_id="u3")
+        self.pm.remove_robot("sniper", user_id="u3")
+        self.assertEqual(sorted(self.pm.copy_engine.followers("sniper")), ["u1", "u2"])
+
+        self.assertEqual(self.pm.copy_engine.on_trade("sniper", 1000), 2)  # +1% on 100k
+        self.pm.copy_engine.on_trade("sniper", -500)
+        self.assertEqual(self.pm.copy_engine.flush(), 2)
+
+        u2 = self.storage.load_portfolio("u2")
+        sniper = next(r for r in u2["copied_robots"] if r["robot_id"] == "sniper")
+        self.assertAlmostEqual(sniper["profit"], 25.0)
+        self.assertEqual(sniper["total_trades"], 2)
+        self.assertAlmostEqual(u2["current_value"], 10025.0)
+        self.assertAlmostEqual(u2["total_profit"], 25.0)
+        self.assertEqual(u2["completed_trades"], 2)
+        self.assertAlmostEqual(self.pm.get_portfolio("u1")["total_profit"], 50.0)
+
+        # A restart rebuilds the reverse index from storage
+        self.assertEqual(sorted(PortfolioManager(storage=self.storage).copy_engine.followers("sniper")), ["u1", "u2"])
+
+
+class TestWorkers(unittest.TestCase):
+    """Two PortfolioManagers on one database file stand in for two gunicorn workers."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "test.db")
+        self.storages = [Storage(path), Storage(path)]
+        self.web, self.engine = (PortfolioManager(storage=storage) for storage in self.storages)
+
+    def tearDown(self):
+        for storage in self.storages:
+            storage.close()
+        self.tmp.cleanup()
+
+    def test_follower_added_in_a_web_worker_trades_in_the_engine(self):
+        self.web.add_robot("sniper", "ذيب", "🐺", 10000, user_id="u1")
+        self.assertEqual(self.engine.copy_engine.followers("sniper"), [])
+        self.assertEqual(self.engine.sync(), 1)
+        self.assertEqual(self.engine.copy_engine.followers("sniper"), ["u1"])
+
+        self.web.update_robot_balance("sniper", 20000, user_id="u1")
+        self.engine.sync()
+        self.engine.copy_engine.on_trade("sniper", 1000)  # +1% of the new allocation
+        self.assertEqual(self.engine.copy_engine.flush(), 1)
+
+        self.web.sync()
+        portfolio = self.web.get_portfolio("u1")
+        self.assertAlmostEqual(portfolio["total_profit"], 200.0)
+        self.assertEqual(portfolio["copied_robots"][0]["total_trades"], 1)
+
+        self.web.remove_robot("sniper", user_id="u1")
+        self.engine.sync()
+        self.assertEqual(self.engine.copy_engine.followers("sniper"), [])
+
+    def test_writes_from_both_workers_are_kept(self):
+        self.engine.get_portfolio("u1")  # cached before the web worker writes
+        self.web.add_robot("sniper", "", "", 10000, user_id="u1")
+        self.engine.add_robot("wave", "", "", 5000, user_id="u1")
+        self.engine.copy_engine.on_trade("wave", 1000)
+        self.web.update_robot_balance("sniper", 12000, user_id="u1")
+        self.engine.copy_engine.flush()
+
+        stored = self.storages[0].load_portfolio("u1")
+        self.assertEqual({r["robot_id"]: r["allocated_balance"] for r in stored["copied_robots"]},
+                         {"sniper": 12000, "wave": 5000})
+        self.assertAlmostEqual(stored["current_value"], 15050.0)  # wave's +1% on 5000 was added, not lost
+        self.assertEqual(self.engine.get_portfolio("u1"), stored)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
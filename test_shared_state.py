@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from challenge_manager import ChallengeManager
+from knowledge_center import KnowledgeCenter
+from shared_state import EngineLease, SharedState, StatePublisher, StateFollower
+
+
+class TestSharedState(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @unittest.skipIf(os.name == "nt", "flock is POSIX only")
+    def test_only_one_engine_lease(self):
+        path = os.path.join(self.tmp.name, "engine.lock")
+        engine, worker = EngineLease(path), EngineLease(path)
+        self.assertTrue(engine.acquire())
+        self.assertFalse(worker.acquire())
+        engine.release()
+        self.assertTrue(worker.acquire())  # the next worker takes over
+        worker.release()
+
+    def test_document_is_read_once_per_change(self):
+        state = SharedState(os.path.join(self.tmp.name, "state.json"))
+        reader = SharedState(state.path)
+        self.assertIsNone(reader.read_if_changed())
+        state.write({"seq": 1})
+        self.assertEqual(reader.read_if_changed(), {"seq": 1})
+        self.assertIsNone(reader.read_if_changed())
+        state.write({"seq": 2})
+        self.assertEqual(reader.read_if_changed(), {"seq": 2})
+
+    def test_follower_mirrors_engine_leaderboard(self):
+        kc = KnowledgeCenter()
+        engine, worker = ChallengeManager(), ChallengeManager()
+        engine.start_new_challenge()
+        state = SharedState(os.path.join(self.tmp.name, "state.json"))
+        publisher = StatePublisher(state, kc, engine)
+        follower = StateFollower(SharedState(state.path), kc, worker)
+
+        publisher.publish()
+        self.assertTrue(follower.poll())
+        self.assertEqual(worker.get_leaderboard(), engine.get_leaderboard())
+
+        engine.update_score("jewel", 1200.0)
+        publisher.add_trade({"bot_id": "jewel", "pnl": 1200.0})
+        sub = kc.events.subscribe(["trade"])
+        publisher.publish()
+        self.assertTrue(follower.poll())
+        self.assertEqual(worker.get_rank("jewel"), 1)
+        self.assertEqual(worker.get_leaderboard(), engine.get_leaderboard())
+        self.assertIn(b'"bot_id": "jewel"', sub.get(timeout=0))  # replayed to local subscribers
+        kc.events.unsubscribe(sub)
+        self.assertFalse(follower.poll())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,92 @@
+import datetime
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from storage import SELECT_SIGNALS_BY_BOT, Storage
+
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = Storage(os.path.join(self.tmp.name, "test.db"))
+        self.now = datetime.datetime(2025, 1, 5, 12, 0)
+
+    def tearDown(self):
+        self.storage.close()
+        self.tmp.cleanup()
+
+    def journal_batch(self, count):
+        batch = []
+        for i in range(1, count + 1):
+            batch.append(("signal", {"id": i, "timestamp": self.now - datetime.timedelta(minutes=10 * i),
+                                     "bot_id": "sniper" if i % 2 else "wave", "symbol": "1120.SR",
+                                     "type": "BUY", "price": 80.0, "reason": "RSI", "status": "PENDING"}))
+        batch.append(("verdict", {"timestamp": self.now, "signal_id": 1, "verdict": "APPROVED",
+                                  "message": "ok", "bot_id": "sniper"}))
+        return batch
+
+    def test_range_query_by_bot(self):
+        self.storage.apply_journal(self.journal_batch(20))
+
+        last_hour = self.storage.signals("bot_id", "sniper", since=self.now - datetime.timedelta(hours=1))
+        self.assertEqual([s["id"] for s in last_hour], [1, 3, 5])  # newest first
+        self.assertEqual(last_hour[0]["status"], "APPROVED")
+        self.assertIsInstance(last_hour[0]["timestamp"], datetime.datetime)
+        self.assertEqual(len(self.storage.verdicts("sniper")), 1)
+
+        with self.storage.connection() as conn:
+            plan = " ".join(str(tuple(r)) for r in conn.execute("EXPLAIN QUERY PLAN " + SELECT_SIGNALS_BY_BOT,
+                                                                 ("sniper", 0, 1e12, 10)))
+        self.assertIn("signals_bot_ts", plan)
+
+    def test_scores_and_portfolios_round_trip(self):
+        self.storage.reset_scores({"sniper": {"pnl": 10.0, "trades": 1, "wins": 1, "status": "ACTIVE"},
+                                   "wave": {"pnl": 0.0, "trades": 0, "wins": 0, "status": "ACTIVE"}})
+        self.storage.save_score("wave", {"pnl": 50.0, "trades": 2, "wins": 1, "status": "ACTIVE"})
+        self.assertEqual(list(self.storage.load_scores()), ["wave", "sniper"])
+
+        self.storage.save_portfolios({"u1": {"user_id": "u1", "copied_robots": [{"robot_name": "ذيب"}]}})
+        self.assertEqual(self.storage.load_portfolios()["u1"]["copied_robots"][0]["robot_name"], "ذيب")
+
+    def test_portfolio_writes_are_sequenced(self):
+        path = os.path.join(self.tmp.name, "old.db")
+        with sqlite3.connect(path) as conn:  # a database from before the seq column
+            conn.execute("CREATE TABLE portfolios (user_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)")
+            conn.execute("INSERT INTO portfolios VALUES ('u0', '{}', 0)")
+        storage = Storage(path)
+        self.addCleanup(storage.close)
+        self.assertEqual(storage.portfolio_seq(), 0)
+
+        storage.save_portfolios({"u1": {"n": 1}, "u2": {"n": 1}})
+        written = storage.modify_portfolios(["u1", "u3"], lambda user_id, stored, seq: (
+            {"n": stored["n"] + 1} if stored else None), known={"u1": 0})
+        self.assertEqual(written, {"u1": 3})
+        self.assertEqual(storage.portfolios_since(1), [("u2", {"n": 1}, 2), ("u1", {"n": 2}, 3)])
+
+    def test_readers_run_alongside_writer(self):
+        errors = []
+
+        def writer():
+            for i in range(50):
+                self.storage.apply_journal(self.journal_batch(5))
+
+        def reader():
+            try:
+                for _ in range(200):
+                    self.storage.signals("status", "PENDING")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
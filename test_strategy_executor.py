@@ -0,0 +1,73 @@
+import time
+import unittest
+
+from knowledge_center import MarketSnapshot
+from strategies import BollingerBot, MACD_Bot, RSI_Bot, evaluate_bots
+from strategy_executor import StrategyExecutor
+
+
+class SlowBot(RSI_Bot):
+    @classmethod
+    def vector_rule(cls, X, n_bots, rng):
+        time.sleep(2)
+        return super().vector_rule(X, n_bots, rng)
+
+
+def _indicators(rsi, macd_cross, price, lower, upper):
+    return {"rsi": rsi, "macd_cross": macd_cross, "trend_cross": 0, "bb_lower": lower, "bb_upper": upper,
+            "ema20": None, "ema50": None, "swing_high": None, "swing_low": None}
+
+
+def _bots(cls, n):
+    return [cls(f"{cls.__name__}-{i}", "", "", "", "", "", "") for i in range(n)]
+
+
+class TestStrategyExecutor(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = MarketSnapshot({"A": 10.0, "B": 20.0, "C": 30.0}, version=1, indicators={
+            "A": _indicators(55, 0, 10.0, 9.0, 11.0),
+            "B": _indicators(22, 1, 20.0, 21.0, 25.0),
+            "C": _indicators(60, -1, 30.0, 25.0, 29.0),
+        })
+        self.executor = StrategyExecutor(workers=2, deadline=30, inline_below=0, shard_size=7)
+
+    def tearDown(self):
+        self.executor.close()
+
+    def test_pool_matches_inline_evaluation(self):
+        bots = _bots(RSI_Bot, 20) + _bots(MACD_Bot, 15) + _bots(BollingerBot, 10)
+        pooled = self.executor.evaluate(bots, self.snapshot)
+        inline = evaluate_bots(bots, self.snapshot)
+        self.assertEqual(len(pooled), 45)
+        self.assertEqual([(b.bot_id, s["symbol"], s["type"]) for b, s in pooled],
+                         [(b.bot_id, s["symbol"], s["type"]) for b, s in inline])
+
+    def test_slow_strategy_misses_the_round_only(self):
+        self.executor.evaluate(_bots(RSI_Bot, 2), self.snapshot)  # warm the pool up
+        self.executor.deadline = 0.5
+        started = time.perf_counter()
+        results = self.executor.evaluate(_bots(SlowBot, 2) + _bots(MACD_Bot, 2), self.snapshot)
+        self.assertLess(time.perf_counter() - started, 1.5)
+        self.assertEqual([b.bot_id for b, _ in results], ["MACD_Bot-0", "MACD_Bot-1"])
+        self.assertEqual(self.executor.late, 1)
+
+    def test_running_late_shard_holds_its_class_back(self):
+        self.executor.evaluate(_bots(RSI_Bot, 2), self.snapshot)  # warm the pool up
+        self.executor.deadline = 0.5
+        bots = _bots(SlowBot, 2) + _bots(MACD_Bot, 2)
+        self.executor.evaluate(bots, self.snapshot)
+        for _ in range(3):
+            # SlowBot's shard is still running: it is not queued again, MACD_Bot keeps its pace
+            started = time.perf_counter()
+            results = self.executor.evaluate(bots, self.snapshot)
+            self.assertLess(time.perf_counter() - started, 0.4)
+            self.assertEqual([b.bot_id for b, _ in results], ["MACD_Bot-0", "MACD_Bot-1"])
+        self.assertEqual((self.executor.late, self.executor.skipped), (1, 3))
+
+        time.sleep(2)
+        self.executor.deadline = 30
+        self.assertEqual(len(self.executor.evaluate(bots, self.snapshot)), 4)  # back once it finished
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from chart_serializer import encode_candles
+from tick_store import TickStore
+
+
+class TestTickStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = TickStore(self.tmp.name)
+        for i in range(100):
+            self.store.append({"1120.SR": 80.0 + i, "2222.SR": 30.0 - i * 0.1}, timestamp=1000.0 + i)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_range_query_uses_symbol_index(self):
+        stamps, prices = self.store.query("1120.SR", start=1010, end=1012)
+        self.assertEqual(stamps.tolist(), [1010.0, 1011.0, 1012.0])
+        self.assertEqual(prices.tolist(), [90.0, 91.0, 92.0])
+
+        stamps, prices = self.store.last("2222.SR", 2)
+        self.assertEqual(stamps.tolist(), [1098.0, 1099.0])
+        self.assertAlmostEqual(prices[-1], 20.1)
+
+        self.assertEqual(len(self.store.query("9999.SR")[0]), 0)
+
+    def test_reopen_and_recover_from_torn_append(self):
+        # Simulate a crash after the ts column was written but nothing else
+        with open(os.path.join(self.tmp.name, "ts.f8"), "ab") as f:
+            f.write(b"\x00" * 8)
+
+        reopened = TickStore(self.tmp.name)
+        self.assertEqual(reopened.rows, 200)
+        reopened.append({"1120.SR": 500.0}, timestamp=2000.0)
+        stamps, prices = reopened.query("1120.SR", start=1099)
+        self.assertEqual(prices.tolist(), [179.0, 500.0])
+
+    def test_reader_never_truncates_and_sees_new_symbols(self):
+        # The engine is mid-append: ts is one row ahead of the other columns
+        ts_path = os.path.join(self.tmp.name, "ts.f8")
+        with open(ts_path, "ab") as f:
+            f.write(b"\x00" * 8)
+        size = os.path.getsize(ts_path)
+
+        reader = TickStore(self.tmp.name, writable=False)
+        self.assertEqual(os.path.getsize(ts_path), size)
+        self.assertEqual(len(reader.query("1120.SR")[0]), 100)
+        with self.assertRaises(PermissionError):
+            reader.append({"1120.SR": 1.0})
+
+        self.store.append({"4030.SR": 12.5}, timestamp=3000.0)
+        self.assertEqual(reader.last("4030.SR")[1].tolist(), [12.5])
+
+    def test_ohlc_bars(self):
+        bars = self.store.ohlc("1120.SR", rule="1min")
+        self.assertEqual(len(bars), 3)  # 1000s-1099s spans three minutes
+        self.assertEqual(bars["Open"].iloc[0], 80.0)
+        self.assertEqual(bars["Close"].iloc[-1], 179.0)
+
+    def test_ohlc_without_ticks_is_an_empty_chart(self):
+        bars = self.store.ohlc("9999.SR", rule="5min")
+        self.assertTrue(bars.empty)
+        self.assertEqual(str(bars.index.tz), "UTC")
+        self.assertIn('"time"', encode_candles(bars, layout="columnar", intraday=True))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
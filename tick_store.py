@@ -0,0 +1,187 @@
+"""
+Append-only, memory-mapped columnar store for observed prices.
+
+Layout under the store directory:
+
+    symbols.json        symbol id -> symbol (ids are list positions)
+    ts.f8 / sym.u4 / price.f8
+                        the three tick columns, one fixed-width value per row
+    index/<id>.ts.f8 / index/<id>.row.u8
+                        per-symbol time index: every tick's timestamp and row
+
+Writes only ever append, so readers can memory-map the files and never see
+data move. Range queries binary-search the symbol's own timestamps and
+then gather prices by row number, so they touch only the pages they need
+instead of loading the store into RAM.
+
+Only one process appends. A store opened with writable=False (every web
+worker but the engine) never truncates or writes a file; it picks up
+symbols the writer added by re-reading symbols.json. `open_for_append()`
+turns it into the writer, e.g. when its worker takes over the engine.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = {"ts": np.float64, "sym": np.uint32, "price": np.float64}
+BAR_RULES = ("1min", "5min", "15min", "1h", "1D")  # resample rules ohlc() is served with
+
+
+def _mapped(path, dtype, count=None):
+    """Read-only memmap of a column file (empty array when there is nothing yet)."""
+    itemsize = np.dtype(dtype).itemsize
+    available = path.stat().st_size // itemsize if path.exists() else 0
+    count = available if count is None else min(count, available)
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+class TickStore:
+    def __init__(self, root=os.path.join("data", "ticks"), writable=True):
+        self.root = Path(root)
+        self.index_dir = self.root / "index"
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.writable = False
+        self.rows = 0
+        self._load_symbols()
+        if writable:
+            self.open_for_append()
+
+    def open_for_append(self):
+        """Makes this store the writer: repairs a torn last append, then allows append()."""
+        with self._lock:
+            if not self.writable:
+                self._load_symbols()
+                self.rows = self._recover()
+                self.writable = True
+
+    def _load_symbols(self):
+        symbols_file = self.root / "symbols.json"
+        try:
+            symbols = json.loads(symbols_file.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            symbols = []
+        self.symbol_ids = {s: i for i, s in enumerate(symbols)}
+        self.symbols = symbols
+
+    def _lookup(self, symbol):
+        """Symbol id, or None; a reader re-reads symbols.json for symbols it has not seen."""
+        sym_id = self.symbol_ids.get(symbol)
+        if sym_id is None and not self.writable:
+            self._load_symbols()
+            sym_id = self.symbol_ids.get(symbol)
+        return sym_id
+
+    def _column_path(self, name):
+        return self.root / f"{name}.{np.dtype(COLUMNS[name]).str[1:]}"
+
+    def _index_paths(self, sym_id):
+        return self.index_dir / f"{sym_id}.ts.f8", self.index_dir / f"{sym_id}.row.u8"
+
+    def _recover(self):
+        """Truncates columns and indexes left uneven by a crash mid-append."""
+        counts = [os.path.getsize(p) // np.dtype(dt).itemsize if p.exists() else 0
+                  for p, dt in ((self._column_path(n), dt) for n, dt in COLUMNS.items())]
+        rows = min(counts)
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(name)
+            if path.exists() and os.path.getsize(path) != rows * np.dtype(dtype).itemsize:
+                os.truncate(path, rows * np.dtype(dtype).itemsize)
+
+        for sym_id in range(len(self.symbols)):
+            ts_path, row_path = self._index_paths(sym_id)
+            row_index = _mapped(row_path, np.uint64)
+            keep = int(np.searchsorted(row_index, rows)) if len(row_index) else 0
+            ts_keep = min(keep, _mapped(ts_path, np.float64).size)
+            for path, size in ((ts_path, ts_keep * 8), (row_path, ts_keep * 8)):
+                if path.exists() and os.path.getsize(path) != size:
+                    os.truncate(path, size)
+        return rows
+
+    def _symbol_id(self, symbol):
+        sym_id = self.symbol_ids.get(symbol)
+        if sym_id is None:
+            sym_id = self.symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            tmp = self.root / "symbols.json.tmp"
+            tmp.write_text(json.dumps(self.symbols), encoding="utf-8")
+            os.replace(tmp, self.root / "symbols.json")
+        return sym_id
+
+    def append(self, prices, timestamp=None):
+        """Appends one tick per symbol in {symbol: price}, all stamped with the same time."""
+        prices = {s: p for s, p in prices.items() if p is not None}
+        if not prices:
+            return 0
+        timestamp = time.time() if timestamp is None else timestamp
+
+        with self._lock:
+            if not self.writable:
+                raise PermissionError(f"tick store {self.root} is open read-only")
+            ids = np.array([self._symbol_id(s) for s in prices], dtype=np.uint32)
+            values = np.array(list(prices.values()), dtype=np.float64)
+            rows = np.arange(self.rows, self.rows + len(ids), dtype=np.uint64)
+            stamps = np.full(len(ids), timestamp, dtype=np.float64)
+
+            for name, column in (("ts", stamps), ("sym", ids), ("price", values)):
+                with open(self._column_path(name), "ab") as f:
+                    f.write(column.tobytes())
+            # Index entries go last: a row is only visible once it is complete
+            for sym_id, row in zip(ids.tolist(), rows):
+                ts_path, row_path = self._index_paths(sym_id)
+                with open(ts_path, "ab") as f:
+                    f.write(np.float64(timestamp).tobytes())
+                with open(row_path, "ab") as f:
+                    f.write(row.tobytes())
+            self.rows += len(ids)
+        return len(ids)
+
+    def query(self, symbol, start=None, end=None):
+        """Returns (timestamps, prices) arrays for symbol with start <= ts <= end."""
+        sym_id = self._lookup(symbol)
+        if sym_id is None:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64)
+
+        ts_path, row_path = self._index_paths(sym_id)
+        stamps = _mapped(ts_path, np.float64)
+        row_index = _mapped(row_path, np.uint64, count=len(stamps))
+        stamps = stamps[:len(row_index)]
+
+        lo = 0 if start is None else int(np.searchsorted(stamps, start, side="left"))
+        hi = len(stamps) if end is None else int(np.searchsorted(stamps, end, side="right"))
+        rows = np.asarray(row_index[lo:hi], dtype=np.int64)
+        prices = _mapped(self._column_path("price"), np.float64)[rows] if len(rows) else np.empty(0)
+        return np.array(stamps[lo:hi]), np.asarray(prices, dtype=np.float64)
+
+    def last(self, symbol, count=1):
+        """The most recent `count` ticks for symbol as (timestamps, prices)."""
+        sym_id = self._lookup(symbol)
+        if sym_id is None:
+            return self.query(symbol)
+        ts_path, _ = self._index_paths(sym_id)
+        stamps = _mapped(ts_path, np.float64)
+        if not len(stamps):
+            return self.query(symbol)
+        return self.query(symbol, start=float(stamps[max(len(stamps) - count, 0)]))
+
+    def to_frame(self, symbol, start=None, end=None):
+        """Ticks for symbol as a DataFrame with a UTC DatetimeIndex and a 'price' column."""
+        stamps, prices = self.query(symbol, start, end)
+        index = pd.to_datetime(stamps, unit="s", utc=True)
+        return pd.DataFrame({"price": prices}, index=index)
+
+    def ohlc(self, symbol, rule="1min", start=None, end=None):
+        """Ticks resampled into OHLC bars (chart friendly)."""
+        frame = self.to_frame(symbol, start, end)
+        if frame.empty:
+            return pd.DataFrame(columns=["Open", "High", "Low", "Close"], index=frame.index, dtype=np.float64)
+        bars = frame["price"].resample(rule).ohlc().dropna()
+        bars.columns = ["Open", "High", "Low", "Close"]
+        return bars